@@ -2,7 +2,11 @@
 
 import argparse
 
+from pre_commit_hooks import stats
+from pre_commit_hooks.regex_guard import RegexTimeoutError
+
 from .main import add_task_number
+from .rewrite import rewrite_range
 
 
 def parse_args(argv=None):
@@ -13,6 +17,7 @@ def parse_args(argv=None):
 
     parser.add_argument(
         "commit_msg",
+        nargs="?",
         help="Path to `COMMIT_EDITMSG` file.",
     )
     parser.add_argument(
@@ -33,8 +38,24 @@ def parse_args(argv=None):
             "Must contain `message` and `task` placeholders."
         ),
     )
+    parser.add_argument(
+        "--rewrite-range",
+        type=str,
+        help=(
+            "Add task number to messages of all commits in `A..B` range instead "
+            "of `COMMIT_EDITMSG` file. `B` must be a branch, range must not be empty."
+        ),
+    )
+    parser.add_argument(
+        "--task",
+        type=str,
+        help="Task number to add with `--rewrite-range`, overrides one from branch name.",
+    )
 
-    return parser.parse_args(argv)
+    args = parser.parse_args(argv)
+    if not args.commit_msg and not args.rewrite_range:
+        parser.error("either `commit_msg` or `--rewrite-range` is required")
+    return args
 
 
 def main(argv=None):
@@ -46,7 +67,15 @@ def main(argv=None):
         .decode("unicode_escape")  # argparse escapes backslash by default
     )
 
-    add_task_number(args.commit_msg, args.branch_regex, format_template)
+    with stats.collect("add-task-number"):
+        try:
+            if args.rewrite_range:
+                return rewrite_range(args.rewrite_range, args.branch_regex, format_template, args.task)
+
+            add_task_number(args.commit_msg, args.branch_regex, format_template)
+        except RegexTimeoutError as error:
+            print(error)
+            return 1
 
 
 if __name__ == "__main__":
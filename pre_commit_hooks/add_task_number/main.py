@@ -1,38 +1,40 @@
 import io
 import re
+from typing import Tuple
 
-from pre_commit_hooks.util import get_current_branch, get_git_config_param
+from pre_commit_hooks import stats
+from pre_commit_hooks.regex_guard import GuardedRegex
+from pre_commit_hooks.util import get_current_branch, get_git_comment_string, strip_comment_section
 
-GIT_COMMENT_STRING = (
-    get_git_config_param("core.commentString")
-    or get_git_config_param("core.commentChar")
-    or "#"
-)
-GIT_COMMENT_SECTION_LINE = (
-    r"{comment_string}?[ ]*-+ >8 -+".format(comment_string=GIT_COMMENT_STRING)
-)
+from .session import RebaseSession, get_git_dir
 
 
 def retrieve_task(branch: str, branch_regex: str) -> str | None:
-    """Retrieve task from branch according to the given regex."""
-    matches = re.match(branch_regex, branch)
+    """Retrieve task from branch according to the given regex.
+
+    Regex which can backtrack catastrophically is matched under time budget,
+    `RegexTimeoutError` is raised if it's exceeded.
+
+    """
+    matches = GuardedRegex(branch_regex).match(branch)
 
     if not matches:
         return
 
-    task_number = matches.group("task")
+    task_number = matches.groups.get("task")
     return task_number
 
 
-def is_task_in_message(contents: str, task: str) -> bool:
+def is_task_in_message(contents: str, task: str, comment_string: str | None = None) -> bool:
     """Check whether task has been already added to commit message."""
     task_regex = r"\b{task}\b".format(task=task)
+    comment_string = comment_string or get_git_comment_string()
 
     for line in contents.splitlines():
         stripped = line.strip()
 
         # Skip empty lines and comment lines
-        if stripped == "" or stripped.startswith(GIT_COMMENT_STRING):
+        if stripped == "" or stripped.startswith(comment_string):
             continue
 
         if re.search(task_regex, contents, re.IGNORECASE):
@@ -41,71 +43,87 @@ def is_task_in_message(contents: str, task: str) -> bool:
     return False
 
 
-def strip_comment_section(message: str) -> str:
-    """Return message without comment section which is located bellow the line.
+def add_task_to_message(
+    message: str,
+    task_number: str,
+    format_template: str,
+    comment_string: str | None = None,
+) -> str | None:
+    """Return commit message with task number or `None` if it's not needed.
 
-    All bellow this line will be ignored including task number. So need to
-    strip it to avoid appending of task number bellow this line.
+    Task number is not added to empty messages or messages which already
+    contain it. Comment string is taken from git config if it's not passed.
 
-    Example:
-    ```
-    My beautiful commit message
+    """
+    commit_message = strip_comment_section(message, comment_string).strip()
 
-    ------------------------ >8 ------------------------
+    formatted_task_number = format_template.format(
+        message="",
+        task=task_number,
+    ).strip()
 
-    This is considered a comment section by git, so everything bellow the line
-    will be ignored. We need to cut if off before appending task number,
-    because otherwise task number will be appended bellow this line and, thus,
-    it will be cut off.
+    skip_task_appending = (
+        is_task_in_message(commit_message, formatted_task_number, comment_string)
+        or not commit_message
+    )
 
-    ```
+    if skip_task_appending:
+        return None
 
-    """
-    match = re.search(GIT_COMMENT_SECTION_LINE, message)
+    return format_template.format(
+        message=commit_message,
+        task=task_number,
+    )
 
-    if match is not None:
-        return message[:match.start()]
 
-    return message
+def resolve_task(branch_regex: str) -> Tuple[str | None, str | None]:
+    """Return task number of current branch and git comment string.
+
+    During rebase task is taken from the rebased branch (`HEAD` is detached)
+    and both values are memoized for the whole rebase session. Otherwise
+    comment string is not resolved and `None` is returned for it.
+
+    """
+    with stats.phase("git"):
+        session = RebaseSession.find(get_git_dir())
+    memo = session.load(branch_regex) if session is not None else None
+    if memo is not None:
+        stats.increment("memo_hits")
+        return memo["task"], memo["comment_string"]
+
+    with stats.phase("git"):
+        branch = (session.branch if session is not None else None) or get_current_branch()
+    task_number = retrieve_task(branch, branch_regex)
+    if session is None:
+        return task_number, None
+
+    with stats.phase("git"):
+        comment_string = get_git_comment_string()
+    session.save(branch_regex, branch, task_number, comment_string)
+    return task_number, comment_string
 
 
 def add_task_number(filename: str, branch_regex: str, format_template: str):
     """Provide task number to commit message."""
-    branch = get_current_branch()
-    task_number = retrieve_task(branch, branch_regex)
+    task_number, comment_string = resolve_task(branch_regex)
 
     if not task_number:
         return
 
     with io.open(filename, "r+") as commit_message_file:
-        commit_message = commit_message_file.read()
-        commit_message = strip_comment_section(
-            commit_message,
-        )
-        commit_message = commit_message.strip()
-
-        is_empty_message = not commit_message
-
-        formatted_task_number = format_template.format(
-            message="",
-            task=task_number,
-        ).strip()
-
-        skip_task_appending = (
-            is_task_in_message(commit_message, formatted_task_number)
-            or is_empty_message
+        commit_message_with_task = add_task_to_message(
+            commit_message_file.read(),
+            task_number,
+            format_template,
+            comment_string,
         )
 
-        if skip_task_appending:
+        if commit_message_with_task is None:
             return
 
-        commit_message_with_task = format_template.format(
-            message=commit_message,
-            task=task_number,
-        )
-
         commit_message_file.seek(0)
         commit_message_file.write(commit_message_with_task)
         commit_message_file.truncate()
 
+    formatted_task_number = format_template.format(message="", task=task_number).strip()
     print(f"Message `{formatted_task_number}` was appended to your commit.")
@@ -0,0 +1,119 @@
+import subprocess
+from typing import BinaryIO, Tuple
+
+from pre_commit_hooks.util import cmd_output
+
+from .main import add_task_to_message, retrieve_task
+
+BRANCH_REF_PREFIX = "refs/heads/"
+
+
+def _rewrite_stream(
+    export_stream: BinaryIO,
+    import_stream: BinaryIO,
+    task_number: str,
+    format_template: str,
+) -> int:
+    """Copy `git fast-export` stream to `git fast-import` adding task to messages.
+
+    Returns:
+      (int): number of rewritten commit messages
+
+    """
+    rewritten = 0
+    in_commit = False
+    for line in export_stream:
+        if line.startswith(b"commit "):
+            in_commit = True
+        elif line.startswith(b"data ") and in_commit:
+            # the first `data` of commit is its message
+            in_commit = False
+            data = export_stream.read(int(line[5:]))
+            message = add_task_to_message(data.decode("utf-8"), task_number, format_template)
+            if message is not None:
+                data = f"{message}\n".encode("utf-8")
+                rewritten += 1
+            line = b"data %d\n" % len(data) + data
+        elif line.startswith(b"data "):
+            line += export_stream.read(int(line[5:]))
+        import_stream.write(line)
+    return rewritten
+
+
+def _resolve_range(revision_range: str) -> Tuple[str, str] | None:
+    """Return start commit and end branch ref of `A..B` range.
+
+    Range must have both ends and at least one commit, so history out of it
+    is never rewritten. Errors are printed, `None` is returned for them.
+
+    """
+    start, separator, end = revision_range.partition("..")
+    if not separator or not start or not end or end.startswith(".") or "-" in (start[0], end[0]):
+        print(f"[ERROR] `{revision_range}` is not `A..B` commits range.")
+        return None
+
+    try:
+        start_commit = cmd_output("git", "rev-parse", "--verify", "-q", f"{start}^{{commit}}").strip()
+        ref = cmd_output("git", "rev-parse", "--verify", "-q", "--symbolic-full-name", end).strip()
+    except RuntimeError:
+        print(f"[ERROR] `{revision_range}` commits range can't be resolved.")
+        return None
+    if not ref.startswith(BRANCH_REF_PREFIX):
+        print(f"[ERROR] `{end}` is not a branch, only branches can be rewritten.")
+        return None
+    if cmd_output("git", "rev-list", "--count", f"{start_commit}..{ref}").strip() == "0":
+        print(f"[ERROR] `{revision_range}` commits range is empty.")
+        return None
+    return start_commit, ref
+
+
+def rewrite_range(
+    revision_range: str,
+    branch_regex: str,
+    format_template: str,
+    task_number: str | None = None,
+) -> int:
+    """Add task number to messages of all commits in `A..B` range at once.
+
+    History is streamed through `git fast-export` and `git fast-import` in a
+    single pass, so no process is started per commit (unlike rebase). `B` must
+    be a branch, task number is retrieved from its name if not passed. Range
+    isn't rewritten if there are not committed changes of tracked files.
+
+    Args:
+      revision_range: commits range, i.e. `main..feature/ABC-123-my-branch`
+      branch_regex: regex to get task number from the branch name
+      format_template: format to render result message with task
+      task_number: task number to add, overrides one from branch name
+
+    Returns:
+      (int): 0 if messages were rewritten, 1 if range can't be rewritten
+
+    """
+    if cmd_output("git", "status", "--porcelain", "--untracked-files=no").strip():
+        print("[ERROR] There are not committed changes, please commit or stash them before rewriting.")
+        return 1
+
+    resolved = _resolve_range(revision_range)
+    if resolved is None:
+        return 1
+    start_commit, ref = resolved
+
+    task_number = task_number or retrieve_task(ref[len(BRANCH_REF_PREFIX):], branch_regex)
+    if not task_number:
+        print(f"[ERROR] Task number is not found in `{ref}` branch name, please pass it with `--task`.")
+        return 1
+
+    export_cmd = ["git", "fast-export", "--no-data", "--reference-excluded-parents", "--reencode=yes", ref]
+    export_process = subprocess.Popen(export_cmd + [f"^{start_commit}"], stdout=subprocess.PIPE)
+    import_process = subprocess.Popen(["git", "fast-import", "--force", "--quiet"], stdin=subprocess.PIPE)
+    with export_process, import_process:
+        rewritten = _rewrite_stream(export_process.stdout, import_process.stdin, task_number, format_template)
+        import_process.stdin.close()
+
+    if export_process.returncode or import_process.returncode:
+        print(f"[ERROR] Failed to rewrite `{revision_range}` commits.")
+        return 1
+
+    print(f"Task `{task_number}` was added to {rewritten} commit messages of `{ref}`.")
+    return 0
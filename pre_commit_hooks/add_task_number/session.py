@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+from typing import Dict
+
+from pre_commit_hooks.util import cmd_output
+
+# dirs with state of running `git rebase` (`rebase-apply` for `git am` too)
+REBASE_STATE_DIRS = ("rebase-merge", "rebase-apply")
+# files of rebase state which are not changed during the session
+SESSION_FILES = ("head-name", "orig-head", "onto")
+BRANCH_REF_PREFIX = "refs/heads/"
+MEMO_DIRNAME = "saritasa-pre-commit-hooks"
+MEMO_FILENAME = "add-task-number-session.json"
+
+
+def get_git_dir() -> str:
+    """Return git dir of current worktree, git passes it to hooks in `GIT_DIR`."""
+    return os.environ.get("GIT_DIR") or cmd_output("git", "rev-parse", "--git-dir").strip()
+
+
+class RebaseSession:
+    """Running rebase session with memo of values resolved for its commits.
+
+    Hook is run for each reworded or squashed commit of interactive rebase,
+    while branch, its task and git config are the same for all of them. So
+    they are resolved for the first commit and stored in memo file, next
+    commits of the session take them from memo without running git commands.
+
+    Args:
+      git_dir: git dir of current worktree
+      key: id of session, made of its state files
+      branch: name of rebased branch, `None` if detached `HEAD` is rebased
+
+    """
+
+    def __init__(self, git_dir: str, key: str, branch: str | None):
+        self.path = os.path.join(git_dir, MEMO_DIRNAME, MEMO_FILENAME)
+        self.key = key
+        self.branch = branch
+
+    @classmethod
+    def find(cls, git_dir: str) -> "RebaseSession | None":
+        """Return running rebase session, `None` if there is no such one."""
+        for name in REBASE_STATE_DIRS:
+            values = []
+            for filename in SESSION_FILES:
+                try:
+                    with open(os.path.join(git_dir, name, filename)) as state_file:
+                        values.append(state_file.read().strip())
+                except OSError:
+                    values.append("")
+            if not any(values):
+                continue
+
+            head_name = values[0]
+            branch = head_name[len(BRANCH_REF_PREFIX):] if head_name.startswith(BRANCH_REF_PREFIX) else None
+            key = hashlib.sha1("\n".join([name, *values]).encode()).hexdigest()
+            return cls(git_dir, key, branch)
+        return None
+
+    def load(self, branch_regex: str) -> Dict | None:
+        """Return memo of session resolved for `branch_regex`, if it's stored."""
+        try:
+            with open(self.path) as memo_file:
+                memo = json.load(memo_file)
+        except (OSError, ValueError):
+            return None
+        if memo.get("session") != self.key or memo.get("branch_regex") != branch_regex:
+            return None
+        return memo
+
+    def save(self, branch_regex: str, branch: str, task: str | None, comment_string: str):
+        """Store values resolved for `branch_regex`, memo of previous session is replaced."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as memo_file:
+            json.dump(
+                {
+                    "session": self.key,
+                    "branch_regex": branch_regex,
+                    "branch": branch,
+                    "task": task,
+                    "comment_string": comment_string,
+                },
+                memo_file,
+            )
@@ -1,69 +1,57 @@
 import argparse
+import dataclasses
+import glob
+import hashlib
+import itertools
+import json
 import os
 import re
-from dataclasses import dataclass
-from typing import Any, Dict, List, Sequence
-
-import crossplane
-
-DEFAULT_DENY_LOCATIONS = [
-    "/cron.*",
-    "/\.",
-    "autodiscover.xml",
-    "apple-touch-icon",
-    "\.(json|sh|xml|md|conf|toml|yml|yaml|log|pid)$",
-    "^/(app/|vendor|src|tests|vagrant|docs|phpunit|svn|git|docker|migrations|Makefile)",
-]
-
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Collection, Dict, Iterable, List, Sequence, Set, Tuple
+
+from pre_commit_hooks import stats
+from pre_commit_hooks.nginx.analyzer import PARSE_ERROR, NginxAnalyzer
+from pre_commit_hooks.nginx.baseline import load_baseline, save_baseline
+from pre_commit_hooks.nginx.cache import (
+    DiskParseCache,
+    PendingRoots,
+    ResultCache,
+    RunMarker,
+    iter_include_patterns,
+    options_key,
+)
+from pre_commit_hooks.nginx.dump import read_dump
+from pre_commit_hooks.nginx.exposure import WebRootIndex, parse_web_roots
+from pre_commit_hooks.nginx.git import CatFileBatch, GitTreeSource
+from pre_commit_hooks.nginx.parser import FILE_SYSTEM_SOURCE, ParseDeadlineError, parse_config
+from pre_commit_hooks.nginx.report import REPORTERS, Reporter, SarifReporter, TextReporter
+from pre_commit_hooks.nginx.rules import RULES, Finding
+from pre_commit_hooks.nginx.scan import (
+    DEFAULT_ROOT_NAMES,
+    SCAN_ERROR,
+    ScanResult,
+    load_shards,
+    parse_shard,
+    save_shard,
+    scan,
+    shard_roots,
+)
+from pre_commit_hooks.nginx.template import TEMPLATE_SUFFIX, TemplateSource, is_template, load_template_values
+from pre_commit_hooks.util import cmd_output, get_cache_dir, get_pre_commit_run_id, get_user_cache_dir
 
 DEFAULT_NGINX_CONFIG_PATH = "nginx.conf"
-
-
-@dataclass
-class SearchItem:
-    """Dataclass to represent searched by regex item."""
-
-    regex: str
-    expected: str
-    exists: bool = False
-
-
-def _search_directive(
-    config: Dict,
-    name: str,
-    value: Any | None = None,
-    results: List[Dict] | None = None,
-) -> List[Dict]:
-    """Search all entries of `name` directive in tree and add to `results`.
-
-    If `value` is passed - search for directive with exact value.
-
-    Args:
-      config: dict with current nginx config content
-      name: searched directive name
-      value: if passed search for concrete directive `name` with exact `value`
-      results: list with `search` results
-
-    Returns:
-      (list): list with found directives configs
-
-    """
-    results = results or []
-    if config["directive"] == name:
-        if value is None or config["args"] == value:
-            results.append(config)
-
-    blocks = config.get("block", [])
-    for block in blocks:
-        block["file"] = config.get("file")
-        results = _search_directive(block, name, value, results)
-    return results
+# dir of parsed files cache in hook cache dir
+PARSE_CACHE_DIRNAME = "nginx-parse"
 
 
 def _disabled_locations_exist(
     locations: List[Dict] | None = None,
     custom_deny_locations: List[str] | None = None,
     extra_deny_locations: List[str] | None = None,
+    reporter: Reporter | None = None,
+    root: str = DEFAULT_NGINX_CONFIG_PATH,
 ) -> bool:
     """Check that all corresponding `disabled` locations were added.
 
@@ -81,156 +69,226 @@ def _disabled_locations_exist(
       locations: list with all `locations` directives configs found in nginx config
       custom_deny_locations: custom deny locations, overrides existing ones
       extra_deny_locations: extra deny locations, adds to existing ones
+      reporter: reporter of findings, prints them as text by default
+      root: nginx root config `locations` are found in, findings are reported for it
 
     Returns:
       (bool): flag whether all required disabled `locations` directives are added
 
     """
-    locations = locations or []
-    custom_deny_locations = custom_deny_locations or []
-    extra_deny_locations = extra_deny_locations or []
-
-    # if `custom_deny_locations` were passed use it + `extra_deny_locations`,
-    # otherwise use `default_deny_locations` + `extra_deny_locations`
-    matches = (custom_deny_locations or DEFAULT_DENY_LOCATIONS) + extra_deny_locations
-    regex_matches = [SearchItem(regex=rf"^{re.escape(item)}$", expected=item) for item in matches]
-
-    for location in locations:
-        location_prefix = location["args"][0]
-        if location_prefix != "~":
-            continue
-
-        for item in regex_matches:
-            location_name = location["args"][1]
-            if not re.match(item.regex, location_name):
-                continue
+    reporter = reporter or TextReporter()
+    analyzer = NginxAnalyzer(custom_deny_locations, extra_deny_locations)
+    findings = analyzer.missing_deny_locations(locations or [])
+    for finding in findings:
+        reporter.report(root, finding)
+    return not findings
+
+
+def _options_key(
+    analyzer: NginxAnalyzer,
+    baseline: Collection[str] = (),
+    templates: TemplateSource | None = None,
+) -> str:
+    """Return key of analyzer policy, baseline and template values which affect validation result."""
+    return options_key(
+        deny_locations=analyzer.deny_locations,
+        ignore_errors_keywords=analyzer.ignore_errors_keywords,
+        sensitive_uris=analyzer.sensitive_uris,
+        enabled_rules=analyzer.rule_engine.names,
+        baseline=list(baseline),
+        template_values=templates.values_key if templates is not None else None,
+    )
 
-            deny = _search_directive(config=location, name="deny", value=["all"])
-            return_403 = _search_directive(config=location, name="return", value=["403"])
 
-            if deny or return_403:
-                item.exists = True
+def _policy_key(analyzer: NginxAnalyzer) -> str:
+    """Return key of analyzer policy which is the same on all CI nodes.
 
-    all_disabled_locations_found = True
-    for item in regex_matches:
-        if item.exists is not True:
-            all_disabled_locations_found = False
-            print(
-                f"[ERROR] location not disabled: `location ~ {item.expected}`. "
-                "Please disable it with `{{deny all;}}` or `{{return 403;}}` directives.",
-            )
+    Unlike `_options_key` it doesn't depend on installed hooks files, which
+    are different on nodes.
 
-    return all_disabled_locations_found
+    """
+    policy = {
+        "deny_locations": sorted(analyzer.deny_locations),
+        "ignore_errors_keywords": sorted(analyzer.ignore_errors_keywords),
+        "sensitive_uris": sorted(analyzer.sensitive_uris),
+        "enabled_rules": sorted(analyzer.rule_engine.names),
+    }
+    return hashlib.sha1(json.dumps(policy, sort_keys=True).encode()).hexdigest()
 
 
-def _has_parse_errors(
-    config: dict,
-    ignore_errors_keywords: List[str] | None = None,
-) -> bool:
-    """Check whether parsed config has errors.
+def _nginx_valid(
+    filename: str,
+    analyzer: NginxAnalyzer,
+    cache: ResultCache | None = None,
+    executor: Executor | None = None,
+    web_roots: WebRootIndex | None = None,
+    deadline: float | None = None,
+    baseline: Collection[str] = (),
+    reporter: Reporter | None = None,
+    templates: TemplateSource | None = None,
+    parse_cache: DiskParseCache | None = None,
+    jobs: int = 1,
+) -> bool | None:
+    """Check whether file with `filename` contains wide nginx configuration.
 
-    Sometimes projects use `include` directives without real files presence in
-    the repo (these files are added as nginx defaults during installation) -
-    https://github.com/nginx/nginx/tree/master/conf. Errors with such keywords
-    are added to `ignored` list by default.
+    If `cache` is passed and all files included to `filename` are the same as
+    in already validated state, stored result is used instead of validation.
 
     Args:
-      config: parsed nginx congfig
-      ignore_errors_keywords: keywords that contained in errors to be ignored
+      filename: nginx config filename
+      analyzer: analyzer with hook policy
+      cache: cache of validation results
+      executor: process pool to parse included files in parallel
+      web_roots: index of repo files deployed as nginx roots
+      deadline: `time.monotonic()` value after which only cached result is used
+      baseline: fingerprints of known findings which don't fail validation
+      reporter: reporter of findings, prints them as text by default
+      templates: source to read config files with rendered templates from
+      parse_cache: cache of parsed files shared by all roots and runs
+      jobs: number of `executor` processes
 
     Returns:
-        (bool): flag whether nginx config has parse errors
+        (bool): flag whether nginx config is valid, `None` if it's not
+          validated because `deadline` is passed
 
     """
-    if config["status"] == "ok":
-        return False
+    reporter = reporter or TextReporter()
+    key = _options_key(analyzer, baseline, templates)
+    with stats.phase("cache"):
+        cached = cache.get(filename, key) if cache is not None else None
+    if cached is not None:
+        stats.increment("cache_hits")
+        for finding in cached.findings:
+            reporter.report(filename, finding)
+        return cached.valid
+    if deadline is not None and time.monotonic() >= deadline:
+        return None
+
+    with stats.phase("parse"):
+        try:
+            config = parse_config(filename, executor, templates or FILE_SYSTEM_SOURCE, parse_cache, deadline, jobs)
+        except ParseDeadlineError:
+            return None
+    with stats.phase("analyze"):
+        findings = analyzer.analyze(config, web_roots, baseline)
+    for finding in findings:
+        reporter.report(filename, finding)
+
+    if cache is not None:
+        cache.put(filename, key, config, not findings, findings)
+    return not findings
+
+
+def _report_deferred(roots: List[str], reporter: Reporter):
+    """Warn about nginx roots which are not validated within time budget."""
+    if roots:
+        stats.increment("deferred", len(roots))
+    for root in roots:
+        reporter.note(
+            f"[WARNING] nginx config `{root}` is not validated within time budget, "
+            "it will be validated first on the next run",
+        )
 
-    ignore_errors_keywords = ignore_errors_keywords or []
-    ignore_errors_keywords.extend([
-        "fastcgi_params", "koi-utf", "koi-win", "mime.types",
-        "scgi_params", "uwsgi_params", "win-utf",
-    ])
 
-    for error in config["errors"]:
-        file, traceback = error["file"], error["error"]
+def _default_root(nginx_config_path: str) -> str:
+    """Return passed `nginx_config_path` or default nginx root if it exists, empty string otherwise."""
+    # use default `nginx.conf` path (or its template) only if it exists (to not
+    # raise error for not frontend repos if they have no default `nginx.conf`),
+    # but if custom `nginx_config_path` was passed - force user to have it
+    if nginx_config_path:
+        return nginx_config_path
+    for path in (DEFAULT_NGINX_CONFIG_PATH, DEFAULT_NGINX_CONFIG_PATH + TEMPLATE_SUFFIX):
+        if os.path.exists(path):
+            return path
+    return ""
 
-        # do not process errors from `ignore_errors_keywords`
-        if any(keyword in traceback for keyword in ignore_errors_keywords):
-            continue
 
-        print(f"[PARSE ERROR] {file}: {traceback}")
-        return True
-    return False
+def _committed_roots(filenames: Sequence[str], nginx_config_path: str, templates: bool = False) -> List[str]:
+    """Return nginx roots to validate for committed `filenames`.
 
+    Committed `*.conf.template` files trigger validation only if `templates`
+    are used.
 
-def _nginx_valid(
-    filename: str,
-    custom_deny_locations: List[str] | None = None,
-    extra_deny_locations: List[str] | None = None,
-    ignore_errors_keywords: List[str] | None = None,
-) -> bool:
-    """Check whether file with `filename` contains wide nginx configuration.
+    """
+    nginx_config_path = _default_root(nginx_config_path)
+    # do nothing when no `nginx_config_path` value was passed and no default
+    # nginx.conf exists
+    if not nginx_config_path:
+        return []
 
-    Search for wide range of files in locations:
+    # try to find nginx.conf files (or their templates) from commited filenames
+    # or use `nginx_config_path` if it exists even if it is not committed when
+    # `*.conf` files commited
+    committed_nginx_configs = list(filter(lambda filename: nginx_config_path in filename.lower(), filenames))
+    conf_regex = ".*\.conf(\.template)?$" if templates else ".*\.conf$"
+    committed_conf_files = list(filter(lambda filename: re.match(conf_regex, filename), filenames))
+    if not committed_nginx_configs and committed_conf_files:
+        committed_nginx_configs = [nginx_config_path]
+    return committed_nginx_configs
 
-      location / {
-        try_files $uri $uri/ /index.php?$query_string;
-      }
 
-    Args:
-      filename: nginx config filename
-      custom_deny_locations: custom deny locations, overrides existing ones
-      extra_deny_locations: extra deny locations, adds to existing ones
-      ignore_errors_keywords: keywords that contained in errors to be ignored
+def _template_source(template_values: str | None, roots: Sequence[str]) -> TemplateSource | None:
+    """Return source of rendered templates, `None` if templates are not used.
 
-    Returns:
-        (bool): flag whether nginx config is valid
+    Templates are used only if their values are passed or some nginx root is
+    template itself, otherwise `*.template` files are never read, even if
+    they are matched by `include` patterns.
 
     """
-    config = crossplane.parse(filename)
-    if _has_parse_errors(config, ignore_errors_keywords):
-        return False
-
-    # crossplane config will contain all files which are attached to main
-    # `nginx.conf` (i.e. `include` directives)
-    try_files_entries, locations_entries = [], []
-    for file in config["config"]:
-        for directive in file["parsed"]:
-            directive["file"] = file["file"]
-            try_files_entries.extend(
-                _search_directive(config=directive, name="try_files"),
-            )
-            locations_entries.extend(
-                _search_directive(config=directive, name="location"),
-            )
+    if template_values:
+        return TemplateSource(load_template_values(template_values))
+    return TemplateSource() if any(is_template(root) for root in roots) else None
 
-    # check whether `try_files` directive contains wide args
-    nginx_valid = True
-    wide_directives = []
-    for directive in try_files_entries:
-        args_lower = [arg.lower() for arg in directive["args"]]
-        if any(item in args_lower for item in ["$uri", "$uri/"]):
-            wide_directives.append(directive)
-            nginx_valid = False
-
-    # check whether all disabled `locations` directives exist, if all such
-    # `locations` would be found, wide `try_files` directives may be ignored
-    if not nginx_valid:
-        if _disabled_locations_exist(
-            locations_entries,
-            custom_deny_locations,
-            extra_deny_locations,
-        ):
-            return True
-
-        # notify user about found wide directives if `nginx` config is not valid
-        for directive in wide_directives:
-            print(
-                f"[ERROR] wide `try_files` directive found: file "
-                f'`{directive["file"]}`, {directive["line"]} line',
-            )
 
-    return nginx_valid
+def _fingerprint_file(fingerprint: str) -> str:
+    """Return nginx config file of finding fingerprint, i.e. `kind:file:server names:subject`."""
+    return fingerprint.split(":", 2)[1] if fingerprint.count(":") >= 2 else ""
+
+
+def _update_baseline(
+    path: str,
+    roots: Sequence[str],
+    analyzer: NginxAnalyzer,
+    web_roots: WebRootIndex | None = None,
+    reporter: Reporter | None = None,
+    templates: TemplateSource | None = None,
+) -> int:
+    """Save fingerprints of all findings of nginx roots to baseline.
+
+    Known findings of files which are not parsed with `roots` are kept, so
+    baseline of other nginx roots isn't lost. Parse errors can't be
+    baselined, they are printed and fail the hook without baseline update,
+    as well as update which would make non empty baseline empty.
+
+    """
+    reporter = reporter or TextReporter()
+    fingerprints, parsed_files, failed = set(), set(), False
+    for root in roots:
+        with stats.phase("parse"):
+            config = parse_config(root, source=templates or FILE_SYSTEM_SOURCE)
+        parsed_files.update(parsing["file"] for parsing in config["config"])
+        with stats.phase("analyze"):
+            findings = analyzer.analyze(config, web_roots)
+        for finding in findings:
+            if finding.kind == PARSE_ERROR:
+                failed = True
+                reporter.report(root, finding)
+            elif finding.fingerprint is not None:
+                fingerprints.add(finding.fingerprint)
+    if failed:
+        return 1
+
+    known = load_baseline(path)
+    fingerprints.update(fingerprint for fingerprint in known if _fingerprint_file(fingerprint) not in parsed_files)
+    if known and not fingerprints:
+        reporter.note(
+            f"[ERROR] Baseline `{path}` is not updated, no known findings are found in "
+            f"{len(roots)} nginx configs. Remove it if all known findings are fixed.",
+        )
+        return 1
+    save_baseline(path, fingerprints)
+    reporter.note(f"Baseline `{path}` is updated with {len(fingerprints)} known findings")
+    return 0
 
 
 def validate_nginx_wide_range(
@@ -239,6 +297,16 @@ def validate_nginx_wide_range(
     custom_deny_locations: List[str] | None = None,
     extra_deny_locations: List[str] | None = None,
     ignore_errors_keywords: List[str] | None = None,
+    sensitive_uris: List[str] | None = None,
+    enabled_rules: List[str] | None = None,
+    use_cache: bool = True,
+    jobs: int | None = None,
+    web_roots: List[str] | None = None,
+    time_budget: float | None = None,
+    baseline: str | None = None,
+    update_baseline: bool = False,
+    reporter: Reporter | None = None,
+    template_values: str | None = None,
 ) -> int:
     """Validate nginx configuration files for `wide` range.
 
@@ -248,6 +316,24 @@ def validate_nginx_wide_range(
       custom_deny_locations: custom deny locations, overrides existing ones
       extra_deny_locations: extra deny locations, adds to existing ones
       ignore_errors_keywords: keywords that contained in errors to be ignored
+      sensitive_uris: uris which must not be served by wide locations
+      enabled_rules: names of optional rules to run, i.e. `autoindex`
+      use_cache: whether to reuse results of already validated configs
+      jobs: number of processes to parse files of nginx root, they are parsed in
+        current process by default
+      web_roots: `NGINX_ROOT=DIR` items to check only real files of repo dirs
+        deployed as nginx roots, if empty dirs are found by roots suffixes,
+        `None` to not check files
+      time_budget: max time in seconds to validate not cached roots, roots
+        left (even partly parsed ones) are validated first by the next run,
+        `None` for no limit
+      baseline: path to file with fingerprints of known findings, only new
+        findings fail validation
+      update_baseline: save all findings to `baseline` instead of validation
+      reporter: reporter of findings, prints them as text by default
+      template_values: path to file with `NAME=value` lines to render
+        `*.template` configs with, templates are used without it only if
+        nginx root is template
 
     Search for wide range of files in locations of `nginx.conf` and included to
     it files:
@@ -260,53 +346,257 @@ def validate_nginx_wide_range(
         (int): flag whether nginx config is valid or not, 0 - success, 1 - error
 
     """
-    filenames = filenames or []
     retval = 0
+    reporter = reporter or TextReporter()
+    default_root = _default_root(nginx_config_path)
+    committed_nginx_configs = _committed_roots(
+        filenames or [],
+        nginx_config_path,
+        bool(template_values) or is_template(default_root),
+    )
+    analyzer = NginxAnalyzer(
+        custom_deny_locations,
+        extra_deny_locations,
+        ignore_errors_keywords,
+        sensitive_uris,
+        enabled_rules,
+    )
+    templates = _template_source(template_values, [default_root] + committed_nginx_configs)
+    if update_baseline:
+        # baseline is made of all nginx roots, not only committed ones
+        roots = list(dict.fromkeys(([default_root] if default_root else []) + committed_nginx_configs))
+        cache_dir = get_cache_dir() if web_roots is not None else None
+        web_root_index = WebRootIndex(parse_web_roots(web_roots), cache_dir) if web_roots is not None else None
+        return _update_baseline(baseline, roots, analyzer, web_root_index, reporter, templates)
+    known = load_baseline(baseline) if baseline else frozenset()
+    key = _options_key(analyzer, known, templates)
+    cache_dir = get_cache_dir() if committed_nginx_configs or time_budget is not None else None
+    pending = PendingRoots(cache_dir, key) if cache_dir and time_budget is not None else None
+    if pending is not None:
+        # roots left by previous runs go first
+        committed_nginx_configs = pending.load() + committed_nginx_configs
+    run_id = get_pre_commit_run_id()
+    if cache_dir and run_id:
+        # skip roots already validated by parallel hook processes of the run
+        committed_nginx_configs = RunMarker(cache_dir, run_id).claim(committed_nginx_configs, key)
+    # result depends on files of web roots as well, so it's not cached, but
+    # web roots indexes are
+    web_root_index = WebRootIndex(parse_web_roots(web_roots), cache_dir) if web_roots is not None else None
+    use_result_cache = cache_dir and use_cache and web_root_index is None
+    cache = ResultCache(cache_dir, templates or FILE_SYSTEM_SOURCE) if use_result_cache else None
+    # rendered templates and other files are parsed once while they are the
+    # same, even if nginx roots including them are changed
+    parse_cache = DiskParseCache(os.path.join(cache_dir, PARSE_CACHE_DIRNAME)) if cache_dir and use_cache else None
+    jobs = jobs or 1
+    # pool processes are started only when some root has enough files to parse
+    executor = ProcessPoolExecutor(jobs) if jobs > 1 else None
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    validated, deferred = [], []
+    try:
+        for config in committed_nginx_configs:
+            success = _nginx_valid(
+                config,
+                analyzer,
+                cache,
+                executor,
+                web_root_index,
+                deadline,
+                known,
+                reporter,
+                templates,
+                parse_cache,
+                jobs,
+            )
+            if success is None:
+                deferred.append(config)
+                continue
+            validated.append(config)
+            if not success:
+                retval = 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if pending is not None:
+            pending.update(validated, deferred)
+    _report_deferred(deferred, reporter)
+    return retval
 
-    # use default `nginx.conf` path only if it exists (to not raise error for
-    # not frontend repos if they have no default `nginx.conf`), but if custom
-    # `nginx_config_path` was passed - force user to have it
-    if not nginx_config_path:
-        if os.path.exists(DEFAULT_NGINX_CONFIG_PATH):
-            nginx_config_path = DEFAULT_NGINX_CONFIG_PATH
-        # do nothing when no `nginx_config_path` value was passed and no
-        # default nginx.conf exists
-        else:
-            return retval
 
-    # try to find nginx.conf files from commited filenames or use `nginx_config_path`
-    # if it exists even if it is not committed when `*.conf` files commited
-    committed_nginx_configs = list(filter(lambda filename: nginx_config_path in filename.lower(), filenames))
-    committed_conf_files = list(filter(lambda filename: re.match(".*\.conf$", filename), filenames))
-    if not committed_nginx_configs and committed_conf_files:
-        committed_nginx_configs = [nginx_config_path]
+def _range_commits(revision_range: str) -> List[str]:
+    """Return commits of `A..B` range from the oldest to the newest.
 
-    for config in committed_nginx_configs:
-        success = _nginx_valid(
-            config,
-            custom_deny_locations,
-            extra_deny_locations,
-            ignore_errors_keywords,
-        )
-        if not success:
-            retval = 1
-    return retval
+    If range is empty, it's taken from `pre-commit` env vars of `pre-push`
+    stage. If `A` is missing (i.e. new branch is pushed), all commits of `B`
+    which are not pushed to any remote are returned.
 
+    """
+    if revision_range:
+        start, _, end = revision_range.partition("..")
+    else:
+        start = os.environ.get("PRE_COMMIT_FROM_REF") or os.environ.get("PRE_COMMIT_SOURCE", "")
+        end = os.environ.get("PRE_COMMIT_TO_REF") or os.environ.get("PRE_COMMIT_ORIGIN", "")
+    end = end or "HEAD"
+    if not start.strip("0"):
+        return cmd_output("git", "rev-list", "--reverse", end, "--not", "--remotes").split()
+    return cmd_output("git", "rev-list", "--reverse", f"{start}..{end}").split()
 
-def main(argv: Sequence[str] | None = None) -> int:
-    """Process hook args before calling main `validate_nginx_wide_range` action."""
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "filenames",
-        nargs="*",
-        help="Committed files",
+
+def _closure_paths(payload: Dict) -> Tuple[str, ...]:
+    """Return paths which determine state of nginx config include closure.
+
+    These are all parsed files and static parts of `include` patterns, i.e.
+    `nginx.d` dir for `nginx.d/*.conf` pattern, so adding new file to the dir
+    changes state of closure.
+
+    """
+    paths = [config["file"] for config in payload["config"]]
+    for pattern in iter_include_patterns(payload):
+        parts = pattern.split(os.sep)
+        static = list(itertools.takewhile(lambda part: not glob.has_magic(part), parts))
+        paths.append(os.sep.join(static) or ".")
+    return tuple(dict.fromkeys(paths))
+
+
+def validate_nginx_history(
+    revision_range: str,
+    nginx_config_path: str = "",
+    custom_deny_locations: List[str] | None = None,
+    extra_deny_locations: List[str] | None = None,
+    ignore_errors_keywords: List[str] | None = None,
+    sensitive_uris: List[str] | None = None,
+    enabled_rules: List[str] | None = None,
+    baseline: str | None = None,
+    reporter: Reporter | None = None,
+) -> int:
+    """Validate nginx config at every commit of `A..B` range (i.e. pushed ones).
+
+    Files are read from git objects through one `git cat-file --batch`
+    process. Commits where all files of nginx config include closure are the
+    same as in already validated commit are skipped, so validation is run
+    once per distinct state of config.
+
+    Args:
+      revision_range: commits range, i.e. `origin/main..HEAD`, empty to take
+        it from `pre-commit` env vars
+      nginx_config_path: path to main `nginx.conf` file relative to repo root
+      custom_deny_locations: custom deny locations, overrides existing ones
+      extra_deny_locations: extra deny locations, adds to existing ones
+      ignore_errors_keywords: keywords that contained in errors to be ignored
+      sensitive_uris: uris which must not be served by wide locations
+      enabled_rules: names of optional rules to run, i.e. `autoindex`
+      baseline: path to file with fingerprints of known findings, only new
+        findings fail validation
+      reporter: reporter of findings, prints them as text by default, nginx
+        root of findings is reported as `<commit>:<path>`
+
+    Returns:
+        (int): flag whether nginx config is valid in all commits, 0 - success, 1 - error
+
+    """
+    nginx_config_path = nginx_config_path or DEFAULT_NGINX_CONFIG_PATH
+    analyzer = NginxAnalyzer(
+        custom_deny_locations,
+        extra_deny_locations,
+        ignore_errors_keywords,
+        sensitive_uris,
+        enabled_rules,
     )
-    parser.add_argument(
-        "--nginx_config_path",
-        nargs=1,
-        default=[""],
-        help="Nginx config path",
+    reporter = reporter or TextReporter()
+    known = load_baseline(baseline) if baseline else frozenset()
+    retval = 0
+    # states of already validated closures: ids of closure paths by paths
+    validated: Dict[Tuple[str, ...], Set[Tuple[str | None, ...]]] = {}
+    batch = CatFileBatch()
+    try:
+        for commit in _range_commits(revision_range):
+            source = GitTreeSource(batch, batch.commit_tree(commit))
+            if source.object_id(nginx_config_path) is None:
+                continue
+            if any(tuple(map(source.object_id, paths)) in states for paths, states in validated.items()):
+                continue
+
+            with stats.phase("parse"):
+                config = parse_config(nginx_config_path, source=source)
+            paths = _closure_paths(config)
+            validated.setdefault(paths, set()).add(tuple(map(source.object_id, paths)))
+
+            with stats.phase("analyze"):
+                findings = analyzer.analyze(config, baseline=known)
+            if findings:
+                retval = 1
+                reporter.note(f"[ERROR] nginx config `{nginx_config_path}` is not valid in commit `{commit[:12]}`:")
+                for finding in findings:
+                    reporter.report(f"{commit}:{nginx_config_path}", finding)
+    finally:
+        batch.close()
+    return retval
+
+
+def validate_nginx_dump(
+    path: str,
+    custom_deny_locations: List[str] | None = None,
+    extra_deny_locations: List[str] | None = None,
+    ignore_errors_keywords: List[str] | None = None,
+    sensitive_uris: List[str] | None = None,
+    enabled_rules: List[str] | None = None,
+    reporter: Reporter | None = None,
+) -> int:
+    """Validate nginx config from `nginx -T` dump (i.e. made in docker image).
+
+    Dump is split into virtual files in single pass, `include` directives are
+    resolved against them, nothing is written to disk.
+
+    Args:
+      path: path to file with dump, `-` to read it from stdin
+      custom_deny_locations: custom deny locations, overrides existing ones
+      extra_deny_locations: extra deny locations, adds to existing ones
+      ignore_errors_keywords: keywords that contained in errors to be ignored
+      sensitive_uris: uris which must not be served by wide locations
+      enabled_rules: names of optional rules to run, i.e. `autoindex`
+      reporter: reporter of findings, prints them as text by default
+
+    Returns:
+        (int): flag whether nginx config is valid or not, 0 - success, 1 - error
+
+    """
+    reporter = reporter or TextReporter()
+    with stats.phase("parse"):
+        if path == "-":
+            source = read_dump(sys.stdin)
+        else:
+            with open(path, encoding="utf-8", errors="replace") as dump_file:
+                source = read_dump(dump_file)
+        if source.root is None:
+            reporter.note(f"[ERROR] no configuration files found in nginx dump `{path}`")
+            return 1
+        config = parse_config(source.root, source=source)
+
+    analyzer = NginxAnalyzer(
+        custom_deny_locations,
+        extra_deny_locations,
+        ignore_errors_keywords,
+        sensitive_uris,
+        enabled_rules,
     )
+    with stats.phase("analyze"):
+        findings = analyzer.analyze(config)
+    for finding in findings:
+        reporter.report(source.root, finding)
+    return int(bool(findings))
+
+
+def _read_files_from(path: str) -> List[str]:
+    """Read NUL-delimited filenames from file or stdin if `path` is `-`."""
+    if path == "-":
+        content = sys.stdin.buffer.read()
+    else:
+        with open(path, "rb") as files_file:
+            content = files_file.read()
+    return [os.fsdecode(name) for name in content.split(b"\0") if name]
+
+
+def _add_policy_arguments(parser: argparse.ArgumentParser):
+    """Add args of validation policy shared by hook and `scan` command."""
     parser.add_argument(
         "--custom_deny_locations",
         nargs="*",
@@ -332,14 +622,324 @@ def main(argv: Sequence[str] | None = None) -> int:
         ),
         action="append",
     )
-    args = parser.parse_args(argv)
+    parser.add_argument(
+        "--sensitive_uris",
+        nargs="*",
+        default=[],
+        help="Uris which must not be served by wide locations (i.e. '/.env')",
+        action="append",
+    )
+    parser.add_argument(
+        "--sensitive_uris_file",
+        nargs=1,
+        default=[""],
+        help="Path to file with uris which must not be served by wide locations, one per line",
+    )
+    parser.add_argument(
+        "--enable_rules",
+        nargs="*",
+        default=[],
+        choices=list(RULES),
+        help="Optional rules to check as well",
+        action="append",
+    )
 
-    return validate_nginx_wide_range(
-        args.filenames,
-        args.nginx_config_path[0],
+
+def _policy_from_args(args: argparse.Namespace) -> Tuple[List[str], List[str], List[str], List[str], List[str]]:
+    """Return deny locations, ignored keywords, sensitive uris and enabled rules."""
+    sensitive_uris = [item for sublist in args.sensitive_uris for item in sublist]
+    if args.sensitive_uris_file[0]:
+        with open(args.sensitive_uris_file[0]) as uris_file:
+            sensitive_uris.extend(line.strip() for line in uris_file if line.strip())
+
+    return (
         [item for sublist in args.custom_deny_locations for item in sublist],
         [item for sublist in args.extra_deny_locations for item in sublist],
         [item for sublist in args.ignore_errors_keywords for item in sublist],
+        sensitive_uris,
+        [item for sublist in args.enable_rules for item in sublist],
+    )
+
+
+def scan_main(argv: Sequence[str] | None = None) -> int:
+    """Validate nginx configs of all repos checked out to directories."""
+    parser = argparse.ArgumentParser(
+        prog="check-nginx-wide-range scan",
+        description="Validate nginx configs of all repos checked out to directories.",
+    )
+    parser.add_argument(
+        "directories",
+        nargs="+",
+        help="Directories with checked out repos",
+    )
+    _add_policy_arguments(parser)
+    parser.add_argument(
+        "--root_names",
+        nargs="*",
+        default=[],
+        help="File names of nginx root configs, default: nginx.conf",
+        action="append",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(REPORTERS),
+        default="text",
+        help="Output format, `jsonl` prints JSON line per nginx config, `sarif` prints SARIF log",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        help="Number of processes, all cores by default",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=os.path.join(get_user_cache_dir(), "nginx-parse"),
+        help="Dir of parsed files cache, shared by all processes and scans",
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Don't use parsed files cache",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="I/N",
+        help="Validate only I-th of N shards of nginx configs, balanced by their include closures sizes",
+    )
+    parser.add_argument(
+        "--shard_output",
+        help="Path to write shard results to, to combine them with `merge` command",
+    )
+    args = parser.parse_args(argv)
+    try:
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as error:
+        parser.error(str(error))
+    if args.shard_output and not shard:
+        parser.error("--shard_output requires --shard")
+
+    analyzer = NginxAnalyzer(*_policy_from_args(args))
+    root_names = [item for sublist in args.root_names for item in sublist] or DEFAULT_ROOT_NAMES
+    roots, total = shard_roots(args.directories, root_names, *shard) if shard else (None, 0)
+    results = scan(
+        args.directories,
+        analyzer,
+        root_names,
+        args.jobs,
+        None if args.no_cache else args.cache_dir,
+        roots,
+    )
+    if args.shard_output:
+        results = save_shard(args.shard_output, args.shard, total, _policy_key(analyzer), results)
+    return _report(results, args.format)
+
+
+def _report(results: Iterable[ScanResult], output_format: str) -> int:
+    """Print scan results as soon as they are ready and return exit code."""
+    reporter = SarifReporter() if output_format == "sarif" else None
+    repos, roots, invalid = set(), 0, 0
+    for result in results:
+        repos.add(result.repo)
+        roots += 1
+        invalid += not result.valid
+        if output_format == "jsonl":
+            print(json.dumps(dataclasses.asdict(result)), flush=True)
+        elif reporter is not None:
+            errors = [Finding(kind=SCAN_ERROR, message=f"[ERROR] {result.error}")] if result.error else []
+            for finding in errors or result.findings:
+                reporter.report(result.root, finding)
+        elif not result.valid:
+            print(f"[FAIL] {result.root}")
+            for message in [result.error] if result.error else result.findings:
+                print(f"  {message}", flush=True)
+
+    summary = f"Scanned {roots} nginx configs in {len(repos)} repos, {invalid} of them are not valid."
+    if reporter is not None:
+        reporter.close()
+        reporter.note(summary)
+    elif output_format == "text":
+        print(summary)
+    return int(bool(invalid))
+
+
+def merge_main(argv: Sequence[str] | None = None) -> int:
+    """Combine results of `scan --shard` artifacts into one report."""
+    parser = argparse.ArgumentParser(
+        prog="check-nginx-wide-range merge",
+        description="Combine results of `scan --shard` artifacts into one report.",
+    )
+    parser.add_argument(
+        "artifacts",
+        nargs="+",
+        help="Files written by `scan --shard_output` of all shards",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(REPORTERS),
+        default="text",
+        help="Output format, `jsonl` prints JSON line per nginx config, `sarif` prints SARIF log",
+    )
+    args = parser.parse_args(argv)
+    try:
+        results = load_shards(args.artifacts)
+    except (OSError, ValueError) as error:
+        print(f"[ERROR] {error}")
+        return 1
+    return _report(sorted(results, key=lambda result: (result.repo, result.root)), args.format)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Process hook args before calling main `validate_nginx_wide_range` action.
+
+    If the first arg is `scan` or `merge`, run `scan_main` or `merge_main`
+    command instead.
+
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "scan":
+        return scan_main(argv[1:])
+    if argv and argv[0] == "merge":
+        return merge_main(argv[1:])
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "filenames",
+        nargs="*",
+        help="Committed files",
+    )
+    parser.add_argument(
+        "--nginx_config_path",
+        nargs=1,
+        default=[""],
+        help="Nginx config path",
+    )
+    _add_policy_arguments(parser)
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Validate nginx configs even if they were already validated in the same state",
+    )
+    parser.add_argument(
+        "--files-from",
+        help="Path to file with NUL-delimited committed files, `-` to read them from stdin",
+    )
+    parser.add_argument(
+        "--range",
+        action="store_true",
+        help=(
+            "Validate nginx config at every commit of `--revision_range` instead of "
+            "working tree, committed files are ignored"
+        ),
+    )
+    parser.add_argument(
+        "--revision_range",
+        default="",
+        metavar="A..B",
+        help="Commits range to validate with `--range`, taken from `pre-push` stage by default",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes to parse files included to nginx config, files are parsed in hook process by default",
+    )
+    parser.add_argument(
+        "--web_roots",
+        nargs="*",
+        metavar="NGINX_ROOT=DIR",
+        help=(
+            "Check only sensitive files which really exist in repo dirs deployed as "
+            "nginx roots, dirs are found by roots suffixes if they are not passed"
+        ),
+    )
+    parser.add_argument(
+        "--time_budget",
+        type=float,
+        help=(
+            "Max time in seconds to validate nginx configs which are not cached, "
+            "configs left are validated first on the next run"
+        ),
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Path to file with known findings, only new findings fail the hook",
+    )
+    parser.add_argument(
+        "--update_baseline",
+        action="store_true",
+        help="Save all findings of nginx configs to `--baseline` file instead of validation",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(REPORTERS),
+        default="text",
+        help=(
+            "Output format of findings, `jsonl` prints JSON line per finding, `sarif` prints "
+            "SARIF log, other messages are printed to stderr for them"
+        ),
+    )
+    parser.add_argument(
+        "--template_values",
+        help=(
+            "Path to file with `NAME=value` lines to render `${NAME}` placeholders "
+            "of `*.template` nginx configs with, like `envsubst` does"
+        ),
+    )
+    parser.add_argument(
+        "--nginx_dump",
+        help="Validate `nginx -T` output from file instead of nginx config, `-` to read it from stdin",
+    )
+    args = parser.parse_args(argv)
+    try:
+        parse_web_roots(args.web_roots or [])
+        if args.baseline:
+            load_baseline(args.baseline)
+        if args.template_values:
+            load_template_values(args.template_values)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.update_baseline and not args.baseline:
+        parser.error("--update_baseline requires --baseline")
+
+    filenames = list(args.filenames)
+    if args.files_from:
+        filenames.extend(_read_files_from(args.files_from))
+
+    reporter = REPORTERS[args.format]()
+    try:
+        with stats.collect("check-nginx-wide-range"):
+            return _validate(args, filenames, reporter)
+    finally:
+        reporter.close()
+
+
+def _validate(args: argparse.Namespace, filenames: List[str], reporter: Reporter) -> int:
+    """Run validation selected by hook args."""
+    if args.nginx_dump:
+        return validate_nginx_dump(args.nginx_dump, *_policy_from_args(args), reporter)
+    if args.range:
+        return validate_nginx_history(
+            args.revision_range,
+            args.nginx_config_path[0],
+            *_policy_from_args(args),
+            args.baseline,
+            reporter,
+        )
+
+    stats.increment("files", len(filenames))
+    return validate_nginx_wide_range(
+        filenames,
+        args.nginx_config_path[0],
+        *_policy_from_args(args),
+        not args.no_cache,
+        args.jobs,
+        args.web_roots,
+        args.time_budget,
+        args.baseline,
+        args.update_baseline,
+        reporter,
+        args.template_values,
     )
 
 
@@ -0,0 +1,43 @@
+import argparse
+
+from pre_commit_hooks.stats import STATS_ENV_VAR, aggregate, format_report, get_stats_log_path, read_records
+
+
+def parse_args(argv=None):
+    """Provide CLI for hooks utilities."""
+    parser = argparse.ArgumentParser(
+        prog="saritasa-hooks",
+        description="Utilities for Saritasa pre-commit hooks.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help=(
+            "Show percentiles and histograms of hooks invocations durations. "
+            f"Invocations are logged only when `{STATS_ENV_VAR}=1` env var is set."
+        ),
+    )
+    stats_parser.add_argument(
+        "--log",
+        default=get_stats_log_path(),
+        help="Path to stats log.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    durations = aggregate(read_records(args.log))
+    if not durations:
+        print(f"No hooks invocations are logged yet, set `{STATS_ENV_VAR}=1` env var to log them.")
+        return 0
+
+    print(format_report(durations))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
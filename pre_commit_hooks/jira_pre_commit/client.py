@@ -0,0 +1,241 @@
+import base64
+import http.client
+import json
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Set
+from urllib.parse import quote, urlsplit
+
+from pre_commit_hooks.util import file_lock
+
+# Jira issue exists and is not resolved yet
+OPEN = "open"
+# Jira issue exists, but its status category is `Done`
+DONE = "done"
+# Jira issue doesn't exist or current user has no access to it
+MISSING = "missing"
+
+ISSUES_CACHE_FILENAME = "jira-issues.json"
+# lock of issues cache file shared by hook processes running in parallel
+ISSUES_LOCK_FILENAME = "jira-issues.lock"
+
+
+class IssuesCache:
+    """On-disk cache of Jira issues states shared across commits.
+
+    Open issues are cached for `ttl` seconds, missing and done ones for
+    `negative_ttl` seconds, because they can be created or reopened soon.
+
+    """
+
+    def __init__(self, cache_dir: str, ttl: float, negative_ttl: float):
+        self.path = os.path.join(cache_dir, ISSUES_CACHE_FILENAME)
+        self.lock_path = os.path.join(cache_dir, ISSUES_LOCK_FILENAME)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = self._load()
+
+    def _load(self) -> Dict[str, List]:
+        """Load cached issues states, empty cache if file is missing or broken."""
+        try:
+            with open(self.path) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> str | None:
+        """Return cached state of issue if it's not expired."""
+        state, expires_at = self.entries.get(key, (None, 0))
+        return state if expires_at > time.time() else None
+
+    def update(self, states: Dict[str, str]):
+        """Store issues states and drop expired ones.
+
+        Cache file is reloaded under lock, so states stored by concurrent hook
+        processes since it was loaded are kept.
+
+        """
+        now = time.time()
+        with file_lock(self.lock_path):
+            entries = {**self.entries, **self._load()}
+            self.entries = {key: entry for key, entry in entries.items() if entry[1] > now}
+            for key, state in states.items():
+                self.entries[key] = [state, now + (self.ttl if state == OPEN else self.negative_ttl)]
+
+            descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+            with os.fdopen(descriptor, "w") as temp_file:
+                json.dump(self.entries, temp_file)
+            os.replace(temp_path, self.path)
+
+
+def _issue_state(status: int, body: bytes) -> str | None:
+    """Return issue state from Jira REST API response, `None` if unknown."""
+    if status == 404:
+        return MISSING
+    if status != 200:
+        return None
+    try:
+        category = json.loads(body)["fields"]["status"]["statusCategory"]["key"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return DONE if category == "done" else OPEN
+
+
+def get_auth_headers() -> Dict[str, str]:
+    """Return Jira auth headers from `JIRA_USER` / `JIRA_API_TOKEN` env vars.
+
+    If only `JIRA_API_TOKEN` is set, it's used as personal access token.
+
+    """
+    user, token = os.environ.get("JIRA_USER"), os.environ.get("JIRA_API_TOKEN")
+    if user and token:
+        credentials = base64.b64encode(f"{user}:{token}".encode()).decode()
+        return {"Authorization": f"Basic {credentials}"}
+    if token:
+        return {"Authorization": f"Bearer {token}"}
+    return {}
+
+
+class JiraClient:
+    """Client to check Jira issues states through Jira REST API.
+
+    Connections are kept alive in a pool and reused by concurrent requests.
+    All requests of `issue_states` call share the same `timeout` budget, so
+    slow or unreachable Jira can't delay commit for longer. Issues which state
+    can't be fetched in time are returned as `None` (unknown).
+
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 2.0,
+        cache: IssuesCache | None = None,
+        pool_size: int = 4,
+        headers: Dict[str, str] | None = None,
+    ):
+        parsed_url = urlsplit(url)
+        self.url = url.rstrip("/")
+        self.https = parsed_url.scheme == "https"
+        self.netloc = parsed_url.netloc
+        self.path = parsed_url.path.rstrip("/")
+        self.timeout = timeout
+        self.cache = cache
+        self.pool_size = pool_size
+        self.headers = {"Accept": "application/json", **(headers or {})}
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        # connections of running requests, they are shut down on deadline
+        self._busy: Set[http.client.HTTPConnection] = set()
+
+    def _connect(self, timeout: float) -> http.client.HTTPConnection:
+        """Return connection from pool or create new one."""
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = connection_class(self.netloc, timeout=timeout)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def _fetch_state(self, key: str, deadline: float) -> str | None:
+        """Fetch state of `key` issue from Jira until `deadline`."""
+        # kept alive connection could be already closed by server, so retry
+        for _ in range(2):
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return None
+
+            connection = self._connect(timeout)
+            self._busy.add(connection)
+            try:
+                connection.request(
+                    "GET",
+                    f"{self.path}/rest/api/2/issue/{quote(key)}?fields=status",
+                    headers=self.headers,
+                )
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                continue
+            finally:
+                self._busy.discard(connection)
+
+            self._pool.put(connection)
+            return _issue_state(response.status, body)
+        return None
+
+    def _fetch_states(self, keys: queue.SimpleQueue, fetched: Dict[str, str | None], deadline: float):
+        """Fetch states of issues from `keys` queue until it's empty."""
+        while True:
+            try:
+                key = keys.get_nowait()
+            except queue.Empty:
+                return
+            fetched[key] = self._fetch_state(key, deadline)
+
+    def issue_states(self, keys: Iterable[str]) -> Dict[str, str | None]:
+        """Return states of Jira issues with `keys`.
+
+        Args:
+          keys: Jira issues keys, i.e. `JIRA-1234`
+
+        Returns:
+          (dict): map of issue key to its state, `None` if state is unknown
+
+        """
+        keys = list(dict.fromkeys(keys))
+        states = {key: self.cache.get(f"{self.url}|{key}") if self.cache else None for key in keys}
+        missing = [key for key, state in states.items() if state is None]
+        if not missing:
+            return states
+
+        # socket timeouts limit each operation only, i.e. slowly sent response
+        # can take longer, so whole batch is waited for until the deadline
+        deadline = time.monotonic() + self.timeout
+        pending: queue.SimpleQueue = queue.SimpleQueue()
+        for key in missing:
+            pending.put(key)
+        results: Dict[str, str | None] = {}
+        # requests still running after deadline (i.e. connecting ones) are
+        # not waited for, daemon threads don't delay exit of hook process
+        threads = [
+            threading.Thread(target=self._fetch_states, args=(pending, results, deadline), daemon=True)
+            for _ in range(min(len(missing), self.pool_size))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        if any(thread.is_alive() for thread in threads):
+            self._abort_requests()
+        fetched = {key: results.get(key) for key in missing}
+        states.update(fetched)
+
+        if self.cache is not None:
+            self.cache.update({f"{self.url}|{key}": state for key, state in fetched.items() if state is not None})
+        return states
+
+    def _abort_requests(self):
+        """Shut down connections of running requests, so their threads stop soon.
+
+        Connections which are still connecting have no socket yet, their
+        threads are stopped by connect timeout.
+
+        """
+        for connection in list(self._busy):
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except (AttributeError, OSError):
+                continue
+
+    def close(self):
+        """Close all pooled connections."""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
@@ -4,17 +4,28 @@ import argparse
 import io
 import re
 import sys
+from typing import FrozenSet, List, Tuple
 
-from pre_commit_hooks.util import GIT_COMMENT_STRING, strip_comment_section
+from pre_commit_hooks import stats
+from pre_commit_hooks.jira_pre_commit.client import OPEN, IssuesCache, JiraClient, get_auth_headers
+from pre_commit_hooks.jira_pre_commit.project_keys import load_project_keys
+from pre_commit_hooks.regex_guard import GuardedRegex, RegexTimeoutError
+from pre_commit_hooks.util import get_cache_dir, get_git_comment_string, strip_comment_section
 
 # Error message printed when no JIRA Task ID is found
 NO_TASK_ERROR_MSG = "[ERROR] Aborting commit. Your commit message is missing a Jira Task ID, i.e. JIRA-1234."
+# Error message printed when found Jira Task IDs don't belong to known projects
+UNKNOWN_PROJECT_ERROR_MSG = (
+    "[ERROR] Aborting commit. Jira Task IDs {tasks} don't belong to known Jira projects, i.e. JIRA-1234."
+)
+# Error message printed when Jira Tasks don't exist or are done
+CLOSED_TASK_ERROR_MSG = "[ERROR] Aborting commit. Jira Tasks {tasks} don't exist or are already done."
 # Error message when the regex is inavlid
 INVALID_REGEX_ERROR_MSG = "[ERROR] Invalid regex '{pattern}': {error}"
 # Message about excluded commit messsage
 EXCLUDED_COMMIT_MSG = "Commit matches exclude pattern '{pattern}', skipping JIRA check."
-# Regex pattern to match a JIRA Task ID (e.g. SD-373)
-JIRA_TASK_REGEX = re.compile(r"[A-Z][A-Z0-9]+-\d+")
+# Regex pattern to match a JIRA Task ID (e.g. SD-373) with project key group
+JIRA_TASK_REGEX = re.compile(r"([A-Z][A-Z0-9]+)-\d+")
 
 
 def parse_args(argv=None):
@@ -33,6 +44,12 @@ def parse_args(argv=None):
         nargs=1,
         help="Path to `COMMIT_EDITMSG` file.",
     )
+    add_policy_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def add_policy_arguments(parser: argparse.ArgumentParser):
+    """Add args of commit message policy shared by hook and `pre-receive` entry."""
     parser.add_argument(
         "--exclude-pattern", "-e",
         action="append",
@@ -41,13 +58,59 @@ def parse_args(argv=None):
             "Can be specified multiple times."
         ),
     )
+    parser.add_argument(
+        "--project-keys-file",
+        help=(
+            "Path to file with allowed Jira project keys (one or few per line). "
+            "If passed, Jira Task IDs of other projects (i.e. `UTF-8`) are ignored."
+        ),
+    )
+    parser.add_argument(
+        "--jira-url",
+        help=(
+            "Jira URL to check that Jira Task exists and is not done (i.e. https://example.atlassian.net). "
+            "Credentials are taken from `JIRA_USER` and `JIRA_API_TOKEN` env vars."
+        ),
+    )
+    parser.add_argument(
+        "--jira-timeout",
+        default=2.0,
+        type=float,
+        help="Max time in seconds to wait for Jira, check is skipped if Jira doesn't respond in time.",
+    )
+    parser.add_argument(
+        "--jira-cache-ttl",
+        default=24 * 60 * 60,
+        type=float,
+        help="Time in seconds to cache existing Jira Tasks.",
+    )
+    parser.add_argument(
+        "--jira-negative-cache-ttl",
+        default=10 * 60,
+        type=float,
+        help="Time in seconds to cache missing or done Jira Tasks.",
+    )
 
-    return parser.parse_args(argv)
+
+def get_jira_client(args: argparse.Namespace) -> JiraClient | None:
+    """Return client to check Jira Tasks if `--jira-url` arg is passed."""
+    if not args.jira_url:
+        return None
+    cache_dir = get_cache_dir()
+    return JiraClient(
+        url=args.jira_url,
+        timeout=args.jira_timeout,
+        cache=IssuesCache(cache_dir, args.jira_cache_ttl, args.jira_negative_cache_ttl) if cache_dir else None,
+        headers=get_auth_headers(),
+    )
 
 
 def is_commit_excluded(commit_message: str, patterns: list[str]) -> bool:
     """Check if commit message should be excluded from the Jira Task ID check.
 
+    Patterns which can backtrack catastrophically are matched under time
+    budget, hook fails if it's exceeded.
+
     Args:
         commit_message: commit message text
         patterns: list of regex patterns to check commit message against
@@ -58,43 +121,114 @@ def is_commit_excluded(commit_message: str, patterns: list[str]) -> bool:
     """
     for pattern in patterns:
         try:
-            if re.search(pattern, commit_message):
+            if GuardedRegex(pattern).search(commit_message):
                 print(EXCLUDED_COMMIT_MSG.format(pattern=pattern))
                 return True
-        except re.PatternError as e:
+        except re.error as e:
             print(INVALID_REGEX_ERROR_MSG.format(pattern=pattern, error=e))
             sys.exit(1)
+        except RegexTimeoutError as e:
+            print(e)
+            sys.exit(1)
     return False
 
 
-def validate_task_in_commit(commit_filename: str, exclude_patterns: list) -> int:
+def find_jira_tasks(
+    commit_message: str,
+    project_keys: FrozenSet[str] | None = None,
+) -> Tuple[List[str], List[str]]:
+    """Find Jira Task IDs in commit message in a single scan.
+
+    Args:
+        commit_message: commit message text
+        project_keys: allowed Jira project keys, any project is allowed if not passed
+
+    Returns:
+        (tuple): found Jira Task IDs of known projects and rejected ones of other projects
+
+    """
+    tasks, unknown_tasks = [], []
+    for match in JIRA_TASK_REGEX.finditer(commit_message):
+        if project_keys is None or match.group(1) in project_keys:
+            tasks.append(match.group(0))
+        else:
+            unknown_tasks.append(match.group(0))
+    return tasks, unknown_tasks
+
+
+def get_no_task_error(unknown_tasks: List[str]) -> str:
+    """Return error of commit message without Jira Task IDs of known projects."""
+    if unknown_tasks:
+        return UNKNOWN_PROJECT_ERROR_MSG.format(tasks=", ".join(unknown_tasks))
+    return NO_TASK_ERROR_MSG
+
+
+def tasks_exist(tasks: List[str], jira_client: JiraClient) -> bool:
+    """Check that at least one of tasks exists in Jira and is not done.
+
+    If Jira is not available, tasks states are unknown and check passes.
+
+    Args:
+        tasks: Jira Task IDs from commit message
+        jira_client: client to fetch tasks states from Jira
+
+    Returns:
+        (bool): whether commit message refers to open Jira task
+
+    """
+    with stats.phase("jira"):
+        states = jira_client.issue_states(tasks)
+    if any(state in (OPEN, None) for state in states.values()):
+        return True
+
+    print(CLOSED_TASK_ERROR_MSG.format(tasks=", ".join(states)))
+    return False
+
+
+def clean_commit_message(commit_message: str) -> str:
+    """Return commit message without comment section and comment lines."""
+    commit_message = strip_comment_section(commit_message)
+    commit_message = commit_message.strip()
+
+    # Strip commit message from comment lines (usually added by `git rebase` or `git commit --amend`)
+    # To avoid false positives (i.e. there could be a Jira ID in the comments, but not in the actual commit message)
+    lines = commit_message.splitlines()
+    comment_string = get_git_comment_string()
+    non_comment_lines = [line for line in lines if not line.startswith(comment_string)]
+    return "\n".join(non_comment_lines)
+
+
+def validate_task_in_commit(
+    commit_filename: str,
+    exclude_patterns: list,
+    project_keys: FrozenSet[str] | None = None,
+    jira_client: JiraClient | None = None,
+) -> int:
     """Check commit message for Jira Task ID, unless it matches an exclusion pattern.
 
     Args:
         commit_filename: path to the `COMMIT_EDITMSG` file
         exclude_patterns: list of regex patterns to check commit message against
+        project_keys: allowed Jira project keys, any project is allowed if not passed
+        jira_client: client to check that Jira Task exists, not checked if not passed
 
     Returns:
         (int): 0 if validation passes or skipped, 1 if validation fails
 
     """
     with io.open(commit_filename, "r") as commit_message_file:
-        commit_message = commit_message_file.read()
-        commit_message = strip_comment_section(commit_message)
-        commit_message = commit_message.strip()
-
-    # Strip commit message from comment lines (usually added by `git rebase` or `git commit --amend`)
-    # To avoid false positives (i.e. there could be a Jira ID in the comments, but not in the actual commit message)
-    lines = commit_message.splitlines()
-    non_comment_lines = [line for line in lines if not line.startswith(GIT_COMMENT_STRING)]
-    commit_message = "\n".join(non_comment_lines)
+        commit_message = clean_commit_message(commit_message_file.read())
 
     # If any exclusion pattern matches, skip Jira checks
     if exclude_patterns and is_commit_excluded(commit_message, exclude_patterns):
         return 0
 
-    if not re.search(JIRA_TASK_REGEX, commit_message):
-        print(NO_TASK_ERROR_MSG)
+    tasks, unknown_tasks = find_jira_tasks(commit_message, project_keys)
+    if not tasks:
+        print(get_no_task_error(unknown_tasks))
+        return 1
+
+    if jira_client is not None and not tasks_exist(tasks, jira_client):
         return 1
 
     # If commit message has a Jira Task ID
@@ -112,7 +246,15 @@ def main(argv=None) -> int:
 
     """
     args = parse_args(argv)
-    return validate_task_in_commit(args.commit_filename[0], args.exclude_pattern)
+    project_keys = load_project_keys(args.project_keys_file) if args.project_keys_file else None
+
+    jira_client = get_jira_client(args)
+    try:
+        with stats.collect("jira-pre-commit"):
+            return validate_task_in_commit(args.commit_filename[0], args.exclude_pattern, project_keys, jira_client)
+    finally:
+        if jira_client is not None:
+            jira_client.close()
 
 
 if __name__ == "__main__":
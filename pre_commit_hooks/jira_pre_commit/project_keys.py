@@ -0,0 +1,29 @@
+import re
+from typing import FrozenSet
+
+# comment till the end of line in project keys file
+COMMENT_REGEX = re.compile(r"#[^\n]*")
+
+
+def load_project_keys(path: str) -> FrozenSet[str]:
+    """Load allowlist of Jira project keys from file.
+
+    File is parsed as a whole with a few string operations, which is faster
+    than storing parsed keys anywhere, i.e. 5000 keys are loaded in less
+    than a millisecond.
+
+    Args:
+      path: path to file with project keys, one or few per line, `#` starts
+        comment, i.e.
+
+        # Main Jira instance
+        ABC
+        DEF, GHI
+
+    Returns:
+      (frozenset): set of project keys
+
+    """
+    with open(path) as keys_file:
+        text = keys_file.read()
+    return frozenset(COMMENT_REGEX.sub("", text).replace(",", " ").upper().split())
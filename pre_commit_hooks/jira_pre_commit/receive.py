@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import re
+import sys
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set, Tuple
+
+from pre_commit_hooks import stats
+from pre_commit_hooks.jira_pre_commit.client import OPEN, JiraClient
+from pre_commit_hooks.jira_pre_commit.main import (
+    CLOSED_TASK_ERROR_MSG,
+    INVALID_REGEX_ERROR_MSG,
+    add_policy_arguments,
+    clean_commit_message,
+    find_jira_tasks,
+    get_jira_client,
+    get_no_task_error,
+)
+from pre_commit_hooks.jira_pre_commit.project_keys import load_project_keys
+from pre_commit_hooks.regex_guard import GuardedRegex, RegexTimeoutError
+
+# default max number of `git log` processes running at the same time
+DEFAULT_CONCURRENCY = 4
+# max size of single commit message, bigger ones fail the push
+MAX_MESSAGE_SIZE = 1024 * 1024
+# max number of reported not valid commits, to not flood push output
+MAX_REPORTED_COMMITS = 20
+# Error message printed for not valid commit of pushed ref
+COMMIT_ERROR_MSG = "[ERROR] {ref} {commit}: {error}"
+# Error message printed when commit message is too big to be read
+TOO_BIG_MESSAGE_ERROR_MSG = "[ERROR] {ref}: commit message is bigger than {size} bytes."
+# Message printed when not all not valid commits are reported
+MORE_COMMITS_MSG = "[ERROR] ... and {count} more commits without Jira Task ID."
+
+# old commit, new commit and ref name
+RefUpdate = Tuple[str, str, str]
+
+
+def read_ref_updates(lines: Iterable[str]) -> List[RefUpdate]:
+    """Read `<old> <new> <ref>` lines passed to `pre-receive`, deleted refs are skipped."""
+    updates = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 3 and parts[1].strip("0"):
+            updates.append((parts[0], parts[1], parts[2]))
+    return updates
+
+
+class PushValidator:
+    """Validator of Jira Task IDs in messages of pushed commits.
+
+    Commits of all refs are streamed from `git log` processes running at the
+    same time, at most `concurrency` of them. Messages are checked one by one
+    as soon as they are read, so only ids of checked commits and tasks to
+    check in Jira are kept in memory. Commits pushed to several refs are
+    checked once.
+
+    Args:
+      exclude_patterns: screened regexes to exclude commit messages from check
+      project_keys: allowed Jira project keys, any project is allowed if not passed
+      jira_client: client to check that Jira Task exists, not checked if not passed
+      concurrency: max number of `git log` processes running at the same time
+
+    """
+
+    def __init__(
+        self,
+        exclude_patterns: Sequence[GuardedRegex],
+        project_keys: FrozenSet[str] | None = None,
+        jira_client: JiraClient | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ):
+        self.exclude_patterns = exclude_patterns
+        self.project_keys = project_keys
+        self.jira_client = jira_client
+        self.concurrency = concurrency
+        self.checked: Set[str] = set()
+        # tasks of commits to check in Jira, with refs they are pushed to
+        self.tasks: Dict[str, Tuple[str, List[str]]] = {}
+        self.errors: List[str] = []
+        self.failed = 0
+
+    def _fail(self, ref: str, commit: str, error: str):
+        """Count not valid commit and store its error if it should be reported."""
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_COMMITS:
+            self.errors.append("\n".join(
+                COMMIT_ERROR_MSG.format(ref=ref, commit=commit[:12], error=line)
+                for line in error.splitlines()
+            ))
+
+    def is_excluded(self, message: str) -> bool:
+        """Check whether commit message matches any exclude pattern, it can block for pattern timeout."""
+        return any(pattern.search(message) for pattern in self.exclude_patterns)
+
+    async def check_commit(self, ref: str, commit: str, message: str):
+        """Check message of pushed commit, Jira is checked later for all commits at once.
+
+        Exclude patterns are matched in a thread, so slow patterns don't stop
+        reading of other refs.
+
+        """
+        if commit in self.checked:
+            return
+        self.checked.add(commit)
+
+        message = clean_commit_message(message)
+        if self.exclude_patterns and await asyncio.to_thread(self.is_excluded, message):
+            return
+
+        tasks, unknown_tasks = find_jira_tasks(message, self.project_keys)
+        if not tasks:
+            self._fail(ref, commit, get_no_task_error(unknown_tasks))
+        elif self.jira_client is not None:
+            self.tasks[commit] = (ref, tasks)
+
+    async def _check_ref(self, semaphore: asyncio.Semaphore, update: RefUpdate) -> bool:
+        """Stream and check messages of commits pushed to ref."""
+        _, new, ref = update
+        async with semaphore:
+            # commits reachable from existing refs are already checked
+            process = await asyncio.create_subprocess_exec(
+                "git", "log", "-z", "--format=%H%n%B", new, "--not", "--all",
+                stdout=asyncio.subprocess.PIPE,
+                limit=MAX_MESSAGE_SIZE,
+            )
+            try:
+                while True:
+                    try:
+                        record = await process.stdout.readuntil(b"\0")
+                    except asyncio.IncompleteReadError as error:
+                        record = error.partial
+                    except asyncio.LimitOverrunError:
+                        print(TOO_BIG_MESSAGE_ERROR_MSG.format(ref=ref, size=MAX_MESSAGE_SIZE))
+                        return False
+                    if not record:
+                        return await process.wait() == 0
+                    commit, _, message = record.rstrip(b"\0").decode(errors="replace").partition("\n")
+                    await self.check_commit(ref, commit, message)
+            finally:
+                # don't leave `git log` blocked on full pipe if reading is stopped
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+
+    async def _check_tasks(self):
+        """Check tasks of all commits in Jira with one batch of requests."""
+        if not self.tasks:
+            return
+        keys = [key for _, tasks in self.tasks.values() for key in tasks]
+        with stats.phase("jira"):
+            states = await asyncio.to_thread(self.jira_client.issue_states, keys)
+        for commit, (ref, tasks) in self.tasks.items():
+            if not any(states[key] in (OPEN, None) for key in tasks):
+                self._fail(ref, commit, CLOSED_TASK_ERROR_MSG.format(tasks=", ".join(dict.fromkeys(tasks))))
+
+    async def validate(self, updates: Sequence[RefUpdate]) -> int:
+        """Check commits of all ref updates.
+
+        Returns:
+          (int): 0 if all commits are valid, 1 otherwise
+
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with stats.phase("git"):
+            tasks = [asyncio.ensure_future(self._check_ref(semaphore, update)) for update in updates]
+            try:
+                results = await asyncio.gather(*tasks)
+            except RegexTimeoutError as error:
+                # `gather` doesn't cancel other refs, stop them explicitly as
+                # the same regex would stall them too
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                print(error)
+                return 1
+        await self._check_tasks()
+
+        for error in self.errors:
+            print(error)
+        if self.failed > MAX_REPORTED_COMMITS:
+            print(MORE_COMMITS_MSG.format(count=self.failed - MAX_REPORTED_COMMITS))
+        stats.increment("commits", len(self.checked))
+        return int(bool(self.failed) or not all(results))
+
+
+def main(argv=None) -> int:
+    """Check Jira Task IDs in messages of commits pushed to git server.
+
+    It's `pre-receive` hook: ref updates are read from stdin.
+
+    Args:
+        argv: command-line args
+
+    Returns:
+        (int): 0 if all pushed commits are valid or excluded, 1 otherwise
+
+    """
+    parser = argparse.ArgumentParser()
+    add_policy_arguments(parser)
+    parser.add_argument(
+        "--concurrency",
+        default=DEFAULT_CONCURRENCY,
+        type=int,
+        help="Max number of `git log` processes running at the same time.",
+    )
+    args = parser.parse_args(argv)
+
+    exclude_patterns = []
+    for pattern in args.exclude_pattern or []:
+        try:
+            exclude_patterns.append(GuardedRegex(pattern))
+        except re.error as error:
+            print(INVALID_REGEX_ERROR_MSG.format(pattern=pattern, error=error))
+            return 1
+
+    project_keys = load_project_keys(args.project_keys_file) if args.project_keys_file else None
+    jira_client = get_jira_client(args)
+    validator = PushValidator(exclude_patterns, project_keys, jira_client, max(args.concurrency, 1))
+    try:
+        with stats.collect("jira-pre-receive"):
+            return asyncio.run(validator.validate(read_ref_updates(sys.stdin)))
+    finally:
+        if jira_client is not None:
+            jira_client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
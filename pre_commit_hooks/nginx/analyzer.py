@@ -0,0 +1,333 @@
+import re
+from typing import Collection, Dict, Hashable, Iterable, List, Pattern, Sequence, Tuple
+
+from pre_commit_hooks.nginx.exposure import WebRootIndex
+from pre_commit_hooks.nginx.parser import FILE_SYSTEM_SOURCE, FileSystemSource, parse_config
+from pre_commit_hooks.nginx.regex import canonical_form
+from pre_commit_hooks.nginx.routing import SERVED, STATIC, UNMATCHED, ServerRouter, is_wide_try_files
+from pre_commit_hooks.nginx.rules import Finding, RuleEngine, node_fingerprint, server_fingerprint
+from pre_commit_hooks.nginx.tree import NO_PARENT, ConfigTree, build_tree
+
+DEFAULT_DENY_LOCATIONS = (
+    "/cron.*",
+    "/\\.",
+    "autodiscover.xml",
+    "apple-touch-icon",
+    "\\.(json|sh|xml|md|conf|toml|yml|yaml|log|pid)$",
+    "^/(app/|vendor|src|tests|vagrant|docs|phpunit|svn|git|docker|migrations|Makefile)",
+)
+
+DEFAULT_IGNORE_ERRORS_KEYWORDS = (
+    "fastcgi_params", "koi-utf", "koi-win", "mime.types",
+    "scgi_params", "uwsgi_params", "win-utf",
+)
+
+# kinds of findings
+PARSE_ERROR = "parse_error"
+LOCATION_NOT_DISABLED = "location_not_disabled"
+SENSITIVE_URI_SERVED = "sensitive_uri_served"
+WIDE_TRY_FILES = "wide_try_files"
+SENSITIVE_FILE_EXPOSED = "sensitive_file_exposed"
+
+
+def _has_directive(statement: Dict, name: str, args: List[str]) -> bool:
+    """Check whether block `statement` or its nested blocks have directive."""
+    pending = [statement]
+    while pending:
+        statement = pending.pop()
+        if statement["directive"] == name and statement["args"] == args:
+            return True
+        pending.extend(statement.get("block", []))
+    return False
+
+
+def _location_denied(location: Dict) -> bool:
+    """Check whether location denies requests with `deny all` or `return 403`."""
+    return _has_directive(location, "deny", ["all"]) or _has_directive(location, "return", ["403"])
+
+
+def _server_root(tree: ConfigTree, server: int) -> str | None:
+    """Return `root` of `server` block or enclosing `http` block if any."""
+    roots = {tree.parents[index]: tree.nodes[index]["args"] for index in tree.directives.get("root", [])}
+    for parent in (server, tree.parents[server]):
+        if roots.get(parent):
+            return roots[parent][0]
+    return None
+
+
+def _wide_try_files_directives(tree: ConfigTree) -> Dict[int, List[int]]:
+    """Return wide `try_files` directives grouped by enclosing `server` block."""
+    wide_directives: Dict[int, List[int]] = {}
+    for index in tree.directives.get("try_files", []):
+        if is_wide_try_files(tree.nodes[index]["args"]):
+            wide_directives.setdefault(tree.servers[index], []).append(index)
+    return wide_directives
+
+
+def _wide_try_files_finding(tree: ConfigTree, index: int) -> Finding:
+    """Return finding of wide `try_files` directive with `index` in `tree`."""
+    return Finding(
+        kind=WIDE_TRY_FILES,
+        message=(
+            f"[ERROR] wide `try_files` directive found: file "
+            f'`{tree.files[index]}`, {tree.nodes[index]["line"]} line'
+        ),
+        file=tree.files[index],
+        line=tree.nodes[index]["line"],
+        fingerprint=node_fingerprint(WIDE_TRY_FILES, tree, index),
+    )
+
+
+class NginxAnalyzer:
+    """Analyzer of parsed nginx configs with compiled policy.
+
+    Policy (deny locations and their canonical forms, ignored errors keywords,
+    sensitive uris) is compiled once on init and never changed, neither are
+    analyzed configs, so one analyzer can be reused for any number of configs,
+    i.e. from different threads.
+
+    Args:
+      custom_deny_locations: custom deny locations, overrides default ones
+      extra_deny_locations: extra deny locations, adds to default ones
+      ignore_errors_keywords: keywords that contained in errors to be ignored,
+        adds to default ones
+      sensitive_uris: uris which must not be served by wide locations
+      enabled_rules: names of optional rules to run, see `rules.RULES`
+
+    """
+
+    def __init__(
+        self,
+        custom_deny_locations: Sequence[str] | None = None,
+        extra_deny_locations: Sequence[str] | None = None,
+        ignore_errors_keywords: Sequence[str] | None = None,
+        sensitive_uris: Sequence[str] | None = None,
+        enabled_rules: Sequence[str] | None = None,
+    ):
+        self.deny_locations: Tuple[str, ...] = (
+            tuple(custom_deny_locations or DEFAULT_DENY_LOCATIONS) + tuple(extra_deny_locations or ())
+        )
+        self.ignore_errors_keywords: Tuple[str, ...] = (
+            tuple(ignore_errors_keywords or ()) + DEFAULT_IGNORE_ERRORS_KEYWORDS
+        )
+        self.sensitive_uris: Tuple[str, ...] = tuple(sensitive_uris or ())
+        self.rule_engine = RuleEngine(enabled_rules or ())
+
+        # compare canonical forms of regexes instead of raw strings, so
+        # locations with i.e. other alternations order are treated the same
+        deny_canonicals: Dict[Hashable, Tuple[str, ...]] = {}
+        for item in self.deny_locations:
+            canonical = canonical_form(item)
+            deny_canonicals[canonical] = deny_canonicals.get(canonical, ()) + (item,)
+        self._deny_canonicals = deny_canonicals
+
+        self._deny_regexes: List[Pattern] = []
+        for item in self.deny_locations:
+            try:
+                self._deny_regexes.append(re.compile(item))
+            except re.error:
+                continue
+
+    def parse_errors(self, payload: Dict) -> List[Finding]:
+        """Return parse errors of config which are not ignored.
+
+        Sometimes projects use `include` directives without real files in
+        the repo (these files are added as nginx defaults during installation)
+        - https://github.com/nginx/nginx/tree/master/conf. Errors with such
+        keywords are ignored by default.
+
+        """
+        return [
+            Finding(
+                kind=PARSE_ERROR,
+                message=f"[PARSE ERROR] {error['file']}: {error['error']}",
+                file=error["file"],
+                line=error.get("line"),
+            )
+            for error in payload["errors"]
+            if not any(keyword in error["error"] for keyword in self.ignore_errors_keywords)
+        ]
+
+    def missing_deny_locations(
+        self,
+        locations: Iterable[Dict],
+        tree: ConfigTree | None = None,
+        server: int = NO_PARENT,
+    ) -> List[Finding]:
+        """Return deny locations which are not defined among `locations`.
+
+        Locations regexes are compared by their canonical forms, so the order
+        of alternations or redundant groups don't matter. `~*` location is
+        case insensitive, so it denies even more uris and is accepted too.
+
+        If `tree` is passed, findings have fingerprints of `server` block of it.
+
+        """
+        found = set()
+        for location in locations:
+            if len(location["args"]) != 2 or location["args"][0] not in ("~", "~*"):
+                continue
+            canonical = canonical_form(location["args"][1])
+            if canonical in self._deny_canonicals and canonical not in found and _location_denied(location):
+                found.add(canonical)
+
+        return [
+            Finding(
+                kind=LOCATION_NOT_DISABLED,
+                message=(
+                    f"[ERROR] location not disabled: `location ~ {item}`. "
+                    "Please disable it with `{deny all;}` or `{return 403;}` directives."
+                ),
+                fingerprint=(
+                    server_fingerprint(LOCATION_NOT_DISABLED, tree, server, f"location ~ {item}")
+                    if tree is not None else None
+                ),
+            )
+            for item in self.deny_locations
+            if canonical_form(item) not in found
+        ]
+
+    def served_sensitive_uris(self, payload: Dict, tree: ConfigTree, server: int) -> List[Finding]:
+        """Return sensitive uris which are served by wide locations of `server`.
+
+        Requests are routed to locations of `server` block the same way as
+        nginx does, so it's checked that i.e. `/.env` won't be processed by
+
+          location / {
+            try_files $uri $uri/ /index.php?$query_string;
+          }
+
+        """
+        if not self.sensitive_uris or server == NO_PARENT:
+            return []
+
+        router = ServerRouter(payload, tree.nodes[server], tree.files[server])
+        return [
+            Finding(
+                kind=SENSITIVE_URI_SERVED,
+                message=(
+                    f"[ERROR] sensitive uri `{uri}` is served by wide `{location.name}`: "
+                    f"file `{location.file}`, {location.line} line"
+                ),
+                file=location.file,
+                line=location.line,
+                fingerprint=server_fingerprint(SENSITIVE_URI_SERVED, tree, server, f"{uri} {location.name}"),
+            )
+            for uri, location in router.route_many(self.sensitive_uris)
+            if location is not None and location.verdict == SERVED
+        ]
+
+    def exposed_files(
+        self,
+        payload: Dict,
+        tree: ConfigTree,
+        server: int,
+        web_roots: WebRootIndex,
+    ) -> List[Finding] | None:
+        """Return sensitive files of repo which are served by `server`.
+
+        Files in repo dir deployed as `root` of `server` are sensitive if
+        their uris are matched by deny locations or are sensitive uris. They
+        are exposed if they are served by wide location or as static files.
+
+        Returns:
+          (list): found problems, `None` if `root` of `server` is not in repo
+
+        """
+        root = _server_root(tree, server)
+        directory = web_roots.resolve(root) if root else None
+        if directory is None:
+            return None
+
+        sensitive_uris = set(self.sensitive_uris)
+        uris = [
+            uri for uri in web_roots.files(directory)
+            if uri in sensitive_uris or any(regex.search(uri) for regex in self._deny_regexes)
+        ]
+        router = ServerRouter(payload, tree.nodes[server], tree.files[server])
+        findings = []
+        for uri, location in router.route_many(uris):
+            # verdict of request not matched by any location is `UNMATCHED`
+            # one, unless server denies all requests by default
+            verdict = router.default_verdict if location is None else location.verdict
+            if verdict not in (SERVED, STATIC, UNMATCHED):
+                continue
+            path = f"{directory}{uri}"
+            if location is None:
+                message = f"[ERROR] sensitive file `{path}` is served as static file from `root {root}`"
+            else:
+                message = (
+                    f"[ERROR] sensitive file `{path}` is served by `{location.name}`: "
+                    f"file `{location.file}`, {location.line} line"
+                )
+            findings.append(Finding(
+                kind=SENSITIVE_FILE_EXPOSED,
+                message=message,
+                file=path,
+                fingerprint=server_fingerprint(SENSITIVE_FILE_EXPOSED, tree, server, path),
+            ))
+        return findings
+
+    def analyze(
+        self,
+        payload: Dict,
+        web_roots: WebRootIndex | None = None,
+        baseline: Collection[str] = (),
+    ) -> List[Finding]:
+        """Return problems of parsed nginx config, empty list if it's valid.
+
+        Search for wide range of files in locations:
+
+          location / {
+            try_files $uri $uri/ /index.php?$query_string;
+          }
+
+        Wide `try_files` directives are allowed only if all deny locations
+        exist in the same `server` block and no sensitive uri is served by
+        them. Enabled optional rules are run over config as well.
+
+        If `web_roots` is passed and `root` of `server` block is found
+        in repo, these checks are replaced with check that no real sensitive
+        file of the repo is served.
+
+        Findings with fingerprints from `baseline` are known and not returned,
+        each finding is checked on its own, so i.e. deny location removed from
+        `server` block with known wide `try_files` directive is reported.
+
+        Args:
+          payload: nginx config parsed by `crossplane` or `parse_config`
+          web_roots: index of repo files deployed as nginx roots
+          baseline: fingerprints of known findings
+
+        Returns:
+          (list): found problems in order they should be reported
+
+        """
+        parse_errors = self.parse_errors(payload)
+        if parse_errors:
+            return parse_errors
+
+        tree = build_tree(payload)
+        findings: List[Finding] = []
+        for server, directives in _wide_try_files_directives(tree).items():
+            server_findings = None
+            if web_roots is not None:
+                server_findings = self.exposed_files(payload, tree, server, web_roots)
+            if server_findings is None:
+                server_findings = self.missing_deny_locations(
+                    (tree.nodes[index] for index in tree.server_locations.get(server, [])),
+                    tree,
+                    server,
+                )
+                server_findings.extend(self.served_sensitive_uris(payload, tree, server))
+            if not server_findings:
+                continue
+
+            findings.extend(server_findings)
+            findings.extend(_wide_try_files_finding(tree, index) for index in directives)
+        findings.extend(self.rule_engine.run(tree))
+        return [finding for finding in findings if finding.fingerprint not in baseline]
+
+    def analyze_file(self, filename: str, source: FileSystemSource = FILE_SYSTEM_SOURCE) -> List[Finding]:
+        """Parse nginx config with all included files and analyze it."""
+        return self.analyze(parse_config(filename, source=source))
@@ -0,0 +1,26 @@
+import json
+from typing import FrozenSet, Iterable
+
+
+def load_baseline(path: str) -> FrozenSet[str]:
+    """Load fingerprints of known findings, empty if baseline file is missing.
+
+    Raises:
+      ValueError: if baseline file is broken
+
+    """
+    try:
+        with open(path) as baseline_file:
+            data = json.load(baseline_file)
+    except FileNotFoundError:
+        return frozenset()
+    if not isinstance(data, dict) or not isinstance(data.get("fingerprints"), list):
+        raise ValueError(f"Invalid baseline `{path}`, expected object with `fingerprints` list")
+    return frozenset(data["fingerprints"])
+
+
+def save_baseline(path: str, fingerprints: Iterable[str]):
+    """Save fingerprints of known findings sorted, so baseline diffs are readable."""
+    with open(path, "w") as baseline_file:
+        json.dump({"fingerprints": sorted(set(fingerprints))}, baseline_file, indent=2)
+        baseline_file.write("\n")
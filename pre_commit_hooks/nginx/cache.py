@@ -0,0 +1,285 @@
+import dataclasses
+import functools
+import glob
+import hashlib
+import json
+import marshal
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Sequence
+
+import crossplane
+
+from pre_commit_hooks.nginx.parser import FILE_SYSTEM_SOURCE, FileSystemSource
+from pre_commit_hooks.nginx.rules import Finding
+from pre_commit_hooks.util import file_lock, git_index_blobs
+
+RESULTS_CACHE_FILENAME = "nginx-results.json"
+RUN_MARKER_FILENAME = "nginx-run.json"
+PENDING_FILENAME = "nginx-pending.json"
+# lock of cache files shared by hook processes running in parallel
+LOCK_FILENAME = "nginx.lock"
+# max number of cached results per nginx root (i.e. for different branches)
+RESULTS_CACHE_SIZE = 16
+
+
+@dataclass
+class CachedResult:
+    """Dataclass to represent cached nginx root validation result."""
+
+    valid: bool
+    findings: List[Finding]
+
+
+@functools.lru_cache(maxsize=None)
+def _implementation_key() -> str:
+    """Return key of hooks implementation to drop cache when it's changed."""
+    package_dir = os.path.dirname(os.path.dirname(__file__))
+    stats = [crossplane.__version__]
+    for path in sorted(glob.glob(os.path.join(package_dir, "**", "*.py"), recursive=True)):
+        stat = os.stat(path)
+        stats.append(f"{os.path.relpath(path, package_dir)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("\n".join(stats).encode()).hexdigest()
+
+
+def options_key(**options: Any) -> str:
+    """Return key of hook options which affect validation result."""
+    normalized = {
+        name: sorted(set(value)) if isinstance(value, (list, tuple, set)) else value
+        for name, value in options.items()
+    }
+    normalized["implementation"] = _implementation_key()
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+def iter_include_patterns(payload: Dict) -> Iterator[str]:
+    """Iterate over resolved patterns of all `include` directives in config."""
+    config_dir = os.path.dirname(payload["config"][0]["file"]) if payload["config"] else ""
+    pending: List[Dict] = [statement for config in payload["config"] for statement in config["parsed"]]
+    while pending:
+        statement = pending.pop()
+        pending.extend(statement.get("block", []))
+        if statement["directive"] == "include" and statement["args"]:
+            yield os.path.join(config_dir, statement["args"][0])
+
+
+def load_json(path: str) -> Dict:
+    """Load JSON cache file, empty if it is missing or broken."""
+    try:
+        with open(path) as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_json(path: str, data: Dict):
+    """Save cache file atomically, so concurrent reader won't see partial one."""
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(descriptor, "w") as temp_file:
+        json.dump(data, temp_file)
+    os.replace(temp_path, path)
+
+
+class ResultCache:
+    """Cache of nginx roots validation results.
+
+    Result is keyed by hook options and git blob ids of all files included to
+    nginx root (its include closure). Blob ids are taken from git index in one
+    `git ls-files` call, so checking cache doesn't read any config file. Files
+    matched by `include` patterns are stored as well, so adding new file to
+    i.e. `conf.d/*.conf` invalidates cached result.
+
+    Args:
+      cache_dir: dir to store results in
+      source: source nginx roots are parsed from, files of closure are mapped
+        to files they are read from (i.e. rendered templates to templates)
+
+    """
+
+    def __init__(self, cache_dir: str, source: FileSystemSource = FILE_SYSTEM_SOURCE):
+        self.source = source
+        self.path = os.path.join(cache_dir, RESULTS_CACHE_FILENAME)
+        self.lock_path = os.path.join(cache_dir, LOCK_FILENAME)
+        self._blobs: Dict[str, str | None] | None = None
+        self._entries: Dict[str, List[Dict]] | None = None
+
+    @property
+    def blobs(self) -> Dict[str, str | None]:
+        """Return blob ids of files in git index, loaded once per run."""
+        if self._blobs is None:
+            self._blobs = git_index_blobs()
+        return self._blobs
+
+    @property
+    def entries(self) -> Dict[str, List[Dict]]:
+        """Return cached results by nginx root, loaded once per run."""
+        if self._entries is None:
+            self._entries = load_json(self.path)
+        return self._entries
+
+    def _entry_valid(self, entry: Dict, key: str) -> bool:
+        """Check whether cached `entry` is actual for current repo state."""
+        if entry["options"] != key:
+            return False
+        if any(self.blobs.get(path) != blob for path, blob in entry["closure"].items()):
+            return False
+        return all(self.source.glob(pattern) == files for pattern, files in entry["includes"].items())
+
+    def get(self, root: str, key: str) -> CachedResult | None:
+        """Return cached validation result of nginx `root` if it's actual.
+
+        Args:
+          root: path to nginx root config
+          key: key of hook options returned by `options_key`
+
+        Returns:
+          (CachedResult): cached result or `None` if there is no actual one
+
+        """
+        for entry in self.entries.get(os.path.normpath(root), []):
+            if self._entry_valid(entry, key):
+                return CachedResult(
+                    valid=entry["valid"],
+                    findings=[Finding(**finding) for finding in entry["findings"]],
+                )
+        return None
+
+    def put(self, root: str, key: str, payload: Dict, valid: bool, findings: Sequence[Finding]):
+        """Store validation result of nginx `root` config.
+
+        Result is not stored if some of included files is not committed to
+        git index or has unstaged changes.
+
+        Args:
+          root: path to nginx root config
+          key: key of hook options returned by `options_key`
+          payload: nginx config parsed by `crossplane`
+          valid: whether nginx config is valid
+          findings: problems reported during validation
+
+        """
+        closure = {}
+        for config in payload["config"]:
+            path = os.path.normpath(os.path.relpath(self.source.origin(config["file"])))
+            closure[path] = self.blobs.get(path)
+            if closure[path] is None:
+                return
+
+        entry = {
+            "options": key,
+            "closure": closure,
+            "includes": {pattern: self.source.glob(pattern) for pattern in iter_include_patterns(payload)},
+            "valid": valid,
+            "findings": [dataclasses.asdict(finding) for finding in findings],
+        }
+        root = os.path.normpath(root)
+        # results of other roots could be stored by parallel hook processes
+        with file_lock(self.lock_path):
+            self._entries = load_json(self.path)
+            self._entries[root] = [entry] + self._entries.get(root, [])[:RESULTS_CACHE_SIZE - 1]
+            save_json(self.path, self._entries)
+
+
+class RunMarker:
+    """Marker of nginx roots already validated during current `pre-commit` run.
+
+    `pre-commit` can split filenames to chunks and run hook for each of them
+    in parallel, so the same root could be validated by several processes.
+    Each root is claimed under lock by only one of them.
+
+    """
+
+    def __init__(self, cache_dir: str, run_id: str):
+        self.path = os.path.join(cache_dir, RUN_MARKER_FILENAME)
+        self.lock_path = os.path.join(cache_dir, LOCK_FILENAME)
+        self.run_id = run_id
+
+    def claim(self, roots: Sequence[str], key: str) -> List[str]:
+        """Claim nginx roots for validation by current process.
+
+        Args:
+          roots: paths to nginx root configs
+          key: key of hook options returned by `options_key`, the same root
+            is validated once for each of hooks with different options
+
+        Returns:
+          (list): roots which are not claimed by other processes of the run
+
+        """
+        with file_lock(self.lock_path):
+            marker = load_json(self.path)
+            claimed = marker.get("roots", []) if marker.get("run") == self.run_id else []
+            roots = [root for root in dict.fromkeys(roots) if f"{key}:{os.path.normpath(root)}" not in claimed]
+            if roots:
+                claimed = claimed + [f"{key}:{os.path.normpath(root)}" for root in roots]
+                save_json(self.path, {"run": self.run_id, "roots": claimed})
+        return roots
+
+
+class PendingRoots:
+    """Nginx roots which were not validated within time budget of previous runs.
+
+    Roots are stored per key of hook options, so they are validated first by
+    the next run of the same hook, even if they are not committed again.
+
+    Args:
+      cache_dir: dir to store pending roots in
+      key: key of hook options returned by `options_key`
+
+    """
+
+    def __init__(self, cache_dir: str, key: str):
+        self.path = os.path.join(cache_dir, PENDING_FILENAME)
+        self.lock_path = os.path.join(cache_dir, LOCK_FILENAME)
+        self.key = key
+
+    def load(self) -> List[str]:
+        """Return pending roots which still exist."""
+        return [root for root in load_json(self.path).get(self.key, []) if os.path.exists(root)]
+
+    def update(self, validated: Sequence[str], deferred: Sequence[str]):
+        """Remove validated roots from pending ones and add deferred roots."""
+        validated = {os.path.normpath(root) for root in validated}
+        with file_lock(self.lock_path):
+            entries = load_json(self.path)
+            roots = [root for root in entries.get(self.key, []) if root not in validated]
+            roots = list(dict.fromkeys(roots + [os.path.normpath(root) for root in deferred]))
+            if roots:
+                entries[self.key] = roots
+            else:
+                entries.pop(self.key, None)
+            save_json(self.path, entries)
+
+
+class DiskParseCache:
+    """Cache of parsed nginx config files in directory, shared by processes.
+
+    Files are keyed by hash of their content, so the same files of different
+    configs (i.e. common snippets copied to many repos) are parsed once. Cache
+    is dropped when hooks implementation is changed.
+
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.join(directory, _implementation_key()[:16])
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, key: str) -> Any:
+        """Return parsed file or `None` if it's not cached."""
+        try:
+            with open(self._path(key), "rb") as cache_file:
+                return marshal.load(cache_file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def put(self, key: str, value: Any):
+        """Store parsed file atomically, so concurrent reader won't see partial one."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(descriptor, "wb") as temp_file:
+            marshal.dump(value, temp_file)
+        os.replace(temp_path, path)
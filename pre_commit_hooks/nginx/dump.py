@@ -0,0 +1,92 @@
+import errno
+import fnmatch
+import glob
+import io
+import os
+import re
+from typing import Dict, Iterable, List, TextIO
+
+# line which starts next file in `nginx -T` output
+FILE_HEADER_REGEX = re.compile(r"^# configuration file (?P<path>.+):$")
+
+
+class DumpSource:
+    """Source of nginx config files from `nginx -T` dump.
+
+    Files are virtual: they are kept in memory by their paths from the dump,
+    nothing is read from or written to file system.
+
+    Args:
+      files: content of files by their paths, the first one is nginx root
+
+    """
+
+    def __init__(self, files: Dict[str, str]):
+        self.files = files
+
+    @property
+    def root(self) -> str | None:
+        """Path of nginx root config, the first file of the dump."""
+        return next(iter(self.files), None)
+
+    def _missing(self, path: str) -> OSError:
+        """Return the same error as opening missing file raises."""
+        return FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+
+    def open(self, path: str) -> TextIO:
+        """Open config file for reading."""
+        content = self.files.get(os.path.normpath(path))
+        if content is None:
+            raise self._missing(path)
+        return io.StringIO(content)
+
+    def glob(self, pattern: str) -> List[str]:
+        """Return sorted paths matched by `include` pattern, like `glob.glob`."""
+        parts = os.path.normpath(pattern).split(os.sep)
+        matched = []
+        for path in self.files:
+            names = path.split(os.sep)
+            if len(names) != len(parts):
+                continue
+            # hidden files are matched only explicitly, like in `glob`
+            if all(
+                fnmatch.fnmatchcase(name, part)
+                and not (glob.has_magic(part) and name.startswith(".") and not part.startswith("."))
+                for name, part in zip(names, parts)
+            ):
+                matched.append(path)
+        return sorted(matched)
+
+    def check(self, path: str):
+        """Raise `OSError` if explicitly included file is missing."""
+        if os.path.normpath(path) not in self.files:
+            raise self._missing(path)
+
+
+def read_dump(lines: Iterable[str]) -> DumpSource:
+    """Split `nginx -T` output into virtual files in single pass.
+
+    Each file in the output starts with `# configuration file <path>:` line,
+    lines before the first one (i.e. `syntax is ok` messages) are skipped.
+
+    Args:
+      lines: lines of `nginx -T` output, i.e. opened file or `sys.stdin`
+
+    Returns:
+      (DumpSource): source with files of the dump
+
+    """
+    files: Dict[str, str] = {}
+    path, content = None, io.StringIO()
+    for line in lines:
+        header = FILE_HEADER_REGEX.match(line.rstrip("\r\n"))
+        if header is None:
+            if path is not None:
+                content.write(line)
+            continue
+        if path is not None:
+            files.setdefault(path, content.getvalue())
+        path, content = os.path.normpath(header["path"]), io.StringIO()
+    if path is not None:
+        files.setdefault(path, content.getvalue())
+    return DumpSource(files)
@@ -0,0 +1,542 @@
+import argparse
+import contextlib
+import dataclasses
+import fnmatch
+import io
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+import crossplane
+
+from pre_commit_hooks.check_nginx_wide_range import _nginx_valid, _options_key
+from pre_commit_hooks.nginx.analyzer import DEFAULT_DENY_LOCATIONS, PARSE_ERROR, NginxAnalyzer
+from pre_commit_hooks.nginx.cache import DiskParseCache, ResultCache, RunMarker
+from pre_commit_hooks.nginx.dump import read_dump
+from pre_commit_hooks.nginx.parser import parse_config
+from pre_commit_hooks.nginx.report import Reporter
+from pre_commit_hooks.nginx.rules import RULES, Finding
+from pre_commit_hooks.nginx.template import TEMPLATE_SUFFIX, TemplateSource
+from pre_commit_hooks.util import cmd_output, get_tests_assets_path
+
+REFERENCE_ENGINE = "reference"
+DEFAULT_CASES = 1000
+# location of directive in `crossplane` error message, i.e. ` in nginx.conf:12`
+ERROR_LOCATION_REGEX = re.compile(r" in (?P<file>\S+):(?P<line>\d+)$")
+# `include` directive with glob pattern
+INCLUDE_GLOB_REGEX = re.compile(r"include\s+([^;\s]*\*[^;\s]*)\s*;")
+SENSITIVE_URIS = ("/.env", "/composer.json", "/.git/config")
+# outcome of verdict engines, which don't report findings
+VALID, INVALID = "valid", "invalid"
+
+# engine validates nginx root config (its path and files of config are
+# passed) and returns findings as JSON strings or verdict
+Engine = Callable[[str, Dict[str, str]], List[str]]
+# name of case, file name of nginx root and files of config by relative paths
+Case = Tuple[str, str, Dict[str, str]]
+
+TRY_FILES = (
+    "$uri $uri/ /index.php?$query_string",
+    "$uri $uri/ /index.html",
+    "$uri/ =404",
+    "/index.php",
+    "$URI =404",
+)
+LOCATION_BODIES = (
+    "deny all;",
+    "return 403;",
+    "return 404;",
+    "expires 30d; access_log off;",
+    "autoindex on;",
+    "alias /app/static/;",
+    "proxy_pass http://backend;",
+)
+
+
+def _deny_location(rng: random.Random, legacy: bool = False) -> str:
+    """Return one of deny locations, sometimes in other but equivalent form if not `legacy`."""
+    regex = rng.choice(DEFAULT_DENY_LOCATIONS)
+    if not legacy and rng.random() < 0.3 and "|" in regex:
+        start, end = regex.index("(") + 1, regex.index(")")
+        alternatives = regex[start:end].split("|")
+        rng.shuffle(alternatives)
+        regex = f"{regex[:start]}{'|'.join(alternatives)}{regex[end:]}"
+    modifier = "~" if legacy else rng.choice(("~", "~", "~*"))
+    return f'location {modifier} "{regex}" {{ {rng.choice(LOCATION_BODIES[:3])} }}'
+
+
+def _location(rng: random.Random, depth: int = 0, legacy: bool = False) -> str:
+    """Return random `location` block, nested ones only if not `legacy`."""
+    kind = rng.random()
+    if kind < 0.35:
+        return _deny_location(rng, legacy)
+    if kind < 0.6:
+        uri = rng.choice(("/", "/app", "/static", "/api/"))
+        return f"location {uri} {{ try_files {rng.choice(TRY_FILES)}; }}"
+    if kind < 0.7:
+        return "location = /robots.txt { return 200 'ok'; }"
+    if kind < 0.8 and depth < 2 and not legacy:
+        return f"location ^~ /nested/ {{ {_location(rng, depth + 1)} }}"
+    uri = rng.choice(("/static", "/media/", r"~* \.(jpg|png|css)$"))
+    return f"location {uri} {{ {rng.choice(LOCATION_BODIES)} }}"
+
+
+def _server(rng: random.Random, index: int, files: Dict[str, str], legacy: bool = False) -> str:
+    """Return random `server` block, its snippets are added to `files`."""
+    lines = [f"listen {8000 + index};"]
+    if rng.random() < 0.7:
+        lines.append(f"server_name site{index}.example.com;")
+    if rng.random() < 0.5:
+        lines.append(f"client_max_body_size {rng.randint(1, 50)}m;")
+    if rng.random() < 0.3:
+        lines.append(f"server_tokens {rng.choice(('on', 'off'))};")
+    if rng.random() < 0.6:
+        lines.append("include snippets/deny.conf;")
+    for location in range(rng.randint(0, 8)):
+        if rng.random() < 0.3:
+            snippet = f"snippets/s{index}-{location}.conf"
+            files[snippet] = f"# snippet\n{_location(rng, legacy=legacy)}\n"
+            lines.append(f"include {snippet};")
+        else:
+            lines.append(_location(rng, legacy=legacy))
+    if rng.random() < 0.1:
+        lines.append("include snippets/missing.conf;")
+    return "server {\n  " + "\n  ".join(lines) + "\n}\n"
+
+
+def generate_config(rng: random.Random, legacy: bool = False) -> Dict[str, str]:
+    """Generate random nginx config with includes.
+
+    Configs have several `server` blocks with locations of all kinds, wide
+    and not wide `try_files`, deny locations in equivalent forms, directives
+    of optional rules, explicit and glob includes, missing files and comments.
+
+    `legacy` configs have single `server` block with deny locations in exact
+    default forms, so hook verdict must be the same as of its first version,
+    which checked deny locations of the whole config by their strings.
+
+    Returns:
+      (dict): files of config by relative paths, root is `nginx.conf`
+
+    """
+    # all deny locations in snippet shared by servers, so configs could be valid
+    files: Dict[str, str] = {
+        "snippets/deny.conf": "".join(f'location ~ "{regex}" {{ deny all; }}\n' for regex in DEFAULT_DENY_LOCATIONS),
+    }
+    servers = [_server(rng, index, files, legacy) for index in range(1 if legacy else rng.randint(1, 3))]
+    http = ["include mime.types;"]
+    if rng.random() < 0.4:
+        # enough files to parse them in process pool
+        for index in range(rng.randint(1, 20)):
+            files[f"conf.d/{index:02}.conf"] = servers.pop() if servers and rng.random() < 0.5 else "# empty\n"
+        http.append("include conf.d/*.conf;")
+    http.extend(servers)
+    files["nginx.conf"] = "events {}\nhttp {\n" + "\n".join(http) + "}\n"
+    return files
+
+
+def mutate_config(files: Dict[str, str], rng: random.Random, legacy: bool = False) -> Dict[str, str]:
+    """Return config with random line of random file deleted, duplicated, broken or swapped.
+
+    Location modifiers are changed only if not `legacy`.
+
+    """
+    files = dict(files)
+    name = rng.choice(sorted(files))
+    lines = files[name].splitlines()
+    if not lines:
+        return files
+
+    position = rng.randrange(len(lines))
+    mutation = rng.randrange(5 if legacy else 6)
+    if mutation == 0:
+        del lines[position]
+    elif mutation == 1:
+        lines.insert(position, lines[position])
+    elif mutation == 2:
+        lines[position] = lines[position].replace("}", "", 1).replace(";", "", 1)
+    elif mutation == 3:
+        other = rng.randrange(len(lines))
+        lines[position], lines[other] = lines[other], lines[position]
+    elif mutation == 4:
+        lines[position] = f"# {lines[position]}"
+    else:
+        lines[position] = lines[position].replace(" ~ ", " ~* ", 1).replace("location /", "location ^~ /", 1)
+    files[name] = "\n".join(lines) + "\n"
+    return files
+
+
+class _CollectingReporter(Reporter):
+    """Reporter which keeps findings to compare them."""
+
+    def __init__(self):
+        super().__init__()
+        self.findings: List[Finding] = []
+
+    def report(self, root: str, finding: Finding):
+        self.findings.append(finding)
+
+    def note(self, message: str):
+        """Skip messages, they aren't compared."""
+
+
+@contextlib.contextmanager
+def _cwd(directory: str):
+    """Change current dir for hook paths which use git index of repo in it."""
+    previous = os.getcwd()
+    os.chdir(directory)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _dump_findings(findings: Sequence[Finding]) -> List[str]:
+    """Return findings as JSON strings to compare them."""
+    return [json.dumps(dataclasses.asdict(finding)) for finding in findings]
+
+
+def _crossplane_payload(root: str) -> Dict:
+    """Parse config with `crossplane`, fixing file in its error messages.
+
+    `crossplane` reuses variable of parsed file name for included files, so
+    errors of directives after `include` in the same block have the last
+    included file in message instead of parsed one. Own parser reports the
+    parsed file, so messages of reference are fixed to compare the rest.
+
+    """
+    payload = crossplane.parse(root)
+    errors = [(error, parsing["file"]) for parsing in payload["config"] for error in parsing["errors"]]
+    for error, file in errors + [(error, error["file"]) for error in payload["errors"]]:
+        location = ERROR_LOCATION_REGEX.search(error["error"])
+        if location is not None:
+            error["error"] = f"{error['error'][:location.start()]} in {file}:{location['line']}"
+    return payload
+
+
+def _dump_payload(root: str, files: Dict[str, str]) -> Dict:
+    """Parse config from `nginx -T` dump of its files."""
+    directory = os.path.dirname(root)
+    names = sorted(files, key=lambda name: os.path.join(directory, name) != root)
+    dump = "".join(f"# configuration file {os.path.join(directory, name)}:\n{files[name]}\n" for name in names)
+    source = read_dump(io.StringIO(dump))
+    return parse_config(root, source=source)
+
+
+def _template_findings(root: str, files: Dict[str, str], analyzer: NginxAnalyzer) -> List[str]:
+    """Validate config written as `*.template` files with placeholders, paths are as of rendered files."""
+    directory = os.path.dirname(root)
+    template_dir = f"{directory}-template"
+    shutil.rmtree(template_dir, ignore_errors=True)
+    for path, content in files.items():
+        template = os.path.join(template_dir, path + TEMPLATE_SUFFIX)
+        os.makedirs(os.path.dirname(template), exist_ok=True)
+        with open(template, "w") as template_file:
+            template_file.write(content.replace("location ", "${LOCATION} "))
+
+    source = TemplateSource({"LOCATION": "location"})
+    payload = parse_config(os.path.join(template_dir, os.path.basename(root)), source=source)
+    return [item.replace(template_dir, directory) for item in _dump_findings(analyzer.analyze(payload))]
+
+
+def _glob_included(files: Dict[str, str]) -> List[str]:
+    """Return files of config which are included only by `include` glob patterns."""
+    patterns = [pattern for content in files.values() for pattern in INCLUDE_GLOB_REGEX.findall(content)]
+    return [name for name in sorted(files) if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+
+
+def _write_files(directory: str, files: Dict[str, str]):
+    """Write files of config to `directory`, other files in it are removed."""
+    for path in cmd_output("git", "ls-files", "-z", cwd=directory).split("\0"):
+        if path and path not in files:
+            os.remove(os.path.join(directory, path))
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(directory, path)), exist_ok=True)
+        with open(os.path.join(directory, path), "w") as config_file:
+            config_file.write(content)
+    cmd_output("git", "add", "-A", cwd=directory)
+
+
+def _hook_findings(root: str, files: Dict[str, str], analyzer: NginxAnalyzer) -> List[str]:
+    """Validate config by hook with results cache and baseline.
+
+    Config is validated in git repo the way hook does it on commits:
+
+      1. stale result of config without last file of `include` glob pattern
+         (or with other root file) is cached and must not be used
+      2. result with baseline of all findings is cached, it must have parse
+         errors only and must not be used without baseline
+      3. result is cached once per `pre-commit` run and then taken from cache
+
+    Findings of the last validation are returned.
+
+    """
+    directory = os.path.dirname(root)
+    with _cwd(directory):
+        cmd_output("git", "init", "-q", directory)
+        cache_dir = os.path.join(directory, ".git", "hook-cache")
+        os.makedirs(cache_dir)
+        glob_included = _glob_included(files)
+        if glob_included:
+            stale = {name: content for name, content in files.items() if name != glob_included[-1]}
+        else:
+            stale = {**files, os.path.basename(root): files[os.path.basename(root)] + "\n# stale\n"}
+        _write_files(directory, stale)
+        _nginx_valid(root, analyzer, ResultCache(cache_dir), reporter=_CollectingReporter())
+
+        _write_files(directory, files)
+        baseline = {finding.fingerprint for finding in analyzer.analyze(parse_config(root)) if finding.fingerprint}
+        reporter = _CollectingReporter()
+        _nginx_valid(root, analyzer, ResultCache(cache_dir), baseline=baseline, reporter=reporter)
+        if any(finding.kind != PARSE_ERROR for finding in reporter.findings):
+            return ["baseline: known findings are reported"]
+
+        key = _options_key(analyzer)
+        marker = RunMarker(cache_dir, "run")
+        if marker.claim([root], key) != [root] or marker.claim([root], key):
+            return ["run marker: root isn't claimed once per run"]
+        _nginx_valid(root, analyzer, ResultCache(cache_dir), reporter=_CollectingReporter())
+        reporter = _CollectingReporter()
+        cache = ResultCache(cache_dir)
+        if cache.get(root, key) is None:
+            return ["cache: result isn't cached"]
+        _nginx_valid(root, analyzer, cache, reporter=reporter)
+    return _dump_findings(reporter.findings)
+
+
+def default_engines(
+    cache_dir: str,
+    analyzer: NginxAnalyzer,
+    executor: Executor | None = None,
+) -> Dict[str, Engine]:
+    """Return reference `crossplane` parser with analyzer and optimized hook paths to compare."""
+    cache = DiskParseCache(cache_dir)
+    engines: Dict[str, Engine] = {
+        REFERENCE_ENGINE: lambda root, files: _dump_findings(analyzer.analyze(_crossplane_payload(root))),
+        "parser": lambda root, files: _dump_findings(analyzer.analyze(parse_config(root))),
+        "parse_cache": lambda root, files: _dump_findings(analyzer.analyze(parse_config(root, cache=cache))),
+        "dump": lambda root, files: _dump_findings(analyzer.analyze(_dump_payload(root, files))),
+        "template": lambda root, files: _template_findings(root, files, analyzer),
+        "hook": lambda root, files: _hook_findings(root, files, analyzer),
+    }
+    if executor is not None:
+        engines["parallel"] = lambda root, files: _dump_findings(analyzer.analyze(parse_config(root, executor)))
+    return engines
+
+
+def _legacy_search(statement: Dict, name: str, args: List[str] | None = None) -> List[Dict]:
+    """Return `name` directives in statement and its blocks, like first hook version did."""
+    found = [statement] if statement["directive"] == name and args in (None, statement["args"]) else []
+    for child in statement.get("block", []):
+        found.extend(_legacy_search(child, name, args))
+    return found
+
+
+def legacy_verdict(root: str) -> bool:
+    """Return verdict of nginx config by first hook version with default options.
+
+    Wide `try_files` directives are allowed only if all default deny locations
+    exist anywhere in config with `~` modifier and exactly the same regexes.
+
+    """
+    config = crossplane.parse(root)
+    ignored = ("fastcgi_params", "koi-utf", "koi-win", "mime.types", "scgi_params", "uwsgi_params", "win-utf")
+    if config["status"] != "ok" and any(
+        not any(keyword in error["error"] for keyword in ignored) for error in config["errors"]
+    ):
+        return False
+
+    statements = [statement for file in config["config"] for statement in file["parsed"]]
+    try_files = [found for statement in statements for found in _legacy_search(statement, "try_files")]
+    if not any(arg.lower() in ("$uri", "$uri/") for directive in try_files for arg in directive["args"]):
+        return True
+
+    denied = set()
+    for location in (found for statement in statements for found in _legacy_search(statement, "location")):
+        if location["args"][0] != "~" or location["args"][1] not in DEFAULT_DENY_LOCATIONS:
+            continue
+        if _legacy_search(location, "deny", ["all"]) or _legacy_search(location, "return", ["403"]):
+            denied.add(location["args"][1])
+    return len(denied) == len(DEFAULT_DENY_LOCATIONS)
+
+
+def verdict_engines() -> Dict[str, Engine]:
+    """Return first hook version verdict as reference and current hook verdict to compare on `legacy` cases."""
+    analyzer = NginxAnalyzer()
+    return {
+        REFERENCE_ENGINE: lambda root, files: [VALID if legacy_verdict(root) else INVALID],
+        "verdict": lambda root, files: [
+            VALID if _nginx_valid(root, analyzer, reporter=_CollectingReporter()) else INVALID,
+        ],
+    }
+
+
+def iter_cases(
+    count: int = DEFAULT_CASES,
+    seed: int = 0,
+    assets_dir: str | None = None,
+    mutations: int = 3,
+    legacy: bool = False,
+) -> Iterator[Case]:
+    """Iterate over configs of assets, their mutations and generated configs.
+
+    Args:
+      count: number of generated configs, every other one is mutated
+      seed: seed of random generator, the same seed gives the same cases
+      assets_dir: dir with dirs of nginx configs, i.e. tests assets
+      mutations: number of mutated copies of each asset config
+      legacy: whether to generate configs for `verdict_engines`
+
+    """
+    rng = random.Random(seed)
+    for asset in sorted(os.listdir(assets_dir)) if assets_dir else []:
+        asset_dir = os.path.join(assets_dir, asset)
+        files = {}
+        for path, _, names in os.walk(asset_dir):
+            for name in names:
+                with open(os.path.join(path, name)) as config_file:
+                    files[os.path.relpath(os.path.join(path, name), asset_dir)] = config_file.read()
+        for root in sorted(name for name in files if os.sep not in name and name.endswith(".conf")):
+            yield f"{asset}/{root}", root, files
+            for index in range(mutations):
+                yield f"{asset}/{root}~{index}", root, mutate_config(files, rng)
+
+    for index in range(count):
+        files = generate_config(rng, legacy)
+        if index % 2:
+            files = mutate_config(files, rng, legacy)
+        yield f"{'legacy' if legacy else 'generated'}-{index}", "nginx.conf", files
+
+
+@dataclass
+class CaseResult:
+    """Dataclass to represent comparison of engines on single config."""
+
+    name: str
+    differences: List[str] = field(default_factory=list)
+
+
+def _outcome(engine: Engine, root: str, files: Dict[str, str]) -> List[str]:
+    """Return findings (or unexpected error) of config validated by engine."""
+    try:
+        return engine(root, files)
+    except Exception as error:
+        return [f"{type(error).__name__}: {error}"]
+
+
+def compare_case(case: Case, engines: Dict[str, Engine], directory: str) -> CaseResult:
+    """Write config of case to `directory` and compare engines on it.
+
+    Verdicts and all findings of engines must be the same as of reference
+    one, the first difference of each engine is reported.
+
+    """
+    name, root_name, files = case
+    shutil.rmtree(directory, ignore_errors=True)
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(directory, path)), exist_ok=True)
+        with open(os.path.join(directory, path), "w") as config_file:
+            config_file.write(content)
+
+    root = os.path.join(directory, root_name)
+    result = CaseResult(name=name)
+    expected = _outcome(engines[REFERENCE_ENGINE], root, files)
+    for engine_name, engine in engines.items():
+        if engine_name == REFERENCE_ENGINE:
+            continue
+        actual = _outcome(engine, root, files)
+        if actual == expected:
+            continue
+        if bool(actual) != bool(expected) or {VALID, INVALID} & set(actual):
+            result.differences.append(f"{engine_name}: {actual or ['valid']}, expected {expected or ['valid']}")
+            continue
+        position = next(
+            (index for index, (item, other) in enumerate(zip(actual, expected)) if item != other),
+            min(len(actual), len(expected)),
+        )
+        got = actual[position] if position < len(actual) else "no finding"
+        wanted = expected[position] if position < len(expected) else "no finding"
+        result.differences.append(f"{engine_name}: finding {position + 1} is {got}, expected {wanted}")
+    return result
+
+
+def run_harness(
+    cases: Iterator[Case],
+    analyzer: NginxAnalyzer | None = None,
+    engines: Dict[str, Engine] | None = None,
+    executor: Executor | None = None,
+) -> Iterator[CaseResult]:
+    """Compare engines with reference one on all cases.
+
+    Args:
+      cases: cases to compare engines on, see `iter_cases`
+      analyzer: analyzer of `default_engines`, all checks and rules by default
+      engines: engines by names, `default_engines` if not passed
+      executor: process pool for `parallel` engine of `default_engines`
+
+    """
+    analyzer = analyzer or NginxAnalyzer(sensitive_uris=SENSITIVE_URIS, enabled_rules=list(RULES))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engines = engines or default_engines(os.path.join(temp_dir, "cache"), analyzer, executor)
+        for case in cases:
+            yield compare_case(case, engines, os.path.join(temp_dir, "case"))
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Check optimized nginx hook paths give the same results as reference ones."""
+    parser = argparse.ArgumentParser(
+        prog="python -m pre_commit_hooks.nginx.equivalence",
+        description=(
+            "Check optimized nginx hook paths give the same results as `crossplane` and "
+            "hook verdicts are the same as of its first version."
+        ),
+    )
+    parser.add_argument("--cases", type=int, default=DEFAULT_CASES, help="Number of generated configs of each kind")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of configs generator")
+    parser.add_argument(
+        "--assets_dir",
+        default=get_tests_assets_path("check-nginx-wide-range"),
+        help="Dir with dirs of nginx configs to compare engines on and mutate",
+    )
+    parser.add_argument("--jobs", type=int, default=2, help="Processes of `parallel` engine, 1 to skip it")
+    parser.add_argument(
+        "--format",
+        choices=["text", "json"],
+        default="text",
+        help="Output format, `json` prints JSON line per case with differences",
+    )
+    args = parser.parse_args(argv)
+
+    executor = ProcessPoolExecutor(args.jobs) if args.jobs > 1 else None
+    assets_dir = args.assets_dir if os.path.isdir(args.assets_dir) else None
+    total, different = 0, 0
+    try:
+        results = itertools.chain(
+            run_harness(iter_cases(args.cases, args.seed, assets_dir), executor=executor),
+            run_harness(iter_cases(args.cases, args.seed, legacy=True), engines=verdict_engines()),
+        )
+        for result in results:
+            total += 1
+            different += bool(result.differences)
+            if args.format == "json":
+                print(json.dumps({"case": result.name, "differences": result.differences}))
+            for difference in result.differences if args.format == "text" else ():
+                print(f"[DIFF] {result.name}: {difference}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if args.format == "text":
+        print(f"Compared {total} configs, {different} of them have differences.")
+    return int(bool(different))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
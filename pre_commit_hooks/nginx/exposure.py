@@ -0,0 +1,99 @@
+import hashlib
+import os
+from typing import Dict, List, Tuple
+
+from pre_commit_hooks.nginx.cache import LOCK_FILENAME, load_json, save_json
+from pre_commit_hooks.util import file_lock, git_index_blobs
+
+WEB_ROOTS_CACHE_FILENAME = "nginx-web-roots.json"
+# max number of cached indexes of web root trees
+WEB_ROOTS_CACHE_SIZE = 64
+
+
+def parse_web_roots(items: List[str]) -> Dict[str, str]:
+    """Parse `NGINX_ROOT=DIR` items to map of nginx roots to repo dirs."""
+    web_roots = {}
+    for item in items:
+        root, separator, directory = item.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid web root `{item}`, expected `NGINX_ROOT=DIR`")
+        web_roots[os.path.normpath(root)] = os.path.normpath(directory)
+    return web_roots
+
+
+def _index_key(blobs: List[Tuple[str, str | None]]) -> str:
+    """Return key of tracked files of dir by their paths and blob ids in git index."""
+    return hashlib.sha1("\0".join(f"{path}\0{blob}" for path, blob in blobs).encode()).hexdigest()
+
+
+class WebRootIndex:
+    """Index of repo files which are reachable under nginx `root` dirs.
+
+    Nginx `root` is a path on server (i.e. `/app/public`), it's mapped to repo
+    dir by explicit `web_roots` map or by the longest suffix of it which exists
+    in repo (i.e. `public`). Only files tracked by git are indexed, they are
+    taken from git index without walking dirs. Indexes are cached by paths
+    and blob ids of tracked files of dir, so they are built again only when
+    its tracked files are changed.
+
+    Args:
+      web_roots: map of nginx roots (or their parents) to repo dirs
+      cache_dir: dir to store indexes in, `None` to not cache them
+
+    """
+
+    def __init__(self, web_roots: Dict[str, str] | None = None, cache_dir: str | None = None):
+        self.web_roots = web_roots or {}
+        self.path = os.path.join(cache_dir, WEB_ROOTS_CACHE_FILENAME) if cache_dir else None
+        self.lock_path = os.path.join(cache_dir, LOCK_FILENAME) if cache_dir else None
+        self._blobs: Dict[str, str | None] | None = None
+        self._files: Dict[str, List[str]] = {}
+
+    def resolve(self, root: str) -> str | None:
+        """Return repo dir deployed as nginx `root`, `None` if it's unknown."""
+        if "$" in root:
+            return None
+        root = os.path.normpath(root)
+        path = root
+        while True:
+            if path in self.web_roots:
+                return os.path.normpath(os.path.join(self.web_roots[path], os.path.relpath(root, path)))
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+
+        parts = [part for part in root.split(os.sep) if part]
+        for position in range(len(parts)):
+            directory = os.path.join(*parts[position:])
+            if os.path.isdir(directory):
+                return directory
+        return None
+
+    @property
+    def blobs(self) -> Dict[str, str | None]:
+        """Return blob ids of files in git index, loaded once per run."""
+        if self._blobs is None:
+            self._blobs = git_index_blobs()
+        return self._blobs
+
+    def files(self, directory: str) -> List[str]:
+        """Return uris of tracked files in repo `directory`, i.e. `/.env`."""
+        if directory in self._files:
+            return self._files[directory]
+
+        prefix = "" if directory == "." else directory.replace(os.sep, "/") + "/"
+        blobs = sorted((path, blob) for path, blob in self.blobs.items() if path.startswith(prefix))
+        key = _index_key(blobs) if self.path else None
+        cached = load_json(self.path).get(key) if key else None
+        if cached is None:
+            cached = sorted(f"/{path[len(prefix):]}" for path, _ in blobs)
+            if key:
+                # indexes of other dirs could be stored by parallel hook processes
+                with file_lock(self.lock_path):
+                    entries = load_json(self.path)
+                    entries.pop(key, None)
+                    entries[key] = cached
+                    save_json(self.path, dict(list(entries.items())[-WEB_ROOTS_CACHE_SIZE:]))
+        self._files[directory] = cached
+        return cached
@@ -0,0 +1,153 @@
+import errno
+import fnmatch
+import glob
+import io
+import os
+import subprocess
+from typing import Dict, List, TextIO, Tuple
+
+# git mode of tree (directory) entries
+TREE_MODE = b"40000"
+
+# tree entry: mode and object id
+Entry = Tuple[bytes, str]
+
+
+class CatFileBatch:
+    """Reader of git objects through single `git cat-file --batch` co-process.
+
+    Objects are requested one by one through stdin of the process, so reading
+    any number of objects doesn't start new processes. Trees are cached by id,
+    so trees which are the same in many commits are read only once.
+
+    """
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._trees: Dict[str, Dict[str, Entry]] = {}
+
+    def read(self, name: str) -> Tuple[str, bytes] | None:
+        """Return type and content of git object, `None` if it's missing.
+
+        Args:
+          name: object id or revision, i.e. `HEAD^{tree}`
+
+        """
+        self.process.stdin.write(f"{name}\n".encode())
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            return None
+        content = self.process.stdout.read(int(header[2]))
+        self.process.stdout.read(1)  # trailing newline
+        return header[1].decode(), content
+
+    def tree(self, name: str) -> Dict[str, Entry]:
+        """Return entries of git tree by their names."""
+        if name not in self._trees:
+            _, content = self.read(name) or ("tree", b"")
+            # tree entry is `<mode> <name>\0<binary id>`, id size depends on
+            # repo hash algorithm, so it's taken from length of `name` id
+            id_size = len(name) // 2
+            entries: Dict[str, Entry] = {}
+            position = 0
+            while position < len(content):
+                end = content.index(b"\0", position)
+                mode, entry_name = content[position:end].split(b" ", 1)
+                entry_id = content[end + 1:end + 1 + id_size].hex()
+                entries[os.fsdecode(entry_name)] = (mode, entry_id)
+                position = end + 1 + id_size
+            self._trees[name] = entries
+        return self._trees[name]
+
+    def commit_tree(self, commit: str) -> str | None:
+        """Return id of root tree of commit."""
+        result = self.read(commit)
+        if result is None or result[0] != "commit":
+            return None
+        return result[1].split(b"\n", 1)[0].split()[1].decode()
+
+    def close(self):
+        """Stop `git cat-file` process."""
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class GitTreeSource:
+    """Source of nginx config files from git tree (i.e. tree of commit).
+
+    Paths are relative to repository root, files outside of repository are
+    treated as missing.
+
+    """
+
+    def __init__(self, batch: CatFileBatch, tree: str):
+        self.batch = batch
+        self.tree = tree
+
+    def _entry(self, path: str) -> Entry | None:
+        """Return mode and id of object at `path`, `None` if it's missing."""
+        path = os.path.normpath(path)
+        if path == ".":
+            return TREE_MODE, self.tree
+        if os.path.isabs(path) or path == os.pardir or path.startswith(os.pardir + os.sep):
+            return None
+        entry: Entry | None = (TREE_MODE, self.tree)
+        for name in path.split(os.sep):
+            if entry[0] != TREE_MODE:
+                return None
+            entry = self.batch.tree(entry[1]).get(name)
+            if entry is None:
+                return None
+        return entry
+
+    def object_id(self, path: str) -> str | None:
+        """Return id of blob or tree at `path`, `None` if it's missing."""
+        entry = self._entry(path)
+        return entry[1] if entry else None
+
+    def _missing(self, path: str) -> OSError:
+        """Return the same error as opening missing file raises."""
+        return FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+
+    def open(self, path: str) -> TextIO:
+        """Open config file for reading."""
+        object_id = self.object_id(path)
+        result = self.batch.read(object_id) if object_id else None
+        if result is None or result[0] != "blob":
+            raise self._missing(path)
+        return io.StringIO(result[1].decode("utf-8", errors="replace"))
+
+    def glob(self, pattern: str) -> List[str]:
+        """Return sorted paths matched by `include` pattern, like `glob.glob`."""
+        if os.path.isabs(pattern):
+            return []
+        parts = pattern.split(os.sep)
+        candidates = [""]
+        for position, part in enumerate(parts):
+            matched = []
+            for prefix in candidates:
+                if not glob.has_magic(part):
+                    matched.append(os.path.join(prefix, part))
+                    continue
+                entry = self._entry(prefix or ".")
+                entries = self.batch.tree(entry[1]) if entry and entry[0] == TREE_MODE else {}
+                for name, (mode, _) in entries.items():
+                    # hidden files are matched only explicitly, like in `glob`
+                    if name.startswith(".") and not part.startswith("."):
+                        continue
+                    if position < len(parts) - 1 and mode != TREE_MODE:
+                        continue
+                    if fnmatch.fnmatchcase(name, part):
+                        matched.append(os.path.join(prefix, name))
+            candidates = matched
+        return sorted(path for path in candidates if self.object_id(path) is not None)
+
+    def check(self, path: str):
+        """Raise `OSError` if explicitly included file is missing."""
+        if self.object_id(path) is None:
+            raise self._missing(path)
@@ -0,0 +1,325 @@
+import glob
+import hashlib
+import io
+import itertools
+import os
+import time
+from concurrent.futures import Executor
+from typing import Dict, Iterator, List, Protocol, TextIO, Tuple
+
+from crossplane.analyzer import analyze, enter_block_ctx
+from crossplane.errors import NgxParserBaseException, NgxParserDirectiveError
+# private helpers of `crossplane` are reused to lex the same way, so its
+# version is pinned below next minor release in `setup.cfg`
+from crossplane.lexer import _balance_braces, _lex_file_object
+from crossplane.parser import _prepare_if_args
+
+# min number of files to parse them in process pool, smaller batches are
+# parsed in current process as pool overhead outweighs the gain
+PARALLEL_MIN_FILES = 16
+
+Token = Tuple[str, int, bool]
+# error message, line and whether message should be followed by file name,
+# like `crossplane` errors are
+RawError = Tuple[str, int | None, bool]
+# `include` statement, context it is located in and number of errors found
+# before it, to insert errors of resolving includes in the right order
+PendingInclude = Tuple[Dict, Tuple[str, ...], int]
+# parsed statements, errors and `include` statements of single file
+ParsedText = Tuple[List[Dict], List[RawError], List[PendingInclude]]
+# pair of `include` statement and context it is located in
+IncludeStatement = Tuple[Dict, Tuple[str, ...]]
+
+
+class FileSystemSource:
+    """Source of nginx config files from file system.
+
+    Other sources (i.e. files of git commit) provide the same methods.
+
+    """
+
+    def open(self, path: str) -> TextIO:
+        """Open config file for reading."""
+        return io.open(path, mode="r", encoding="utf-8", errors="replace")
+
+    def glob(self, pattern: str) -> List[str]:
+        """Return sorted paths of files matched by `include` pattern."""
+        return sorted(glob.glob(pattern))
+
+    def check(self, path: str):
+        """Raise `OSError` if explicitly included file can't be opened."""
+        open(path).close()
+
+    def origin(self, path: str) -> str:
+        """Return path of file which config file is read from."""
+        return path
+
+
+FILE_SYSTEM_SOURCE = FileSystemSource()
+
+
+class ParseCache(Protocol):
+    """Cache of parsed files by hash of their content."""
+
+    def get(self, key: str) -> ParsedText | None:
+        """Return parsed file, returned value must not be shared between calls."""
+
+    def put(self, key: str, value: ParsedText):
+        """Store parsed file."""
+
+
+def _raw_error(error: Exception) -> RawError:
+    """Return parsing error without file name, so it can be cached."""
+    if isinstance(error, NgxParserBaseException):
+        return error.strerror, error.lineno, True
+    return str(error), getattr(error, "lineno", None), False
+
+
+def _error(error: RawError, filename: str) -> Dict:
+    """Return representation of parsing error, the same as `crossplane` one."""
+    message, line, with_filename = error
+    if with_filename:
+        message = f"{message} in {filename}:{line}" if line is not None else f"{message} in {filename}"
+    return {"error": message, "line": line}
+
+
+def _resolve_include(pattern: str, source: FileSystemSource) -> List[str]:
+    """Return files matched by `include` pattern, like `crossplane` does."""
+    if glob.has_magic(pattern):
+        return source.glob(pattern)
+    # nginx checks that explicitly included file can be opened and read
+    source.check(pattern)
+    return [pattern]
+
+
+def _read_args(statement: Dict, tokens: Iterator[Token]) -> Tuple[str, bool]:
+    """Read args of statement, return token which terminates statement."""
+    token, _, quoted = next(tokens)
+    while token not in ("{", ";", "}") or quoted:
+        if not token.startswith("#") or quoted:
+            statement["args"].append(token)
+        token, _, quoted = next(tokens)
+
+    if statement["directive"] == "if":
+        _prepare_if_args(statement)
+    return token, quoted
+
+
+def _skip_block(tokens: Iterator[Token]):
+    """Skip tokens until the end of current block, including nested ones."""
+    depth = 0
+    for token, _, quoted in tokens:
+        if token == "{" and not quoted:
+            depth += 1
+        elif token == "}" and not quoted:
+            if not depth:
+                return
+            depth -= 1
+
+
+def _parse_block(
+    tokens: Iterator[Token],
+    ctx: Tuple[str, ...],
+    errors: List[RawError],
+    includes: List[PendingInclude],
+) -> List[Dict]:
+    """Parse block of nginx config from tokens, mirrors `crossplane` parser.
+
+    `include` statements are collected to `includes` list to be resolved
+    after the whole file is parsed.
+
+    """
+    parsed: List[Dict] = []
+    for token, lineno, quoted in tokens:
+        if token == "}" and not quoted:
+            break
+
+        statement: Dict = {"directive": token, "line": lineno, "args": []}
+        if token.startswith("#") and not quoted:
+            continue
+
+        token, quoted = _read_args(statement, tokens)
+        try:
+            analyze(fname=None, stmt=statement, term=token, ctx=ctx)
+        except NgxParserDirectiveError as error:
+            errors.append(_raw_error(error))
+            if error.strerror.endswith(' is not terminated by ";"'):
+                if token != "}" and not quoted:
+                    _skip_block(tokens)
+                else:
+                    break
+            continue
+
+        if statement["directive"] == "include":
+            includes.append((statement, ctx, len(errors)))
+
+        if token == "{" and not quoted:
+            statement["block"] = _parse_block(tokens, enter_block_ctx(statement, ctx), errors, includes)
+
+        parsed.append(statement)
+    return parsed
+
+
+def _parse_text(text: str, ctx: Tuple[str, ...]) -> ParsedText:
+    """Parse content of single nginx config file without resolving includes.
+
+    Result depends only on `text` and `ctx`, so it can be cached.
+
+    """
+    errors: List[RawError] = []
+    includes: List[PendingInclude] = []
+    try:
+        parsed = _parse_block(_balance_braces(_lex_file_object(io.StringIO(text))), ctx, errors, includes)
+    except Exception as error:
+        errors.append(_raw_error(error))
+        parsed = []
+    return parsed, errors, includes
+
+
+def parse_text_key(text: str, ctx: Tuple[str, ...]) -> str:
+    """Return key of parsed file content in parse cache."""
+    return hashlib.sha1(f"{ctx}\0{text}".encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def _resolve_includes(
+    parsing: Dict,
+    parsed_text: ParsedText,
+    config_dir: str,
+    source: FileSystemSource,
+) -> List[IncludeStatement]:
+    """Resolve `include` statements of parsed file and fill its errors.
+
+    Errors of resolving includes are placed among parse errors by position of
+    `include` statement, like `crossplane` reports them.
+
+    """
+    filename = parsing["file"]
+    parsing["parsed"], errors, pending_includes = parsed_text
+    includes: List[IncludeStatement] = []
+    position = 0
+    for statement, ctx, errors_before in pending_includes:
+        parsing["errors"].extend(_error(error, filename) for error in errors[position:errors_before])
+        position = errors_before
+        try:
+            statement["includes"] = _resolve_include(os.path.join(config_dir, statement["args"][0]), source)
+        except Exception as error:
+            error.lineno = statement["line"]
+            statement["includes"] = []
+            parsing["errors"].append(_error(_raw_error(error), filename))
+        includes.append((statement, ctx))
+    parsing["errors"].extend(_error(error, filename) for error in errors[position:])
+    return includes
+
+
+def parse_file(
+    filename: str,
+    ctx: Tuple[str, ...],
+    config_dir: str,
+    source: FileSystemSource = FILE_SYSTEM_SOURCE,
+    cache: ParseCache | None = None,
+) -> Tuple[Dict, List[IncludeStatement]]:
+    """Parse single nginx config file without parsing files included to it.
+
+    Args:
+      filename: path to nginx config file
+      ctx: context file is included to, i.e. `("http", "server")`
+      config_dir: dir of nginx root config to resolve relative includes
+      source: source to read config files from
+      cache: cache of parsed files, shared by configs with the same files
+
+    Returns:
+      (tuple): parsed file in `crossplane` format and its `include` statements
+
+    """
+    parsing: Dict = {"file": filename, "status": "ok", "errors": [], "parsed": []}
+    includes: List[IncludeStatement] = []
+    try:
+        with source.open(filename) as config_file:
+            text = config_file.read()
+    except Exception as error:
+        parsing["errors"].append(_error(_raw_error(error), filename))
+    else:
+        key = parse_text_key(text, ctx) if cache is not None else ""
+        parsed_text = cache.get(key) if cache is not None else None
+        if parsed_text is None:
+            parsed_text = _parse_text(text, ctx)
+            if cache is not None:
+                cache.put(key, parsed_text)
+        includes = _resolve_includes(parsing, parsed_text, config_dir, source)
+
+    if parsing["errors"]:
+        parsing["status"] = "failed"
+    return parsing, includes
+
+
+class ParseDeadlineError(Exception):
+    """Parsing of nginx config is stopped, because its deadline is passed."""
+
+
+def parse_config(
+    filename: str,
+    executor: Executor | None = None,
+    source: FileSystemSource = FILE_SYSTEM_SOURCE,
+    cache: ParseCache | None = None,
+    deadline: float | None = None,
+    jobs: int = 1,
+) -> Dict:
+    """Parse nginx config and all files included to it.
+
+    Result is the same as `crossplane.parse(filename)` one. Include closure is
+    resolved level by level: files included by already parsed ones are parsed
+    at once, in `executor` processes if there are many of them.
+
+    Args:
+      filename: path to nginx root config
+      executor: process pool to parse files in parallel
+      source: source to read config files from, it's passed to `executor`
+        processes, so it should be picklable to use them
+      cache: cache of parsed files, passed to `executor` processes as well
+      deadline: `time.monotonic()` value after which next level of included
+        files is not parsed and `ParseDeadlineError` is raised
+      jobs: number of `executor` processes, files are split to chunks by it
+
+    Returns:
+      (dict): parsed nginx config in `crossplane` format
+
+    """
+    config_dir = os.path.dirname(filename)
+    payload: Dict = {"status": "ok", "errors": [], "config": []}
+    included = {filename: 0}
+    level: List[Tuple[str, Tuple[str, ...]]] = [(filename, ())]
+    while level:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise ParseDeadlineError(filename)
+        filenames, contexts = zip(*level)
+        arguments = (
+            filenames,
+            contexts,
+            itertools.repeat(config_dir),
+            itertools.repeat(source),
+            itertools.repeat(cache),
+        )
+        if executor is not None and len(level) >= PARALLEL_MIN_FILES:
+            chunksize = max(1, len(level) // (4 * jobs))
+            results = executor.map(parse_file, *arguments, chunksize=chunksize)
+        else:
+            results = map(parse_file, *arguments)
+
+        level = []
+        for parsing, includes in results:
+            payload["config"].append(parsing)
+            for error in parsing["errors"]:
+                payload["status"] = "failed"
+                payload["errors"].append({"file": parsing["file"], **error})
+
+            # statements are returned with the parsed file in one object, so
+            # they are the same objects as in `parsing` even after pickling
+            for statement, ctx in includes:
+                indexes = []
+                for name in statement["includes"]:
+                    if name not in included:
+                        included[name] = len(included)
+                        level.append((name, ctx))
+                    indexes.append(included[name])
+                statement["includes"] = indexes
+    return payload
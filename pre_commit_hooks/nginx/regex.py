@@ -0,0 +1,159 @@
+import functools
+from typing import Any, Hashable, Iterable, Tuple
+
+try:
+    from re import _parser as sre_parse  # python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+# `.*` item in canonical form, is meaningless at the edges of unanchored regex
+_ANY_REPEAT = ("REPEAT", 0, sre_parse.MAXREPEAT, (("ANY", None),))
+_AT_BEGINNING = ("AT", "AT_BEGINNING")
+# items which are never backtracked into (python 3.11+), so order of nested
+# alternatives changes what they match
+_NO_BACKTRACKING_OPS = tuple(
+    op for op in (getattr(sre_parse, "ATOMIC_GROUP", None), getattr(sre_parse, "POSSESSIVE_REPEAT", None)) if op
+)
+
+
+class _OpaqueRegex(Exception):
+    """Raised when regex can't be safely normalized (i.e. contains backrefs or atomic groups)."""
+
+
+def _freeze(value: Any) -> Hashable:
+    """Convert `sre_parse` argument value to hashable representation."""
+    if isinstance(value, sre_parse.SubPattern):
+        return _canonical_sequence(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, int) and type(value) is not int:
+        # named `sre_constants` like `AT_END` or `CATEGORY_DIGIT`
+        return str(value)
+    return value
+
+
+def _canonical_set(items: Iterable) -> Tuple:
+    """Return canonical form of `[...]` characters set."""
+    negate = False
+    members = set()
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+            continue
+        members.add((str(op), _freeze(av)))
+    return ("IN", negate, tuple(sorted(members, key=repr)))
+
+
+def _merge_charset(options: set) -> Tuple | None:
+    """Merge alternatives like `a|[bc]|d` into single `[abcd]` set if possible."""
+    members = set()
+    for option in options:
+        if len(option) != 1:
+            return None
+        item = option[0]
+        if item[0] == "LITERAL":
+            members.add(item)
+        elif item[0] == "IN" and not item[1]:
+            members.update(item[2])
+        else:
+            return None
+    return ("IN", False, tuple(sorted(members, key=repr)))
+
+
+def _canonical_branch(alternatives: Iterable) -> Tuple:
+    """Return canonical form of `a|b|c` alternation.
+
+    Alternatives order doesn't change whether regex matches uri or not, if
+    regex can backtrack into them, so they are deduplicated and sorted,
+    nested alternations are flattened. Atomic groups and possessive repeats
+    aren't normalized at all.
+
+    """
+    options = set()
+    for alternative in alternatives:
+        sequence = _canonical_sequence(alternative)
+        if len(sequence) == 1 and sequence[0][0] == "BRANCH":
+            options.update(sequence[0][1])
+        else:
+            options.add(sequence)
+
+    charset = _merge_charset(options)
+    if charset is not None:
+        return (charset,)
+    if len(options) == 1:
+        return next(iter(options))
+    return (("BRANCH", tuple(sorted(options, key=repr))),)
+
+
+def _canonical_item(op: Any, av: Any) -> Tuple:
+    """Return canonical form of single parsed regex item as tuple of items."""
+    if op is sre_parse.SUBPATTERN:
+        _, add_flags, del_flags, pattern = av
+        # groups without flags are redundant when only matching is checked
+        if not add_flags and not del_flags:
+            return _canonical_sequence(pattern)
+        return (("SUBPATTERN", add_flags, del_flags, _canonical_sequence(pattern)),)
+    if op is sre_parse.BRANCH:
+        return _canonical_branch(av[1])
+    if op is sre_parse.IN:
+        return (_canonical_set(av),)
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        # greedy and lazy repeats match exactly the same uris
+        min_repeat, max_repeat, pattern = av
+        return (("REPEAT", min_repeat, max_repeat, _canonical_sequence(pattern)),)
+    if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS) or op in _NO_BACKTRACKING_OPS:
+        raise _OpaqueRegex
+    return ((str(op), _freeze(av)),)
+
+
+def _canonical_sequence(items: Iterable) -> Tuple:
+    """Return canonical form of parsed regex items sequence."""
+    result = []
+    for op, av in items:
+        result.extend(_canonical_item(op, av))
+    return tuple(result)
+
+
+def _strip_wildcards(sequence: Tuple) -> Tuple:
+    """Remove leading and trailing `.*` which don't change search result.
+
+    `location ~ /cron.*` matches exactly the same uris as `location ~ /cron`
+    and `location ~ ^.*/cron`, because nginx searches regex in uri.
+
+    """
+    sequence = list(sequence)
+    while sequence and sequence[-1] == _ANY_REPEAT:
+        sequence.pop()
+    if sequence[:2] == [_AT_BEGINNING, _ANY_REPEAT]:
+        sequence.pop(0)
+    while sequence and sequence[0] == _ANY_REPEAT:
+        sequence.pop(0)
+    return tuple(sequence)
+
+
+@functools.lru_cache(maxsize=None)
+def canonical_form(pattern: str) -> Hashable:
+    """Return canonical form of location `pattern` regex.
+
+    Regexes which differ only in alternations order, redundant groups, greedy
+    or lazy repeats or `.*` at the edges have equal canonical forms, i.e.
+
+      \\.(json|sh|xml)$  ->  \\.(?:sh|xml|json)$
+
+    If regex can't be parsed or normalized - its canonical form is the regex
+    itself, so only exactly the same string would be equal to it.
+
+    Results are memoized, so each regex is normalized only once per process.
+
+    Args:
+      pattern: location regex
+
+    Returns:
+      (hashable): canonical form of regex to compare with other ones
+
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+        return (parsed.state.flags, _strip_wildcards(_canonical_sequence(parsed)))
+    except (sre_parse.error, _OpaqueRegex, RecursionError):
+        return ("RAW", pattern)
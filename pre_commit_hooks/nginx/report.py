@@ -0,0 +1,116 @@
+import dataclasses
+import json
+import sys
+from typing import Dict, TextIO
+
+from pre_commit_hooks.nginx.rules import Finding
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+TOOL_NAME = "check-nginx-wide-range"
+TOOL_URI = "https://github.com/saritasa-nest/saritasa-pre-commit-hooks"
+
+
+class Reporter:
+    """Base class of reporter of nginx findings.
+
+    Findings are written as soon as they are reported, so nothing is kept in
+    memory and consumer can read output while validation is still running.
+    Other messages (i.e. warnings) are written with `note`.
+
+    Args:
+      stream: stream to write to, current `sys.stdout` by default
+
+    """
+
+    def __init__(self, stream: TextIO | None = None):
+        self._stream = stream
+
+    @property
+    def stream(self) -> TextIO:
+        """Stream to write findings to."""
+        return self._stream or sys.stdout
+
+    def report(self, root: str, finding: Finding):
+        """Write finding of nginx `root` config."""
+        raise NotImplementedError
+
+    def note(self, message: str):
+        """Write message which is not a finding, to stderr for structured formats."""
+        print(message, file=sys.stderr)
+
+    def close(self):
+        """Finish output after all findings are reported."""
+
+
+class TextReporter(Reporter):
+    """Reporter of findings as hook messages, one per line."""
+
+    def report(self, root: str, finding: Finding):
+        print(finding, file=self.stream)
+
+    def note(self, message: str):
+        print(message, file=self.stream)
+
+
+class JsonLinesReporter(Reporter):
+    """Reporter of findings as JSON object per line with nginx root."""
+
+    def report(self, root: str, finding: Finding):
+        print(json.dumps({"root": root, **dataclasses.asdict(finding)}), file=self.stream, flush=True)
+
+
+class SarifReporter(Reporter):
+    """Reporter of findings as SARIF log with single run.
+
+    Log is written in parts: its beginning on the first write, result per
+    finding and the end on `close`, so results are streamed as well.
+
+    """
+
+    def __init__(self, stream: TextIO | None = None):
+        super().__init__(stream)
+        self._results = 0
+
+    def _result(self, root: str, finding: Finding) -> Dict:
+        """Return SARIF result of finding."""
+        location: Dict = {"artifactLocation": {"uri": finding.file or root}}
+        if finding.line is not None:
+            location["region"] = {"startLine": finding.line}
+        result: Dict = {
+            "ruleId": finding.kind,
+            "level": "error",
+            "message": {"text": finding.message},
+            "locations": [{"physicalLocation": location}],
+        }
+        if finding.fingerprint is not None:
+            result["partialFingerprints"] = {"nginxFinding/v1": finding.fingerprint}
+        return result
+
+    def _write_header(self):
+        if self._results == 0:
+            header = json.dumps({
+                "$schema": SARIF_SCHEMA,
+                "version": "2.1.0",
+                "runs": [{"tool": {"driver": {"name": TOOL_NAME, "informationUri": TOOL_URI}}, "results": []}],
+            })
+            # open `results` array to write results to it one by one
+            self.stream.write(header[:-len("]}]}")])
+
+    def report(self, root: str, finding: Finding):
+        self._write_header()
+        separator = "," if self._results else ""
+        self._results += 1
+        self.stream.write(f"{separator}\n{json.dumps(self._result(root, finding))}")
+        self.stream.flush()
+
+    def close(self):
+        self._write_header()
+        self.stream.write("\n]}]}\n")
+        self.stream.flush()
+
+
+REPORTERS = {
+    "text": TextReporter,
+    "jsonl": JsonLinesReporter,
+    "sarif": SarifReporter,
+}
@@ -0,0 +1,297 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Pattern, Tuple
+from urllib.parse import unquote
+
+from pre_commit_hooks.nginx.tree import iter_block, iter_servers
+
+# request is rejected by `deny all` or `return 4xx` directives
+DENIED = "denied"
+# request is served by location with wide `try_files` directive
+SERVED = "served"
+# request is processed by location without wide `try_files` (i.e. proxied)
+OTHER = "other"
+# request is processed by location without content handler, so nginx serves
+# it from `root` or `alias` as static file
+STATIC = "static"
+# no location matches request, so nginx serves it from `root` as static file
+UNMATCHED = "unmatched"
+
+WIDE_TRY_FILES_ARGS = ("$uri", "$uri/")
+# directives which make location process requests other than static files
+CONTENT_HANDLER_DIRECTIVES = (
+    "empty_gif", "fastcgi_pass", "grpc_pass", "memcached_pass", "proxy_pass",
+    "return", "scgi_pass", "stub_status", "try_files", "uwsgi_pass",
+)
+
+
+def is_wide_try_files(args: List[str]) -> bool:
+    """Check whether `try_files` directive args search for files by `$uri`."""
+    return any(arg.lower() in WIDE_TRY_FILES_ARGS for arg in args)
+
+
+def normalize_uri(uri: str) -> str:
+    """Normalize uri the same way as nginx does before locations matching.
+
+    Query string is removed, `%XX` sequences are decoded, multiple slashes are
+    merged and `.` and `..` segments are resolved.
+
+    """
+    if uri.startswith("/") and not any(item in uri for item in ("?", "%", "//", "/.")):
+        return uri
+
+    uri = unquote(uri.split("?", 1)[0])
+    if not uri.startswith("/"):
+        uri = f"/{uri}"
+
+    segments = uri.split("/")[1:]
+    last = segments.pop()
+    if last in (".", ".."):
+        segments.append(last)
+        last = ""
+
+    parts: List[str] = []
+    for segment in segments:
+        if segment == "..":
+            if parts:
+                parts.pop()
+        elif segment not in ("", "."):
+            parts.append(segment)
+    parts.append(last)
+    return "/" + "/".join(parts)
+
+
+@dataclass
+class Location:
+    """Dataclass to represent `location` block with its routing verdict."""
+
+    modifier: str
+    uri: str
+    file: str
+    line: int
+    verdict: str
+    children: "LocationIndex | None" = None
+
+    @property
+    def name(self) -> str:
+        """Return location as it is written in nginx config."""
+        return " ".join(item for item in ("location", self.modifier, self.uri) if item)
+
+
+class _TrieNode:
+    """Node of radix tree with prefix locations."""
+
+    __slots__ = ("label", "location", "children")
+
+    def __init__(self, label: str = "", location: Location | None = None):
+        self.label = label
+        self.location = location
+        self.children: Dict[str, "_TrieNode"] = {}
+
+
+class PrefixTrie:
+    """Radix tree of prefix locations to find the longest matching one.
+
+    Lookup costs the number of tree branches passed by uri, not the number of
+    locations, i.e. it doesn't depend on the number of `location` blocks.
+
+    """
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def insert(self, prefix: str, location: Location):
+        """Add location with `prefix` to the tree, first added one wins."""
+        node, position = self.root, 0
+        while position < len(prefix):
+            child = node.children.get(prefix[position])
+            if child is None:
+                node.children[prefix[position]] = _TrieNode(prefix[position:], location)
+                return
+
+            common = 0
+            label = child.label
+            rest = prefix[position:]
+            while common < min(len(label), len(rest)) and label[common] == rest[common]:
+                common += 1
+            if common < len(label):
+                # split edge, so new prefix could end in the middle of it
+                middle = _TrieNode(label[:common])
+                child.label = label[common:]
+                middle.children[child.label[0]] = child
+                node.children[prefix[position]] = middle
+                child = middle
+
+            node, position = child, position + common
+
+        if node.location is None:
+            node.location = location
+
+    def longest_match(self, uri: str) -> Location | None:
+        """Return location with the longest prefix of `uri` if any."""
+        node, position = self.root, 0
+        best = node.location
+        while position < len(uri):
+            child = node.children.get(uri[position])
+            if child is None or not uri.startswith(child.label, position):
+                break
+            node, position = child, position + len(child.label)
+            if node.location is not None:
+                best = node.location
+        return best
+
+
+@dataclass
+class LocationIndex:
+    """Index of locations of single level (server or nested to location)."""
+
+    exact: Dict[str, Location] = field(default_factory=dict)
+    prefixes: PrefixTrie = field(default_factory=PrefixTrie)
+    regexes: List[Tuple[Pattern, Location]] = field(default_factory=list)
+    # regexes which can't be compiled by python `re`, i.e. PCRE specific ones
+    unsupported: List[Location] = field(default_factory=list)
+
+    def add(self, location: Location):
+        """Add `location` to the corresponding index according to modifier."""
+        if location.modifier == "=":
+            self.exact.setdefault(location.uri, location)
+        elif location.modifier in ("", "^~"):
+            self.prefixes.insert(location.uri, location)
+        elif location.modifier in ("~", "~*"):
+            flags = re.IGNORECASE if location.modifier == "~*" else 0
+            try:
+                self.regexes.append((re.compile(location.uri, flags), location))
+            except re.error:
+                self.unsupported.append(location)
+
+    def find(self, uri: str) -> Tuple[Location | None, bool]:
+        """Find location for `uri` following nginx selection algorithm.
+
+        1. Exact `=` location wins immediately.
+        2. The longest prefix location is remembered, its nested locations
+           are checked the same way.
+        3. If the longest prefix isn't `^~` one, regexes are checked in order
+           of appearance and the first matched one wins.
+        4. Otherwise the remembered prefix location is used.
+
+        Returns:
+          (tuple): found location and flag whether search is finished
+
+        """
+        location = self.exact.get(uri)
+        if location is not None:
+            return location, True
+
+        location = self.prefixes.longest_match(uri)
+        noregex = False
+        if location is not None:
+            noregex = location.modifier == "^~"
+            if location.children is not None:
+                nested, done = location.children.find(uri)
+                if done:
+                    return nested, True
+                location = nested or location
+
+        if not noregex:
+            for regex, regex_location in self.regexes:
+                if regex.search(uri):
+                    nested = None
+                    if regex_location.children is not None:
+                        nested, _ = regex_location.children.find(uri)
+                    return nested or regex_location, True
+
+        return location, False
+
+
+def _location_verdict(payload: Dict, statement: Dict, file: str, denied: bool) -> Tuple[str, bool]:
+    """Return routing verdict of location block and whether it denies all.
+
+    Content handlers aren't inherited by nested locations, so location
+    without own handler serves static files.
+
+    """
+    verdict = STATIC
+    for child, _ in iter_block(payload, statement.get("block", []), file):
+        args = child["args"]
+        if child["directive"] == "deny" and args == ["all"]:
+            denied = True
+        elif child["directive"] == "return" and args and re.fullmatch("4[0-9]{2}", args[0]):
+            verdict = DENIED
+        elif child["directive"] == "try_files" and is_wide_try_files(args) and verdict != DENIED:
+            verdict = SERVED
+        elif child["directive"] in CONTENT_HANDLER_DIRECTIVES and verdict == STATIC:
+            verdict = OTHER
+    return (DENIED if denied else verdict), denied
+
+
+def _build_index(payload: Dict, block: List[Dict], file: str, denied: bool) -> LocationIndex:
+    """Build index of locations defined in `block` including nested ones."""
+    index = LocationIndex()
+    for statement, statement_file in iter_block(payload, block, file):
+        if statement["directive"] != "location" or not statement["args"]:
+            continue
+
+        args = statement["args"]
+        modifier, uri = (args[0], args[1]) if len(args) > 1 else ("", args[0])
+        verdict, location_denied = _location_verdict(payload, statement, statement_file, denied)
+        location = Location(
+            modifier=modifier,
+            uri=uri,
+            file=statement_file,
+            line=statement["line"],
+            verdict=verdict,
+        )
+        children = _build_index(payload, statement.get("block", []), statement_file, location_denied)
+        if children.exact or children.prefixes.root.children or children.regexes:
+            location.children = children
+        index.add(location)
+    return index
+
+
+class ServerRouter:
+    """Router of requests to locations of a single `server` block."""
+
+    def __init__(self, payload: Dict, server: Dict, file: str):
+        self.file = file
+        self.line = server["line"]
+        self.server_names: List[str] = []
+        denied = False
+        for statement, _ in iter_block(payload, server.get("block", []), file):
+            if statement["directive"] == "server_name":
+                self.server_names.extend(statement["args"])
+            elif statement["directive"] == "deny" and statement["args"] == ["all"]:
+                denied = True
+        self.default_verdict = DENIED if denied else UNMATCHED
+        self.index = _build_index(payload, server.get("block", []), file, denied)
+
+    def route(self, uri: str) -> Location | None:
+        """Return location which would process request to `uri`."""
+        location, _ = self.index.find(normalize_uri(uri))
+        return location
+
+    def classify(self, uri: str) -> str:
+        """Return verdict how request to `uri` would be processed."""
+        location = self.route(uri)
+        return self.default_verdict if location is None else location.verdict
+
+    def route_many(self, uris: Iterable[str]) -> Iterator[Tuple[str, Location | None]]:
+        """Route each uri from `uris`, duplicates are routed only once."""
+        routed: Dict[str, Location | None] = {}
+        for uri in uris:
+            normalized = normalize_uri(uri)
+            if normalized not in routed:
+                routed[normalized], _ = self.index.find(normalized)
+            yield uri, routed[normalized]
+
+
+def build_routers(payload: Dict) -> List[ServerRouter]:
+    """Build routers for all `server` blocks of nginx config.
+
+    Args:
+      payload: nginx config parsed by `crossplane`
+
+    Returns:
+      (list): routers in order of `server` blocks appearance
+
+    """
+    return [ServerRouter(payload, server, file) for server, file in iter_servers(payload)]
@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Set, Tuple, Type
+
+from pre_commit_hooks.nginx.tree import NO_PARENT, ConfigTree
+
+# kinds of findings of optional rules
+AUTOINDEX_ENABLED = "autoindex_enabled"
+ALIAS_TRAVERSAL = "alias_traversal"
+SERVER_TOKENS_ENABLED = "server_tokens_enabled"
+CLIENT_MAX_BODY_SIZE_MISSING = "client_max_body_size_missing"
+
+
+@dataclass(frozen=True)
+class Finding:
+    """Dataclass to represent problem found in nginx config."""
+
+    kind: str
+    message: str
+    file: str | None = None
+    line: int | None = None
+    # identity of finding which doesn't depend on lines, to keep known
+    # findings in baseline, `None` if finding can't be baselined
+    fingerprint: str | None = None
+
+    def __str__(self) -> str:
+        return self.message
+
+
+def node_fingerprint(kind: str, tree: ConfigTree, index: int) -> str:
+    """Return fingerprint of finding of tree node.
+
+    It's made of finding kind, file, `server_name` of enclosing `server` block
+    and normalized directive, i.e.
+    `wide_try_files:nginx.conf:example.com:try_files $uri /index.php`.
+
+    """
+    node = tree.nodes[index]
+    server = index if node["directive"] == "server" else tree.servers[index]
+    directive = " ".join([node["directive"], *node["args"]])
+    return f"{kind}:{tree.files[index]}:{' '.join(tree.server_names(server))}:{directive}"
+
+
+def server_fingerprint(kind: str, tree: ConfigTree, server: int, subject: str) -> str:
+    """Return fingerprint of finding of `server` block, i.e. missing deny location.
+
+    It's made like `node_fingerprint` of finding kind, file and `server_name`
+    of `server` block and subject of finding, i.e.
+    `location_not_disabled:nginx.conf:example.com:location ~ /cron.*`.
+
+    """
+    file = tree.files[server] if server != NO_PARENT else ""
+    return f"{kind}:{file}:{' '.join(tree.server_names(server))}:{subject}"
+
+
+def _node_finding(kind: str, message: str, tree: ConfigTree, index: int) -> Finding:
+    """Return finding of tree node with its file and line in message."""
+    file, line = tree.files[index], tree.nodes[index]["line"]
+    return Finding(
+        kind=kind,
+        message=f"[ERROR] {message}: file `{file}`, {line} line",
+        file=file,
+        line=line,
+        fingerprint=node_fingerprint(kind, tree, index),
+    )
+
+
+class Rule:
+    """Base class of nginx config rule.
+
+    Rule lists names of directives it checks in `directives`, engine passes
+    only nodes with these directives to `visit`. Rule is created for each
+    analyzed config, so it can collect state in `visit` and check it in
+    `finish`.
+
+    """
+
+    # name to enable rule with, i.e. `--enable_rules autoindex`
+    name = ""
+    directives: Tuple[str, ...] = ()
+
+    def visit(self, tree: ConfigTree, index: int) -> Iterable[Finding]:
+        """Check node of tree with one of `directives`."""
+        return ()
+
+    def finish(self, tree: ConfigTree) -> Iterable[Finding]:
+        """Check state collected from all visited nodes."""
+        return ()
+
+
+class AutoindexRule(Rule):
+    """Directory listing must not be enabled with `autoindex on`."""
+
+    name = "autoindex"
+    directives = ("autoindex",)
+
+    def visit(self, tree: ConfigTree, index: int) -> Iterable[Finding]:
+        if tree.nodes[index]["args"] == ["on"]:
+            yield _node_finding(AUTOINDEX_ENABLED, "`autoindex on` directive found", tree, index)
+
+
+class AliasTraversalRule(Rule):
+    """`alias` with trailing slash in prefix location without it.
+
+    Request to `/static../app.py` for
+
+      location /static {
+        alias /app/static/;
+      }
+
+    is mapped to `/app/static/../app.py` file.
+
+    """
+
+    name = "alias_traversal"
+    directives = ("alias",)
+
+    def visit(self, tree: ConfigTree, index: int) -> Iterable[Finding]:
+        parent = tree.parents[index]
+        args = tree.nodes[index]["args"]
+        if parent == NO_PARENT or tree.nodes[parent]["directive"] != "location" or not args:
+            return
+        location = tree.nodes[parent]["args"]
+        modifier, uri = (location[0], location[1]) if len(location) > 1 else ("", location[0])
+        if modifier in ("", "^~") and not uri.endswith("/") and args[0].endswith("/"):
+            yield _node_finding(
+                ALIAS_TRAVERSAL,
+                f"`alias {args[0]}` of `location {uri}` allows path traversal with `{uri}../` uris",
+                tree,
+                index,
+            )
+
+
+class ServerTokensRule(Rule):
+    """Nginx version must not be sent in responses with `server_tokens on`."""
+
+    name = "server_tokens"
+    directives = ("server_tokens",)
+
+    def visit(self, tree: ConfigTree, index: int) -> Iterable[Finding]:
+        if tree.nodes[index]["args"] == ["on"]:
+            yield _node_finding(SERVER_TOKENS_ENABLED, "`server_tokens on` directive found", tree, index)
+
+
+class ClientMaxBodySizeRule(Rule):
+    """Each `server` must set `client_max_body_size` in it or `http` block."""
+
+    name = "client_max_body_size"
+    directives = ("server", "client_max_body_size")
+
+    def __init__(self):
+        self.servers: List[int] = []
+        self.limited: Set[int] = set()
+
+    def visit(self, tree: ConfigTree, index: int) -> Iterable[Finding]:
+        if tree.nodes[index]["directive"] == "server":
+            self.servers.append(index)
+        else:
+            self.limited.add(tree.parents[index])
+        return ()
+
+    def finish(self, tree: ConfigTree) -> Iterable[Finding]:
+        for server in self.servers:
+            if server not in self.limited and tree.parents[server] not in self.limited:
+                yield _node_finding(
+                    CLIENT_MAX_BODY_SIZE_MISSING,
+                    "`client_max_body_size` is not set for `server` block",
+                    tree,
+                    server,
+                )
+
+
+RULES: Dict[str, Type[Rule]] = {
+    rule.name: rule
+    for rule in (AutoindexRule, AliasTraversalRule, ServerTokensRule, ClientMaxBodySizeRule)
+}
+
+
+class RuleEngine:
+    """Runner of rules over config tree in a single pass.
+
+    Rules are dispatched by directive name through a hash table, so each node
+    is passed only to rules interested in it and adding rules costs only
+    nodes with their directives.
+
+    Args:
+      names: names of enabled rules from `RULES`
+
+    """
+
+    def __init__(self, names: Sequence[str] = ()):
+        unknown = [name for name in names if name not in RULES]
+        if unknown:
+            raise ValueError(f"Unknown nginx rules: {', '.join(unknown)}, available: {', '.join(RULES)}")
+        self.names: Tuple[str, ...] = tuple(dict.fromkeys(names))
+
+    def run(self, tree: ConfigTree) -> List[Finding]:
+        """Return findings of visited nodes in config order, then of collected state."""
+        if not self.names:
+            return []
+
+        rules = [RULES[name]() for name in self.names]
+        dispatch: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            for directive in rule.directives:
+                dispatch.setdefault(directive, []).append(rule)
+
+        findings: List[Finding] = []
+        for index, node in enumerate(tree.nodes):
+            for rule in dispatch.get(node["directive"], ()):
+                findings.extend(rule.visit(tree, index))
+        for rule in rules:
+            findings.extend(rule.finish(tree))
+        return findings
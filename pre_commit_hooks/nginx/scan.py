@@ -0,0 +1,287 @@
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+from pre_commit_hooks.nginx.analyzer import Finding, NginxAnalyzer
+from pre_commit_hooks.nginx.cache import DiskParseCache
+from pre_commit_hooks.nginx.parser import parse_config
+
+DEFAULT_ROOT_NAMES = ("nginx.conf",)
+# kind of finding for unexpected failure of nginx root validation
+SCAN_ERROR = "scan_error"
+# dirs which never contain nginx configs of the project
+SKIPPED_DIRS = frozenset((".git", "node_modules", "__pycache__", ".tox", ".venv", "venv"))
+# max number of submitted roots per process, to stream results while repos
+# are still being discovered and to not keep all of them in memory
+ROOTS_PER_PROCESS = 4
+# `include` directive at the beginning of statement, enough to estimate size
+# of include closure without parsing it
+INCLUDE_REGEX = re.compile(r"""(?:^|[;{}])\s*include\s+["']?([^"';\s]+)""", re.MULTILINE)
+SHARD_REGEX = re.compile(r"^(?P<index>[0-9]+)/(?P<count>[0-9]+)$")
+
+
+@dataclass
+class ScanResult:
+    """Dataclass to represent scan result of single nginx root."""
+
+    repo: str
+    root: str
+    findings: List[Finding] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def valid(self) -> bool:
+        """Whether nginx config is valid."""
+        return not self.findings and self.error is None
+
+
+def discover_roots(
+    directories: Iterable[str],
+    root_names: Iterable[str] = DEFAULT_ROOT_NAMES,
+) -> Iterator[Tuple[str, str]]:
+    """Find nginx root configs in directories with checked out repos.
+
+    Args:
+      directories: directories to search repos in
+      root_names: file names of nginx root configs
+
+    Yields:
+      (tuple): repo dir (closest dir with `.git`) and path of nginx root
+
+    """
+    root_names = frozenset(root_names)
+    for directory in directories:
+        pending = [(directory, directory)]
+        while pending:
+            path, repo = pending.pop()
+            try:
+                with os.scandir(path) as entries:
+                    entries = sorted(entries, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            if any(entry.name == ".git" for entry in entries):
+                repo = path
+            subdirs = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIPPED_DIRS:
+                        subdirs.append((entry.path, repo))
+                elif entry.name in root_names and entry.is_file():
+                    yield repo, entry.path
+            pending.extend(reversed(subdirs))
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse `I/N` shard (`I` is 1-based) to its 0-based index and count of shards."""
+    match = SHARD_REGEX.match(value)
+    if match is None or not 1 <= int(match["index"]) <= int(match["count"]):
+        raise ValueError(f"Invalid shard `{value}`, expected `I/N` where 1 <= I <= N")
+    return int(match["index"]) - 1, int(match["count"])
+
+
+def closure_size(root: str) -> int:
+    """Estimate cost of validation of nginx root by size of its include closure.
+
+    `include` directives are found by regex instead of parsing, so estimation
+    is much cheaper than validation and gives the same result on all nodes.
+
+    """
+    config_dir = os.path.dirname(root)
+    pending, seen, size = [root], {root}, 0
+    while pending:
+        path = pending.pop()
+        try:
+            with open(path, encoding="utf-8", errors="replace") as config_file:
+                text = config_file.read()
+        except OSError:
+            continue
+        size += len(text)
+        for pattern in INCLUDE_REGEX.findall(text):
+            for name in sorted(glob.glob(os.path.join(config_dir, pattern))):
+                if name not in seen:
+                    seen.add(name)
+                    pending.append(name)
+    return size
+
+
+def shard_roots(
+    directories: Sequence[str],
+    root_names: Iterable[str],
+    index: int,
+    count: int,
+) -> Tuple[List[Tuple[str, str]], int]:
+    """Return roots of directories assigned to shard and number of all roots.
+
+    Roots are assigned from the heaviest to the lightest by their include
+    closure size to the least loaded shard, roots of the same size are
+    ordered by stable hash of their paths relative to scanned directories.
+    So every node computes the same balanced assignment independently, even
+    if repos are checked out to different paths on them.
+
+    Args:
+      directories: directories with checked out repos, in the same order on all nodes
+      root_names: file names of nginx root configs
+      index: 0-based index of shard
+      count: number of shards
+
+    """
+    weighted = []
+    for position, directory in enumerate(directories):
+        for repo, root in discover_roots([directory], root_names):
+            key = f"{position}:{os.path.relpath(root, directory)}"
+            weighted.append((-closure_size(root), hashlib.sha1(key.encode()).hexdigest(), repo, root))
+    weighted.sort()
+
+    loads = [0] * count
+    roots = []
+    for weight, _, repo, root in weighted:
+        shard = loads.index(min(loads))
+        # empty configs still cost to discover and parse
+        loads[shard] += 1 - weight
+        if shard == index:
+            roots.append((repo, root))
+    return roots, len(weighted)
+
+
+def save_shard(
+    path: str,
+    shard: str,
+    total: int,
+    policy: str,
+    results: Iterable[ScanResult],
+) -> Iterator[ScanResult]:
+    """Write results of shard to artifact as they are yielded.
+
+    Artifact is JSON lines file: header with shard, number of roots of all
+    shards and policy key, then line per result.
+
+    """
+    with open(path, "w") as artifact:
+        artifact.write(json.dumps({"shard": shard, "total": total, "policy": policy}) + "\n")
+        for result in results:
+            artifact.write(json.dumps(dataclasses.asdict(result)) + "\n")
+            yield result
+
+
+def _read_shard(path: str) -> Tuple[Dict, List[ScanResult]]:
+    """Read header and results of shard artifact."""
+    with open(path) as artifact:
+        try:
+            header = json.loads(artifact.readline())
+            header["index"], header["count"] = parse_shard(header["shard"])
+            results = [
+                ScanResult(
+                    repo=item["repo"],
+                    root=item["root"],
+                    findings=[Finding(**finding) for finding in item["findings"]],
+                    error=item["error"],
+                )
+                for item in map(json.loads, artifact)
+            ]
+        except (ValueError, KeyError, TypeError) as error:
+            raise ValueError(f"Invalid shard artifact `{path}`: {error}") from None
+    return header, results
+
+
+def load_shards(paths: Sequence[str]) -> List[ScanResult]:
+    """Read results of all shards from artifacts written by `save_shard`.
+
+    Raises:
+      ValueError: if artifacts are broken, made for different shards, repos
+        or policies, or some shard is missing
+
+    """
+    results: List[ScanResult] = []
+    shards: Dict[int, str] = {}
+    headers = []
+    for path in paths:
+        header, shard_results = _read_shard(path)
+        if header["index"] in shards:
+            raise ValueError(f"Shard {header['shard']} is in both `{shards[header['index']]}` and `{path}`")
+        shards[header["index"]] = path
+        headers.append(header)
+        results.extend(shard_results)
+
+    if len({(header["count"], header["total"]) for header in headers}) > 1:
+        raise ValueError("Shard artifacts are made for different sets of shards or repos")
+    if len({header["policy"] for header in headers}) > 1:
+        raise ValueError("Shard artifacts are made with different validation policies")
+    if headers:
+        count, total = headers[0]["count"], headers[0]["total"]
+        missing = [f"{index + 1}/{count}" for index in range(count) if index not in shards]
+        if missing:
+            raise ValueError(f"Missing shard artifacts: {', '.join(missing)}")
+        if len(results) != total:
+            raise ValueError(f"Shard artifacts have {len(results)} results of {total} nginx configs")
+    return results
+
+
+# analyzer and parse cache of worker process, set by `_init_worker`
+_analyzer: NginxAnalyzer | None = None
+_parse_cache: DiskParseCache | None = None
+
+
+def _init_worker(analyzer: NginxAnalyzer, cache_dir: str | None):
+    """Set analyzer and parse cache of worker process."""
+    global _analyzer, _parse_cache
+    _analyzer = analyzer
+    _parse_cache = DiskParseCache(cache_dir) if cache_dir else None
+
+
+def _scan_root(repo: str, root: str) -> ScanResult:
+    """Parse and analyze nginx root in worker process."""
+    try:
+        findings = _analyzer.analyze(parse_config(root, cache=_parse_cache))
+    except Exception as error:
+        # unexpected failure of one config shouldn't stop the whole scan
+        return ScanResult(repo=repo, root=root, error=f"{type(error).__name__}: {error}")
+    return ScanResult(repo=repo, root=root, findings=findings)
+
+
+def scan(
+    directories: Iterable[str],
+    analyzer: NginxAnalyzer,
+    root_names: Iterable[str] = DEFAULT_ROOT_NAMES,
+    jobs: int | None = None,
+    cache_dir: str | None = None,
+    roots: Iterable[Tuple[str, str]] | None = None,
+) -> Iterator[ScanResult]:
+    """Validate nginx roots of all repos in directories in process pool.
+
+    Results are yielded as soon as they are ready, not in discovery order.
+
+    Args:
+      directories: directories with checked out repos
+      analyzer: analyzer with scan policy
+      root_names: file names of nginx root configs
+      jobs: number of processes, all cores by default
+      cache_dir: dir of parse cache shared by all processes
+      roots: repos and nginx roots to validate (i.e. of single shard),
+        discovered in directories if not passed
+
+    """
+    roots = discover_roots(directories, root_names) if roots is None else roots
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        _init_worker(analyzer, cache_dir)
+        yield from (_scan_root(repo, root) for repo, root in roots)
+        return
+
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(analyzer, cache_dir)) as executor:
+        pending: Set[Future] = set()
+        for repo, root in roots:
+            pending.add(executor.submit(_scan_root, repo, root))
+            if len(pending) < jobs * ROOTS_PER_PROCESS:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
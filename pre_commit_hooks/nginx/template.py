@@ -0,0 +1,107 @@
+import hashlib
+import io
+import json
+import os
+import re
+from typing import Dict, List, TextIO
+
+from pre_commit_hooks.nginx.parser import FileSystemSource
+
+# suffix of nginx config templates, i.e. `nginx.conf.template`
+TEMPLATE_SUFFIX = ".template"
+# `${VAR}` or `$VAR` placeholder, like `envsubst` substitutes
+PLACEHOLDER_REGEX = re.compile(r"\$(?:\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)\}|(?P<name>[A-Za-z_][A-Za-z0-9_]*))")
+# `NAME=value` line of template values file
+VALUE_LINE_REGEX = re.compile(r"^(?:export\s+)?(?P<name>[A-Za-z_][A-Za-z0-9_]*)=(?P<value>.*)$")
+
+
+def is_template(path: str) -> bool:
+    """Check whether file is nginx config template."""
+    return path.endswith(TEMPLATE_SUFFIX)
+
+
+def load_template_values(path: str) -> Dict[str, str]:
+    """Load values of template placeholders from `NAME=value` lines.
+
+    Empty lines and `#` comments are skipped, values could be quoted, i.e.
+    `SERVER_NAME="example.com"`.
+
+    Raises:
+      ValueError: if file has not valid line
+
+    """
+    values = {}
+    with open(path) as values_file:
+        for number, line in enumerate(values_file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            match = VALUE_LINE_REGEX.match(line)
+            if match is None:
+                raise ValueError(f"Invalid template values `{path}`, expected `NAME=value` at {number} line")
+            value = match["value"]
+            if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            values[match["name"]] = value
+    return values
+
+
+def render_template(text: str, values: Dict[str, str]) -> str:
+    """Substitute placeholders with `values` like `envsubst "$NAME ..."` does.
+
+    Only placeholders with values are substituted, so nginx variables like
+    `$uri` are kept.
+
+    """
+    return PLACEHOLDER_REGEX.sub(
+        lambda match: values.get(match["braced"] or match["name"], match[0]),
+        text,
+    )
+
+
+class TemplateSource(FileSystemSource):
+    """Source of nginx config files from file system with rendered templates.
+
+    Templates are rendered with placeholder values on read. `nginx.conf.template`
+    can be read by its own path or as `nginx.conf` if there is no such file,
+    so templates are found by `include` directives of other files as well.
+
+    Renders are memoized by hash of template content and values, so templates
+    shared by several nginx roots are rendered once.
+
+    Args:
+      values: values of placeholders by their names
+
+    """
+
+    def __init__(self, values: Dict[str, str] | None = None):
+        self.values = dict(values or {})
+        self.values_key = hashlib.sha1(json.dumps(self.values, sort_keys=True).encode()).hexdigest()
+        self._renders: Dict[str, str] = {}
+
+    def origin(self, path: str) -> str:
+        """Return path of file which config file is read from."""
+        if is_template(path) or os.path.exists(path) or not os.path.exists(path + TEMPLATE_SUFFIX):
+            return path
+        return path + TEMPLATE_SUFFIX
+
+    def _render(self, text: str) -> str:
+        key = hashlib.sha1(f"{self.values_key}\0{text}".encode("utf-8", errors="surrogatepass")).hexdigest()
+        if key not in self._renders:
+            self._renders[key] = render_template(text, self.values)
+        return self._renders[key]
+
+    def open(self, path: str) -> TextIO:
+        origin = self.origin(path)
+        config_file = super().open(origin)
+        if not is_template(origin):
+            return config_file
+        with config_file:
+            return io.StringIO(self._render(config_file.read()))
+
+    def glob(self, pattern: str) -> List[str]:
+        rendered = [path[:-len(TEMPLATE_SUFFIX)] for path in super().glob(pattern + TEMPLATE_SUFFIX)]
+        return sorted(set(super().glob(pattern) + rendered))
+
+    def check(self, path: str):
+        super().check(self.origin(path))
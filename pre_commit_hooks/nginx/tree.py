@@ -0,0 +1,158 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Tuple
+
+# index of parent for top level nodes or nodes outside of `server` blocks
+NO_PARENT = -1
+
+
+def iter_block(
+    payload: Dict,
+    block: List[Dict],
+    file: str,
+    stack: Tuple[int, ...] = (0,),
+) -> Iterator[Tuple[Dict, str]]:
+    """Iterate over `block` statements replacing `include` with included ones.
+
+    Args:
+      payload: nginx config parsed by `crossplane`
+      block: list of statements to iterate over
+      file: name of the file which contains `block`
+      stack: indexes of files which are being included now to skip cycles
+
+    Yields:
+      (tuple): statement and name of the file which contains it
+
+    """
+    for statement in block:
+        if "includes" not in statement:
+            yield statement, file
+            continue
+
+        for index in statement["includes"]:
+            if index in stack:
+                continue
+            included = payload["config"][index]
+            yield from iter_block(payload, included["parsed"], included["file"], stack + (index,))
+
+
+def iter_servers(payload: Dict) -> Iterator[Tuple[Dict, str]]:
+    """Iterate over all `server` blocks in parsed config.
+
+    Servers are searched in `http` context and on the top level as well, to
+    support config files with only `server` blocks (i.e. `conf.d/site.conf`).
+
+    Args:
+      payload: nginx config parsed by `crossplane`
+
+    Yields:
+      (tuple): `server` statement and name of the file which contains it
+
+    """
+    if not payload["config"]:
+        return
+
+    root = payload["config"][0]
+    for statement, file in iter_block(payload, root["parsed"], root["file"]):
+        if statement["directive"] == "server":
+            yield statement, file
+        if statement["directive"] != "http":
+            continue
+        for child, child_file in iter_block(payload, statement.get("block", []), file):
+            if child["directive"] == "server":
+                yield child, child_file
+
+
+@dataclass
+class ConfigTree:
+    """Flat parent-indexed representation of nginx config with includes.
+
+    All statements are stored in `nodes` in order of appearance, `include`
+    directives are replaced with included files statements. For each node
+    there are stored its file, index of parent node and index of enclosing
+    `server` block (`NO_PARENT` if there is no such one).
+
+    """
+
+    nodes: List[Dict] = field(default_factory=list)
+    files: List[str] = field(default_factory=list)
+    parents: List[int] = field(default_factory=list)
+    servers: List[int] = field(default_factory=list)
+    # map of directive name to indexes of nodes with such directive
+    directives: Dict[str, List[int]] = field(default_factory=dict)
+    # map of `server` node index to indexes of all its (nested) locations
+    server_locations: Dict[int, List[int]] = field(default_factory=dict)
+    # map of `server` node index to its sorted `server_name` values, built
+    # on first use by `server_names`
+    _server_names: Dict[int, List[str]] | None = field(default=None, repr=False)
+
+    def add(self, statement: Dict, file: str, parent: int, server: int) -> int:
+        """Add statement to the tree and return its index."""
+        index = len(self.nodes)
+        self.nodes.append(statement)
+        self.files.append(file)
+        self.parents.append(parent)
+        self.servers.append(server)
+
+        directive = statement["directive"]
+        self.directives.setdefault(directive, []).append(index)
+        if directive == "location":
+            self.server_locations.setdefault(server, []).append(index)
+        return index
+
+    def server_names(self, server: int) -> List[str]:
+        """Return sorted `server_name` values of `server` block.
+
+        Names of all servers are collected at once on the first call, so
+        getting names for many findings doesn't walk the tree again.
+
+        """
+        if self._server_names is None:
+            self._server_names = {}
+            for index in self.directives.get("server_name", []):
+                self._server_names.setdefault(self.parents[index], []).extend(self.nodes[index]["args"])
+            for names in self._server_names.values():
+                names.sort()
+        return self._server_names.get(server, []) if server != NO_PARENT else []
+
+
+def build_tree(payload: Dict) -> ConfigTree:
+    """Build parent-indexed tree of nginx config in a single walk.
+
+    Args:
+      payload: nginx config parsed by `crossplane`
+
+    Returns:
+      (ConfigTree): tree with all statements of config and included files
+
+    """
+    tree = ConfigTree()
+    if not payload["config"]:
+        return tree
+
+    # stack of (block, file, parent, server, included files stack) to walk
+    root = payload["config"][0]
+    pending = [(iter(root["parsed"]), root["file"], NO_PARENT, NO_PARENT, (0,))]
+    while pending:
+        block, file, parent, server, stack = pending[-1]
+        statement = next(block, None)
+        if statement is None:
+            pending.pop()
+            continue
+
+        if "includes" in statement:
+            included = [(index, payload["config"][index]) for index in statement["includes"] if index not in stack]
+            frames = [
+                (iter(config["parsed"]), config["file"], parent, server, stack + (index,))
+                for index, config in included
+            ]
+            # the last pushed frame is walked first, so push them reversed
+            pending.extend(reversed(frames))
+            continue
+
+        index = tree.add(statement, file, parent, server)
+        if "block" in statement:
+            if statement["directive"] == "server":
+                server = index
+                tree.server_locations.setdefault(server, [])
+            pending.append((iter(statement["block"]), file, index, server, stack))
+    return tree
@@ -0,0 +1,279 @@
+import multiprocessing
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover, python < 3.11
+    import sre_parse
+
+# default max time in seconds to match user regex
+DEFAULT_TIMEOUT = 1.0
+# inputs up to this length are matched by screened safe regexes in current
+# process, longer ones are always matched under time budget
+INLINE_MAX_LENGTH = 4096
+# Error message printed when matching of regex exceeded time budget
+REGEX_TIMEOUT_ERROR_MSG = (
+    "[ERROR] Regex '{pattern}' took longer than {timeout}s to match, "
+    "it may backtrack catastrophically{risk}. Please simplify it."
+)
+# Error message printed when worker process died while matching regex
+REGEX_WORKER_ERROR_MSG = (
+    "[ERROR] Regex '{pattern}' couldn't be matched, worker process stopped while "
+    "matching it{risk}. Please simplify it."
+)
+
+# char intervals which first char of regex item could be in
+CharSet = List[Tuple[int, int]]
+ANY_CHAR: CharSet = [(0, 0x10FFFF)]
+
+NESTED_QUANTIFIERS = "nested quantifiers, i.e. `(a+)+`"
+OVERLAPPING_ALTERNATION = "quantified alternation with overlapping branches, i.e. `(a|ab)*`"
+ADJACENT_QUANTIFIERS = "adjacent overlapping quantifiers, i.e. `.*.*`"
+
+
+class RegexTimeoutError(Exception):
+    """Matching of regex exceeded time budget or stopped its worker process."""
+
+
+@dataclass(frozen=True)
+class MatchResult:
+    """Picklable result of regex match: matched string and named groups."""
+
+    group: str
+    groups: Dict[str, str | None]
+
+
+def _first_chars(items: List) -> CharSet:
+    """Return chars which string matched by regex items could start with."""
+    for op, av in items:
+        name = str(op)
+        if name == "AT":
+            continue
+        if name == "LITERAL":
+            return [(av, av)]
+        if name == "IN" and all(str(item_op) in ("LITERAL", "RANGE") for item_op, _ in av):
+            return [(value, value) if str(item_op) == "LITERAL" else value for item_op, value in av]
+        if name == "SUBPATTERN":
+            return _first_chars(av[-1])
+        if name == "ATOMIC_GROUP":
+            return _first_chars(av)
+        if name == "BRANCH":
+            return [interval for branch in av[1] for interval in _first_chars(branch)]
+        if name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") and av[0] > 0:
+            return _first_chars(av[2])
+        return ANY_CHAR
+    return ANY_CHAR
+
+
+def _overlap(first: CharSet, second: CharSet) -> bool:
+    """Check whether char sets have common chars."""
+    return any(low <= other_high and other_low <= high for low, high in first for other_low, other_high in second)
+
+
+def _unbounded_repeat(op, av) -> bool:
+    """Check whether item is backtracking repeat without upper bound."""
+    return str(op) in ("MAX_REPEAT", "MIN_REPEAT") and av[1] == sre_parse.MAXREPEAT
+
+
+def _unwrap_group(op, av) -> Tuple:
+    """Return the only repeat of group, i.e. `.*` for `(.*)`, or item itself."""
+    while str(op) == "SUBPATTERN" and len(av[-1]) == 1 and _unbounded_repeat(*av[-1][0]):
+        op, av = av[-1][0]
+    return op, av
+
+
+def _repeat_risk(body: List, in_repeat: bool, previous: CharSet | None) -> str | None:
+    """Find risky construct in repeat without upper bound.
+
+    Args:
+      body: parsed items of repeat
+      in_repeat: whether repeat is nested to other one without upper bound
+      previous: first chars of previous adjacent repeat if any
+
+    """
+    if in_repeat:
+        return NESTED_QUANTIFIERS
+    if previous is not None and _overlap(previous, _first_chars(body)):
+        return ADJACENT_QUANTIFIERS
+    items = body
+    while len(items) == 1 and str(items[0][0]) == "SUBPATTERN":
+        items = items[0][1][-1]
+    branches = items[0][1][1] if len(items) == 1 and str(items[0][0]) == "BRANCH" else []
+    firsts = [_first_chars(branch) for branch in branches]
+    if any(_overlap(first, other) for i, first in enumerate(firsts) for other in firsts[i + 1:]):
+        return OVERLAPPING_ALTERNATION
+    return _find_risk(body, True)
+
+
+def _find_risk(items: List, in_repeat: bool) -> str | None:
+    """Find construct which can backtrack catastrophically in regex items.
+
+    Args:
+      items: parsed regex items
+      in_repeat: whether items are repeated without upper bound
+
+    """
+    previous: CharSet | None = None
+    for op, av in items:
+        op, av = _unwrap_group(op, av)
+        name = str(op)
+        risk = None
+        if _unbounded_repeat(op, av):
+            risk = _repeat_risk(av[2], in_repeat, previous)
+        elif name in ("MAX_REPEAT", "MIN_REPEAT"):
+            risk = _find_risk(av[2], in_repeat)
+        elif name == "SUBPATTERN":
+            risk = _find_risk(av[-1], in_repeat)
+        elif name == "BRANCH":
+            risk = next(filter(None, (_find_risk(branch, in_repeat) for branch in av[1])), None)
+        elif name in ("ASSERT", "ASSERT_NOT"):
+            risk = _find_risk(av[1], in_repeat)
+        # possessive repeats and atomic groups never backtrack into, so they
+        # are not checked
+        if risk:
+            return risk
+
+        if _unbounded_repeat(op, av):
+            previous = _first_chars(av[2])
+        elif name != "AT":
+            previous = None
+    return None
+
+
+def find_backtracking_risk(pattern: str, flags: int = 0) -> str | None:
+    """Screen regex for constructs which can backtrack catastrophically.
+
+    Screening is heuristic, it finds nested quantifiers, quantified
+    alternations with overlapping branches and adjacent overlapping
+    quantifiers. Such regexes are matched under time budget.
+
+    Returns:
+      (str): description of found construct, `None` if regex looks safe
+
+    """
+    return _find_risk(sre_parse.parse(pattern, flags), False)
+
+
+def _serve(connection):
+    """Match regexes received through `connection` until it's closed."""
+    compiled: Dict[Tuple[str, int], re.Pattern] = {}
+    while True:
+        try:
+            pattern, flags, method, string = connection.recv()
+        except EOFError:
+            return
+        if (pattern, flags) not in compiled:
+            compiled[pattern, flags] = re.compile(pattern, flags)
+        match = getattr(compiled[pattern, flags], method)(string)
+        connection.send(None if match is None else MatchResult(match.group(0), match.groupdict()))
+
+
+class _Worker:
+    """Process to match regexes in, it's killed if matching takes too long.
+
+    `re` matching can't be interrupted in the same process, so the only way
+    to stop it is to kill the process. Worker is started on first use and
+    reused by next matches, so matching of many strings (i.e. messages of
+    pushed commits) doesn't start process for each of them. Matches from
+    different threads are done one by one.
+
+    Process is started by `forkserver` (or `spawn`) method, because forking
+    of process with other threads (i.e. Jira requests) can copy their held
+    locks. If process dies while matching, it's restarted on next match.
+
+    """
+
+    def __init__(self):
+        self.process = None
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def stop(self):
+        """Kill worker process."""
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+            self.connection.close()
+            self.process = self.connection = None
+
+    def call(self, pattern: str, flags: int, method: str, string: str, timeout: float) -> MatchResult | None:
+        """Match regex in worker process.
+
+        `TimeoutError` is raised if matching takes longer than `timeout`,
+        `ChildProcessError` if worker process dies while matching.
+
+        """
+        with self.lock:
+            if self.process is None or not self.process.is_alive():
+                self.stop()
+                self._start()
+            try:
+                self.connection.send((pattern, flags, method, string))
+                ready = self.connection.poll(timeout)
+                result = self.connection.recv() if ready else None
+            except (EOFError, OSError):
+                self.stop()
+                raise ChildProcessError from None
+            if not ready:
+                self.stop()
+                raise TimeoutError
+            return result
+
+
+_worker = _Worker()
+
+
+class GuardedRegex:
+    """User regex which is matched under time budget if it's not safe.
+
+    Regex is compiled and screened for catastrophic backtracking once.
+    Screened safe regexes are matched against short strings in current
+    process, otherwise matching is done in worker process and is stopped
+    when it exceeds `timeout`.
+
+    Args:
+      pattern: regex pattern, `re.error` is raised if it's not valid
+      flags: regex flags
+      timeout: max time in seconds to match regex
+
+    """
+
+    def __init__(self, pattern: str, flags: int = 0, timeout: float = DEFAULT_TIMEOUT):
+        self.pattern = pattern
+        self.flags = flags
+        self.timeout = timeout
+        self.regex = re.compile(pattern, flags)
+        self.risk = find_backtracking_risk(pattern, flags)
+
+    def _match(self, method: str, string: str) -> MatchResult | None:
+        if self.risk is None and len(string) <= INLINE_MAX_LENGTH:
+            match = getattr(self.regex, method)(string)
+            return None if match is None else MatchResult(match.group(0), match.groupdict())
+        risk = f" because of {self.risk}" if self.risk else ""
+        try:
+            return _worker.call(self.pattern, self.flags, method, string, self.timeout)
+        except TimeoutError:
+            raise RegexTimeoutError(
+                REGEX_TIMEOUT_ERROR_MSG.format(pattern=self.pattern, timeout=self.timeout, risk=risk),
+            ) from None
+        except ChildProcessError:
+            raise RegexTimeoutError(REGEX_WORKER_ERROR_MSG.format(pattern=self.pattern, risk=risk)) from None
+
+    def match(self, string: str) -> MatchResult | None:
+        """Match regex at the beginning of `string`, like `re.match`."""
+        return self._match("match", string)
+
+    def search(self, string: str) -> MatchResult | None:
+        """Search regex in `string`, like `re.search`."""
+        return self._match("search", string)
@@ -0,0 +1,159 @@
+import contextlib
+import json
+import math
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List
+
+from pre_commit_hooks.util import get_user_cache_dir
+
+# env var to enable collecting of hooks invocations stats
+STATS_ENV_VAR = "SARITASA_HOOKS_STATS"
+# max size of stats log, when it's exceeded log is rotated to `.1` file
+STATS_LOG_MAX_SIZE = 1024 * 1024
+# upper bounds of histogram buckets in seconds
+HISTOGRAM_BUCKETS = [0.01, 0.03, 0.1, 0.3, 1, 3, 10]
+
+
+class HookStats:
+    """Stats of a single hook invocation."""
+
+    def __init__(self, hook_id: str):
+        self.hook_id = hook_id
+        self.duration = 0.0
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def as_record(self) -> Dict:
+        """Return compact representation of stats to store in log."""
+        return {
+            "hook": self.hook_id,
+            "time": round(time.time()),
+            "duration": round(self.duration, 6),
+            "phases": {name: round(value, 6) for name, value in self.phases.items()},
+            **self.counters,
+        }
+
+
+# stats of current hook invocation, `None` if stats are not collected
+_current: HookStats | None = None
+
+
+def get_stats_log_path() -> str:
+    """Return path to stats log shared by all repos of current user."""
+    return os.path.join(get_user_cache_dir(), "stats.log")
+
+
+def _write_record(record: Dict, path: str):
+    """Append record to stats log, rotate log if it's too big."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with contextlib.suppress(FileNotFoundError):
+        if os.path.getsize(path) > STATS_LOG_MAX_SIZE:
+            os.replace(path, f"{path}.1")
+
+    # single short write to file opened in append mode is not interleaved
+    # with writes of other hooks running in parallel
+    with open(path, "a") as log_file:
+        log_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+@contextlib.contextmanager
+def collect(hook_id: str) -> Iterator[HookStats | None]:
+    """Collect stats of hook invocation if `SARITASA_HOOKS_STATS` env var is set.
+
+    Collected stats are appended to the stats log on exit.
+
+    """
+    global _current
+    if not os.environ.get(STATS_ENV_VAR):
+        yield None
+        return
+
+    _current = HookStats(hook_id)
+    start = time.perf_counter()
+    try:
+        yield _current
+    finally:
+        _current.duration = time.perf_counter() - start
+        with contextlib.suppress(OSError):
+            _write_record(_current.as_record(), get_stats_log_path())
+        _current = None
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Measure duration of hook invocation phase, i.e. `parse`."""
+    if _current is None:
+        yield
+        return
+
+    stats = _current
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] += time.perf_counter() - start
+
+
+def increment(counter: str, value: int = 1):
+    """Increment counter of hook invocation, i.e. `files` or `cache_hits`."""
+    if _current is not None:
+        _current.counters[counter] += value
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Read records from stats log and its rotated copy."""
+    for log_path in (f"{path}.1", path):
+        with contextlib.suppress(FileNotFoundError), open(log_path) as log_file:
+            for line in log_file:
+                with contextlib.suppress(ValueError):
+                    yield json.loads(line)
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Return percentile of sorted `values` by nearest-rank method."""
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def histogram(values: List[float]) -> List[int]:
+    """Return number of `values` in each of `HISTOGRAM_BUCKETS`.
+
+    The last item is number of values greater than the last bucket bound.
+
+    """
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for value in values:
+        counts[next((i for i, bound in enumerate(HISTOGRAM_BUCKETS) if value <= bound), -1)] += 1
+    return counts
+
+
+def aggregate(records: Iterator[Dict]) -> Dict[str, Dict[str, List[float]]]:
+    """Group durations by hook and phase, `total` is whole invocation."""
+    durations: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for record in records:
+        durations[record["hook"]]["total"].append(record["duration"])
+        for name, value in record.get("phases", {}).items():
+            durations[record["hook"]][name].append(value)
+    return durations
+
+
+def _format_duration(value: float) -> str:
+    """Format duration in seconds as milliseconds."""
+    return f"{value * 1000:.1f}ms"
+
+
+def format_report(durations: Dict[str, Dict[str, List[float]]]) -> str:
+    """Format aggregated durations as table with percentiles and histograms."""
+    buckets = [f"<={_format_duration(bound)}" for bound in HISTOGRAM_BUCKETS] + ["more"]
+    lines = [
+        f"{'hook / phase':<40}{'runs':>8}{'p50':>12}{'p95':>12}{'p99':>12}  histogram ({', '.join(buckets)})",
+    ]
+    for hook_id in sorted(durations):
+        for name in sorted(durations[hook_id], key=lambda name: (name != "total", name)):
+            values = sorted(durations[hook_id][name])
+            title = hook_id if name == "total" else f"  {name}"
+            percentiles = "".join(f"{_format_duration(percentile(values, p)):>12}" for p in (50, 95, 99))
+            lines.append(f"{title:<40}{len(values):>8}{percentiles}  {histogram(values)}")
+    return "\n".join(lines)
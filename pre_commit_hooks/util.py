@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import contextlib
+import functools
 import os
 import re
 import subprocess
-from typing import Any
+from typing import Any, Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
 
 
 def cmd_output(*cmd: str, retcode: int | None = 0, **kwargs: Any) -> str:
@@ -67,6 +74,86 @@ def get_current_branch() -> str:
     return cmd_output("git", "rev-parse", "--abbrev-ref", "HEAD")
 
 
+def get_cache_dir() -> str | None:
+    """Return path to hooks cache dir inside `.git` folder of current repo.
+
+    If return value is `None`, then current dir is not a git repo and no cache
+    should be used.
+
+    """
+    try:
+        path = cmd_output("git", "rev-parse", "--git-path", "saritasa-pre-commit-hooks").strip()
+    except (RuntimeError, OSError):
+        return None
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def git_index_blobs() -> Dict[str, str | None]:
+    """Return map of files from git index to their blob ids.
+
+    Files with unstaged changes are mapped to `None`, because their content
+    differs from the blob in index. Contents of files are not read, git uses
+    its stat info.
+
+    """
+    output = cmd_output("git", "ls-files", "--stage", "--modified", "-t", "-z")
+    blobs: Dict[str, str | None] = {}
+    for entry in output.split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        tag, _, blob, _ = info.split(" ")
+        # `C` entries are modified files, `H` ones are cached in index, path
+        # appears few times for modified files or unresolved merge conflicts
+        blobs[path] = None if tag == "C" or path in blobs else blob
+    return blobs
+
+
+@contextlib.contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Hold exclusive lock of `path` file shared by concurrent hook processes.
+
+    Lock is not taken on platforms without `fcntl` (i.e. Windows).
+
+    """
+    with open(path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_user_cache_dir() -> str:
+    """Return hooks cache dir shared by all repos of current user."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "saritasa-pre-commit-hooks")
+
+
+def get_pre_commit_run_id() -> str | None:
+    """Return id of current `pre-commit` run, `None` if not run by `pre-commit`.
+
+    All hook invocations of one run (i.e. chunks of `--all-files` filenames)
+    are started by the same `pre-commit` process, so its pid and start time
+    identify the run. Pid alone may be reused by later runs, so `None` is
+    returned as well if start time is unknown (i.e. there is no `/proc`).
+
+    """
+    if not os.environ.get("PRE_COMMIT"):
+        return None
+    parent = os.getppid()
+    try:
+        with open(f"/proc/{parent}/stat") as stat_file:
+            # start time is 22nd field, fields after `comm` one start from 3rd
+            start_time = stat_file.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+    return f"{parent}:{start_time}"
+
+
 def get_git_config_param(param: str) -> str | None:
     """Return value from git config.
 
@@ -79,17 +166,36 @@ def get_git_config_param(param: str) -> str | None:
         return None
 
 
-GIT_COMMENT_STRING = (
-    get_git_config_param("core.commentString")
-    or get_git_config_param("core.commentChar")
-    or "#"
-)
-GIT_COMMENT_SECTION_LINE = (
-    r"{comment_string}?[ ]*-+ >8 -+".format(comment_string=GIT_COMMENT_STRING)
-)
+@functools.lru_cache(maxsize=None)
+def get_git_comment_string() -> str:
+    """Return string which starts comment lines of commit messages.
 
+    It's read from git config on first call only, not on import, so hooks
+    which don't need it don't run git commands for it.
 
-def strip_comment_section(message: str) -> str:
+    """
+    return (
+        get_git_config_param("core.commentString")
+        or get_git_config_param("core.commentChar")
+        or "#"
+    )
+
+
+def get_comment_section_line(comment_string: str) -> str:
+    """Return regex of line which starts comment section of commit message."""
+    return r"{comment_string}?[ ]*-+ >8 -+".format(comment_string=comment_string)
+
+
+def __getattr__(name: str) -> str:
+    """Resolve git comment constants lazily on first access."""
+    if name == "GIT_COMMENT_STRING":
+        return get_git_comment_string()
+    if name == "GIT_COMMENT_SECTION_LINE":
+        return get_comment_section_line(get_git_comment_string())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def strip_comment_section(message: str, comment_string: str | None = None) -> str:
     """Return message without comment section which is located bellow the line.
 
     All bellow this line will be ignored including task number. So need to
@@ -108,8 +214,10 @@ def strip_comment_section(message: str) -> str:
 
     ```
 
+    Comment string is taken from git config if `comment_string` isn't passed.
+
     """
-    match = re.search(GIT_COMMENT_SECTION_LINE, message)
+    match = re.search(get_comment_section_line(comment_string or get_git_comment_string()), message)
 
     if match is not None:
         return message[:match.start()]
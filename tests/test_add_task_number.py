@@ -1,7 +1,7 @@
 import pytest
 
 from pre_commit_hooks import util as base_util
-from pre_commit_hooks.add_task_number import main
+from pre_commit_hooks.add_task_number import main, rewrite
 
 
 @pytest.fixture
@@ -144,3 +144,107 @@ def test_commit_message_will_not_be_modified_for_wrong_branch(
             last_commit_message = commit_msg_file.read()
 
         assert last_commit_message == expected_commit_message
+
+
+def test_rewrite_range(temp_git_dir, branch_regex, format_template):
+    """Test that task number is added to all commits of range."""
+    with temp_git_dir.as_cwd():
+        base_util.git_commit("Init commit")
+        base_util.git_create_branch("feature/ABC-123-my-beautiful-branch")
+        base_util.git_commit("First commit")
+        base_util.git_commit("Second commit\n\nTask: ABC-123")
+        base_util.git_commit("Third commit\n\nWith description")
+
+        assert rewrite.rewrite_range("HEAD~3..HEAD", branch_regex, format_template) == 0
+
+        messages = base_util.cmd_output("git", "log", "--format=%B%x00").split("\0")
+        assert [message.strip() for message in messages if message.strip()] == [
+            "Third commit\n\nWith description\n\nTask: ABC-123",
+            "Second commit\n\nTask: ABC-123",
+            "First commit\n\nTask: ABC-123",
+            "Init commit",
+        ]
+        assert base_util.cmd_output("git", "status", "--porcelain") == ""
+
+
+def test_rewrite_range_with_task(temp_git_dir, branch_regex, format_template, capsys):
+    """Test that task number can be passed for branch without it in name."""
+    with temp_git_dir.as_cwd():
+        base_util.git_commit("Init commit")
+        base_util.git_create_branch("feature/my-beautiful-branch")
+        base_util.git_commit("First commit")
+
+        assert rewrite.rewrite_range("HEAD~1..HEAD", branch_regex, format_template) == 1
+        assert "[ERROR] Task number is not found" in capsys.readouterr().out
+
+        assert rewrite.rewrite_range("HEAD~1..HEAD", branch_regex, format_template, "XYZ-1") == 0
+        message = base_util.cmd_output("git", "log", "-1", "--format=%B")
+        assert message.strip() == "First commit\n\nTask: XYZ-1"
+
+
+@pytest.mark.parametrize(
+    ["revision_range", "error"],
+    [
+        ["HEAD", "is not `A..B` commits range"],
+        ["HEAD~1..", "is not `A..B` commits range"],
+        ["..HEAD", "is not `A..B` commits range"],
+        ["HEAD~1...HEAD", "is not `A..B` commits range"],
+        ["--all..HEAD", "is not `A..B` commits range"],
+        ["missing..HEAD", "can't be resolved"],
+        ["HEAD~1..HEAD~1", "is not a branch"],
+        ["HEAD..HEAD", "commits range is empty"],
+    ],
+)
+def test_rewrite_range_not_valid(temp_git_dir, branch_regex, format_template, capsys, revision_range, error):
+    """Test that only not empty range of branch commits is rewritten."""
+    with temp_git_dir.as_cwd():
+        base_util.git_commit("Init commit")
+        base_util.git_create_branch("feature/ABC-123-my-beautiful-branch")
+        base_util.git_commit("First commit")
+
+        assert rewrite.rewrite_range(revision_range, branch_regex, format_template) == 1
+        assert error in capsys.readouterr().out
+        assert base_util.cmd_output("git", "log", "-1", "--format=%B").strip() == "First commit"
+
+
+def test_rewrite_range_not_committed_changes(temp_git_dir, branch_regex, format_template, capsys):
+    """Test that range is not rewritten if there are not committed changes."""
+    with temp_git_dir.as_cwd():
+        base_util.git_commit("Init commit")
+        base_util.git_create_branch("feature/ABC-123-my-beautiful-branch")
+        temp_git_dir.join("file.txt").write("content")
+        base_util.git_add("file.txt")
+
+        assert rewrite.rewrite_range("HEAD~1..HEAD", branch_regex, format_template) == 1
+        assert "[ERROR] There are not committed changes" in capsys.readouterr().out
+
+
+def test_rebase_session_memo(temp_git_dir, branch_regex, format_template, monkeypatch):
+    """Test that task of rebased branch is resolved once per rebase session."""
+    with temp_git_dir.as_cwd():
+        base_util.git_commit("Init commit")
+        # `HEAD` is detached during rebase
+        base_util.cmd_output("git", "checkout", "--detach")
+        state_dir = temp_git_dir.join(".git", "rebase-merge").ensure(dir=True)
+        state_dir.join("head-name").write("refs/heads/feature/ABC-123-my-beautiful-branch\n")
+        state_dir.join("orig-head").write("1" * 40)
+        state_dir.join("onto").write("2" * 40)
+
+        commit_msg_file = temp_git_dir.join(".git", "COMMIT_EDITMSG")
+        commit_msg_file.write("First commit")
+        main.add_task_number(str(commit_msg_file), branch_regex, format_template)
+        assert commit_msg_file.read() == "First commit\n\nTask: ABC-123"
+
+        # next commits of the session take everything from memo
+        monkeypatch.setattr(main, "get_current_branch", None)
+        monkeypatch.setattr(main, "get_git_comment_string", None)
+        commit_msg_file.write("Second commit")
+        main.add_task_number(str(commit_msg_file), branch_regex, format_template)
+        assert commit_msg_file.read() == "Second commit\n\nTask: ABC-123"
+
+        # memo of other session is not used
+        state_dir.join("head-name").write("refs/heads/feature/XYZ-1-other-branch\n")
+        monkeypatch.undo()
+        commit_msg_file.write("Third commit")
+        main.add_task_number(str(commit_msg_file), branch_regex, format_template)
+        assert commit_msg_file.read() == "Third commit\n\nTask: XYZ-1"
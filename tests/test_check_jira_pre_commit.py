@@ -1,11 +1,23 @@
+import io
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 
+from pre_commit_hooks.jira_pre_commit.client import IssuesCache, JiraClient
 from pre_commit_hooks.jira_pre_commit.main import (
+    CLOSED_TASK_ERROR_MSG,
     EXCLUDED_COMMIT_MSG,
     INVALID_REGEX_ERROR_MSG,
     NO_TASK_ERROR_MSG,
     validate_task_in_commit,
 )
+from pre_commit_hooks.jira_pre_commit.project_keys import load_project_keys
+from pre_commit_hooks.jira_pre_commit.receive import main as pre_receive_main
+from pre_commit_hooks.util import cmd_output, git_commit
 
 
 @pytest.fixture
@@ -83,3 +95,237 @@ def test_exclude_pattern_error(commit_msg_file, capsys):
 
     out, _ = capsys.readouterr()
     assert INVALID_REGEX_ERROR_MSG.split('{')[0] in out
+
+
+@pytest.fixture
+def project_keys_file(temp_git_dir):
+    """Fixture to create file with allowed Jira project keys."""
+    path = temp_git_dir.join("jira-projects.txt")
+    path.write("# Main Jira instance\nJIRA\nSD, ABC\n")
+    return str(path)
+
+
+def test_project_keys_loaded(temp_git_dir, project_keys_file):
+    """Test that project keys are parsed without comments."""
+    with temp_git_dir.as_cwd():
+        assert load_project_keys(project_keys_file) == {"JIRA", "SD", "ABC"}
+
+        with open(project_keys_file, "a") as keys_file:
+            keys_file.write("new,OTHER # NOT-KEY\n#ignored")
+        assert load_project_keys(project_keys_file) == {"JIRA", "SD", "ABC", "NEW", "OTHER"}
+
+
+def test_task_of_known_project(commit_msg_file, temp_git_dir, project_keys_file, capsys):
+    """Test that a commit message with a JIRA ID of known project passes."""
+    with temp_git_dir.as_cwd():
+        path = commit_msg_file("fix: support UTF-8 in SD-373")
+
+        exit_code = validate_task_in_commit(path, [], load_project_keys(project_keys_file))
+        assert exit_code == 0
+
+        out, _ = capsys.readouterr()
+        assert out == ""
+
+
+def test_task_of_unknown_project(commit_msg_file, temp_git_dir, project_keys_file, capsys):
+    """Test that a commit message with a JIRA ID like string of unknown project fails."""
+    with temp_git_dir.as_cwd():
+        path = commit_msg_file("fix: support UTF-8 and SHA-256")
+
+        exit_code = validate_task_in_commit(path, [], load_project_keys(project_keys_file))
+        assert exit_code == 1
+
+        out, _ = capsys.readouterr()
+        assert "UTF-8, SHA-256 don't belong to known Jira projects" in out
+        assert NO_TASK_ERROR_MSG not in out
+
+
+class JiraHandler(BaseHTTPRequestHandler):
+    """Stand-in for Jira REST API with `SD-1` open and `SD-2` done issues."""
+
+    protocol_version = "HTTP/1.1"
+    categories = {"SD-1": "indeterminate", "SD-2": "done"}
+    requests = []
+
+    def do_GET(self):  # noqa: N802
+        key = self.path.split("?")[0].rsplit("/", 1)[-1]
+        self.requests.append(key)
+        if key in self.categories:
+            body = json.dumps({"fields": {"status": {"statusCategory": {"key": self.categories[key]}}}}).encode()
+            self.send_response(200)
+        else:
+            body = b'{"errorMessages": ["Issue does not exist"]}'
+            self.send_response(404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Do not print requests log."""
+
+
+@pytest.fixture
+def jira_url():
+    """Run stand-in Jira server and return its URL."""
+    JiraHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JiraHandler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def jira_client(jira_url, tmp_path):
+    """Return Jira client with issues cache for stand-in Jira server."""
+    client = JiraClient(jira_url, cache=IssuesCache(str(tmp_path), ttl=60, negative_ttl=60))
+    yield client
+    client.close()
+
+
+def test_open_task_exists(commit_msg_file, jira_client, capsys):
+    """Test that a commit message with open Jira Task passes and result is cached."""
+    path = commit_msg_file("feat: add config SD-1")
+
+    assert validate_task_in_commit(path, [], jira_client=jira_client) == 0
+    assert validate_task_in_commit(path, [], jira_client=jira_client) == 0
+    assert JiraHandler.requests == ["SD-1"]
+
+    out, _ = capsys.readouterr()
+    assert out == ""
+
+
+@pytest.mark.parametrize("task", ["SD-2", "SD-3"])
+def test_done_or_missing_task(commit_msg_file, jira_client, task, capsys):
+    """Test that a commit message with done or missing Jira Task fails."""
+    path = commit_msg_file(f"feat: add config {task}")
+
+    assert validate_task_in_commit(path, [], jira_client=jira_client) == 1
+
+    out, _ = capsys.readouterr()
+    assert CLOSED_TASK_ERROR_MSG.format(tasks=task) in out
+
+
+def test_tasks_checked_with_kept_alive_connections(jira_client):
+    """Test that few tasks are checked through pooled connections."""
+    states = jira_client.issue_states(["SD-1", "SD-2", "SD-3", "SD-1"])
+    assert states == {"SD-1": "open", "SD-2": "done", "SD-3": "missing"}
+    assert sorted(JiraHandler.requests) == ["SD-1", "SD-2", "SD-3"]
+
+
+def test_jira_not_available(commit_msg_file, tmp_path, capsys):
+    """Test that regex-only check is used when Jira is not available."""
+    path = commit_msg_file("feat: add config SD-3")
+    client = JiraClient("http://127.0.0.1:1", timeout=0.5)
+
+    assert validate_task_in_commit(path, [], jira_client=client) == 0
+
+    out, _ = capsys.readouterr()
+    assert out == ""
+
+
+def _trickle_response(connection: socket.socket, stop: threading.Event):
+    """Send response headers byte by byte, so each socket read fits its timeout."""
+    with connection:
+        connection.recv(1024)
+        for char in b"HTTP/1.1 200 OK\r\n" * 100:
+            if stop.wait(0.05):
+                return
+            try:
+                connection.sendall(bytes([char]))
+            except OSError:
+                return
+
+
+@pytest.fixture
+def slow_jira_url():
+    """Run stand-in Jira server which sends responses slowly and return its URL."""
+    server = socket.create_server(("127.0.0.1", 0))
+    stop = threading.Event()
+
+    def serve():
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=_trickle_response, args=(connection, stop), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}"
+    stop.set()
+    server.close()
+
+
+def test_slow_jira_timeout(slow_jira_url):
+    """Test that slowly sent responses don't exceed timeout of all requests."""
+    client = JiraClient(slow_jira_url, timeout=0.5)
+    started = time.monotonic()
+    assert client.issue_states(["SD-1", "SD-2"]) == {"SD-1": None, "SD-2": None}
+    assert time.monotonic() - started < 1
+    # threads of running requests don't delay exit
+    assert all(thread.daemon for thread in threading.enumerate() if thread is not threading.main_thread())
+    client.close()
+
+
+def test_issues_cache_concurrent_updates(tmp_path):
+    """Test that states stored by concurrent processes are kept on update."""
+    first = IssuesCache(str(tmp_path), ttl=60, negative_ttl=60)
+    second = IssuesCache(str(tmp_path), ttl=60, negative_ttl=60)
+    first.update({"SD-1": "open"})
+    second.update({"SD-2": "done"})
+    cache = IssuesCache(str(tmp_path), ttl=60, negative_ttl=60)
+    assert (cache.get("SD-1"), cache.get("SD-2")) == ("open", "done")
+
+
+def test_pre_receive(temp_git_dir, jira_url, capsys, monkeypatch):
+    """Test that commits of all pushed refs are checked once."""
+    with temp_git_dir.as_cwd():
+        git_commit("Initial commit SD-1")
+        base = cmd_output("git", "rev-parse", "HEAD").strip()
+        git_commit("feat: add config")
+        no_task = cmd_output("git", "rev-parse", "HEAD").strip()
+        git_commit("feat: add done task SD-2")
+        done_task = cmd_output("git", "rev-parse", "HEAD").strip()
+        git_commit("feat: add open task SD-1")
+        git_commit("Merge branch 'feature' into 'main'")
+        new = cmd_output("git", "rev-parse", "HEAD").strip()
+        # pushed commits are not reachable from refs yet
+        cmd_output("git", "reset", "--hard", base)
+
+        zero = "0" * 40
+        updates = f"{base} {new} refs/heads/main\n{zero} {new} refs/heads/feature\n{base} {zero} refs/heads/old\n"
+        monkeypatch.setattr("sys.stdin", io.StringIO(updates))
+        assert pre_receive_main(["-e", "^Merge ", "--jira-url", jira_url]) == 1
+
+        out, _ = capsys.readouterr()
+        assert out.count(no_task[:12]) == 1
+        assert f"{no_task[:12]}: {NO_TASK_ERROR_MSG}" in out
+        assert f"{done_task[:12]}: {CLOSED_TASK_ERROR_MSG.format(tasks='SD-2')}" in out
+        assert sorted(JiraHandler.requests) == ["SD-1", "SD-2"]
+
+        monkeypatch.setattr("sys.stdin", io.StringIO(f"{base} {base} refs/heads/main\n"))
+        assert pre_receive_main([]) == 0
+
+        assert pre_receive_main(["-e", "(unclosed"]) == 1
+        out, _ = capsys.readouterr()
+        assert INVALID_REGEX_ERROR_MSG.split("{")[0] in out
+
+
+def test_pre_receive_regex_timeout(temp_git_dir, capsys, monkeypatch):
+    """Test that push fails and other refs are stopped when exclude pattern takes too long."""
+    with temp_git_dir.as_cwd():
+        git_commit("Initial commit SD-1")
+        base = cmd_output("git", "rev-parse", "HEAD").strip()
+        git_commit("a" * 40 + "!")
+        new = cmd_output("git", "rev-parse", "HEAD").strip()
+        cmd_output("git", "reset", "--hard", base)
+
+        updates = f"{base} {new} refs/heads/main\n{base} {new} refs/heads/feature\n"
+        monkeypatch.setattr("sys.stdin", io.StringIO(updates))
+        assert pre_receive_main(["-e", "^(a+)+$"]) == 1
+
+        out, _ = capsys.readouterr()
+        assert "Regex '^(a+)+$' took longer than" in out
+        assert NO_TASK_ERROR_MSG not in out
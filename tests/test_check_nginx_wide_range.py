@@ -1,10 +1,32 @@
+import io
+import json
 import os
 import shutil
 from copy import deepcopy
 from typing import List
 
-from pre_commit_hooks.check_nginx_wide_range import _disabled_locations_exist, validate_nginx_wide_range
-from pre_commit_hooks.util import get_tests_assets_path, git_add, git_diff_staged_files, git_reset
+import pytest
+
+from pre_commit_hooks import check_nginx_wide_range
+from pre_commit_hooks.check_nginx_wide_range import (
+    _disabled_locations_exist,
+    validate_nginx_history,
+    validate_nginx_wide_range,
+)
+from pre_commit_hooks.nginx import exposure
+from pre_commit_hooks.nginx.analyzer import DEFAULT_DENY_LOCATIONS
+from pre_commit_hooks.nginx.parser import parse_config
+from pre_commit_hooks.nginx.report import JsonLinesReporter
+from pre_commit_hooks.util import (
+    cmd_output,
+    get_cache_dir,
+    get_pre_commit_run_id,
+    get_tests_assets_path,
+    git_add,
+    git_commit,
+    git_diff_staged_files,
+    git_reset,
+)
 
 
 def _prepare_test(dirname: str, git_dir: str) -> List[str]:
@@ -147,15 +169,25 @@ def test_wide_try_files_with_disabled_locations(temp_git_dir_with_files):
         assert validate_nginx_wide_range(filenames) == 0
 
 
-def test_disabled_locations_exist_messed_order(
-    locations, messed_locations, capsys,
-):
+def test_disabled_locations_exist_messed_order(messed_locations, capsys):
     """Check `_disabled_locations_exist` method with messed directives order."""
-    assert not _disabled_locations_exist(messed_locations)
+    assert _disabled_locations_exist(messed_locations)
     captured = capsys.readouterr()
-    assert "[ERROR] location not disabled:" in captured.out
-    assert locations[0]["args"][1] in captured.out
-    assert locations[-1]["args"][1] in captured.out
+    assert captured.out == ""
+
+
+def test_disabled_locations_exist_equivalent_regexes(locations, capsys):
+    """Check `_disabled_locations_exist` method with equivalent, but not equal regexes."""
+    locations_copy = deepcopy(locations)
+    locations_copy[0]["args"][1] = "\\.(?:json|sh|xml|md|conf|toml|yml|yaml|log|pid|json)$"
+    locations_copy[1]["args"][1] = "/cron"
+    locations_copy[-1]["args"] = [
+        "~*",
+        "^/(app/|vendor|src|tests|vagrant|docs|phpunit|(svn|git)|docker|migrations|Makefile).*",
+    ]
+    assert _disabled_locations_exist(locations_copy)
+    captured = capsys.readouterr()
+    assert captured.out == ""
 
 
 def test_disabled_locations_exist_not_all_directives_added(locations, capsys):
@@ -191,6 +223,13 @@ def test_disabled_locations_exist_not_all_directives_regex_values_added(
     assert locations[-1]["args"][1] in captured.out
 
 
+def test_disabled_locations_exist_reported_for_root(locations):
+    """Check `_disabled_locations_exist` method reports findings for passed nginx root."""
+    stream = io.StringIO()
+    assert not _disabled_locations_exist(locations[1:], reporter=JsonLinesReporter(stream), root="deploy/nginx.conf")
+    assert [json.loads(line)["root"] for line in stream.getvalue().splitlines()] == ["deploy/nginx.conf"]
+
+
 def test_wide_try_files_with_extra_disabled_locations_no_extra_passed(
     temp_git_dir_with_files, capsys,
 ):
@@ -377,3 +416,529 @@ def test_no_try_files_with_default_nginx_includes(temp_git_dir_with_files):
     with temp_git_dir_with_files.as_cwd():
         filenames = _prepare_test("no-try-files-with-default-nginx-includes", temp_git_dir_with_files)
         assert validate_nginx_wide_range(filenames) == 0
+
+
+def test_wide_try_files_sensitive_uris_denied(temp_git_dir_with_files):
+    """Check hook runs without errors if sensitive uris are routed to disabled locations."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-with-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        assert validate_nginx_wide_range(
+            filenames,
+            sensitive_uris=["/.env", "/vendor/autoload.php", "/composer.json"],
+        ) == 0
+
+
+def test_wide_try_files_sensitive_uris_served(temp_git_dir_with_files, capsys):
+    """Check hook fails if sensitive uri is served by wide location."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-with-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        assert validate_nginx_wide_range(
+            filenames,
+            sensitive_uris=["/.env", "/backup.sql"],
+        ) == 1
+        captured = capsys.readouterr()
+        assert "[ERROR] sensitive uri `/backup.sql` is served by wide `location /`" in captured.out
+        assert "`/.env`" not in captured.out
+
+
+def test_wide_try_files_with_disabled_locations_other_server(temp_git_dir_with_files, capsys):
+    """Check hook fails if disabled locations are defined only in other `server` block."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-with-disabled-locations-other-server",
+            temp_git_dir_with_files,
+        )
+        assert validate_nginx_wide_range(filenames) == 1
+        captured = capsys.readouterr()
+        assert "[ERROR] location not disabled:" in captured.out
+        # the same included file is reported only for server without disabled locations
+        assert captured.out.count("[ERROR] wide `try_files` directive found") == 1
+
+
+def test_cached_result_reused(temp_git_dir_with_files, capsys, monkeypatch):
+    """Check validation result is reused when included files are not changed."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        assert validate_nginx_wide_range(filenames) == 1
+        expected_output = capsys.readouterr().out
+
+        with monkeypatch.context() as patch:
+            patch.setattr(check_nginx_wide_range, "parse_config", None)
+            assert validate_nginx_wide_range(filenames) == 1
+        assert capsys.readouterr().out == expected_output
+
+        # other hook options are not cached yet
+        assert validate_nginx_wide_range(filenames, custom_deny_locations=["/cron.*"]) == 1
+
+
+def test_cached_result_not_reused_for_changed_files(temp_git_dir_with_files, capsys):
+    """Check validation result is not reused when included file is changed."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        assert validate_nginx_wide_range(filenames) == 1
+
+        # unstaged changes are not cached
+        with open("nginx.d/locations_allowed.conf", "w") as config:
+            config.write("location / { try_files /index.html =404; }")
+        assert validate_nginx_wide_range(filenames) == 0
+        git_add()
+        assert validate_nginx_wide_range(filenames) == 0
+
+        with open("nginx.d/locations_allowed.conf", "w") as config:
+            config.write("location / { try_files $uri /index.html; }")
+        git_add()
+        assert validate_nginx_wide_range(filenames) == 1
+
+
+def test_root_validated_once_per_run(temp_git_dir_with_files, capsys, monkeypatch):
+    """Check nginx root is validated once by parallel hook invocations of one run."""
+    monkeypatch.setenv("PRE_COMMIT", "1")
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        first_chunk, second_chunk = filenames[::2], filenames[1::2]
+        assert validate_nginx_wide_range(first_chunk) == 1
+        assert "[ERROR]" in capsys.readouterr().out
+        assert validate_nginx_wide_range(second_chunk) == 0
+        assert capsys.readouterr().out == ""
+
+        # hook with other options validates root again
+        assert validate_nginx_wide_range(second_chunk, custom_deny_locations=["/cron.*"]) == 1
+
+        # run isn't identified by pid alone, as it may be reused by next runs
+        monkeypatch.setattr(os, "getppid", lambda: 2 ** 31 - 1)
+        assert get_pre_commit_run_id() is None
+        assert validate_nginx_wide_range(second_chunk) == 1
+        monkeypatch.undo()
+
+        monkeypatch.setattr(check_nginx_wide_range, "get_pre_commit_run_id", lambda: "next-run")
+        assert validate_nginx_wide_range(second_chunk) == 1
+
+
+def test_files_from(temp_git_dir_with_files, tmpdir):
+    """Check committed files are read from NUL-delimited `--files-from` file."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        files_from = tmpdir.join("files")
+        files_from.write("\0".join(filenames) + "\0")
+        assert check_nginx_wide_range.main(["--files-from", str(files_from), "--no_cache"]) == 1
+
+        files_from.write("")
+        assert check_nginx_wide_range.main(["--files-from", str(files_from)]) == 0
+
+
+def test_history_range(temp_git_dir, capsys, monkeypatch):
+    """Check nginx config is validated once per distinct state in commits range."""
+    parsed = []
+    monkeypatch.setattr(
+        check_nginx_wide_range,
+        "parse_config",
+        lambda *args, **kwargs: parsed.append(args) or parse_config(*args, **kwargs),
+    )
+    with temp_git_dir.as_cwd():
+        git_commit("Initial commit")
+        start = cmd_output("git", "rev-parse", "HEAD").strip()
+
+        _prepare_test("wide-try-files-with-disabled-locations", temp_git_dir)
+        git_commit("Add valid config")
+        with open(".nginx.d/locations_disabled.conf") as config:
+            disabled_locations = config.read()
+
+        with open(".nginx.d/locations_disabled.conf", "w") as config:
+            config.write("")
+        git_add()
+        git_commit("Hide disabled locations")
+        invalid_commit = cmd_output("git", "rev-parse", "HEAD").strip()
+
+        with open(".nginx.d/locations_disabled.conf", "w") as config:
+            config.write(disabled_locations)
+        git_add()
+        git_commit("Restore disabled locations")
+        with open("README.md", "w") as readme:
+            readme.write("Readme")
+        git_add()
+        git_commit("Add readme")
+
+        # working tree is valid, but wide `try_files` was pushed in history
+        assert validate_nginx_wide_range(["nginx.conf"]) == 0
+        capsys.readouterr()
+        parsed.clear()
+        assert validate_nginx_history(f"{start}..HEAD") == 1
+        output = capsys.readouterr().out
+        assert f"is not valid in commit `{invalid_commit[:12]}`" in output
+        assert "[ERROR] wide `try_files` directive found: file `.nginx.d/locations_allowed.conf`, 7 line" in output
+        assert len(parsed) == 2
+
+        monkeypatch.setenv("PRE_COMMIT_FROM_REF", invalid_commit)
+        monkeypatch.setenv("PRE_COMMIT_TO_REF", "HEAD")
+        # `pre-commit` passes filenames after args, they are not taken as range
+        assert check_nginx_wide_range.main(["--range", "nginx.conf", ".nginx.d/locations_disabled.conf"]) == 0
+        assert check_nginx_wide_range.main(["--range", "--revision_range", f"{start}..HEAD", "nginx.conf"]) == 1
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_scan(tmpdir, capsys, jobs):
+    """Check nginx configs of all repos in directory are validated."""
+    for repo, asset in (
+        ("valid", "wide-try-files-with-disabled-locations"),
+        ("invalid", "wide-try-files-no-disabled-locations"),
+        ("other", "no-try-files"),
+    ):
+        tmpdir.mkdir(repo).mkdir(".git")
+        shutil.copytree(
+            os.path.join(get_tests_assets_path("check-nginx-wide-range"), asset),
+            tmpdir.join(repo, "deploy"),
+        )
+
+    args = ["scan", str(tmpdir), "--jobs", jobs, "--cache_dir", str(tmpdir.join("cache"))]
+    assert check_nginx_wide_range.main(args) == 1
+    output = capsys.readouterr().out
+    assert f"[FAIL] {tmpdir.join('invalid', 'deploy', 'nginx.conf')}" in output
+    assert "[ERROR] wide `try_files` directive found" in output
+    assert "Scanned 3 nginx configs in 3 repos, 1 of them are not valid." in output
+
+    assert check_nginx_wide_range.main(args + ["--format", "jsonl"]) == 1
+    results = {
+        result["repo"]: result
+        for result in map(json.loads, capsys.readouterr().out.splitlines())
+    }
+    assert results[str(tmpdir.join("valid"))]["findings"] == []
+    assert results[str(tmpdir.join("invalid"))]["findings"][0]["kind"] == "location_not_disabled"
+
+
+def test_scan_shards(tmpdir, capsys):
+    """Check shards of scan are disjoint and merged to the same report."""
+    for repo, asset in (
+        ("valid", "wide-try-files-with-disabled-locations"),
+        ("invalid", "wide-try-files-no-disabled-locations"),
+        ("other", "no-try-files"),
+    ):
+        tmpdir.mkdir(repo).mkdir(".git")
+        shutil.copytree(
+            os.path.join(get_tests_assets_path("check-nginx-wide-range"), asset),
+            tmpdir.join(repo, "deploy"),
+        )
+
+    args = ["scan", str(tmpdir), "--jobs", "1", "--no_cache", "--format", "jsonl"]
+    artifacts = [str(tmpdir.join(f"shard-{index}.jsonl")) for index in (1, 2)]
+    roots = []
+    for index, artifact in enumerate(artifacts, start=1):
+        check_nginx_wide_range.main(args + ["--shard", f"{index}/2", "--shard_output", artifact])
+        shard = [json.loads(line)["root"] for line in capsys.readouterr().out.splitlines()]
+        assert shard
+        roots.extend(shard)
+    repos = ("invalid", "other", "valid")
+    assert sorted(roots) == [str(tmpdir.join(repo, "deploy", "nginx.conf")) for repo in repos]
+
+    assert check_nginx_wide_range.main(["merge", *artifacts]) == 1
+    assert "Scanned 3 nginx configs in 3 repos, 1 of them are not valid." in capsys.readouterr().out
+
+    assert check_nginx_wide_range.main(["merge", artifacts[0]]) == 1
+    assert "[ERROR] Missing shard artifacts: 2/2" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        check_nginx_wide_range.main(args + ["--shard", "3/2"])
+
+
+def test_nginx_dump(tmpdir, capsys, monkeypatch):
+    """Check nginx config is validated from `nginx -T` dump."""
+    for name, asset in (
+        ("valid", "wide-try-files-with-disabled-locations"),
+        ("invalid", "wide-try-files-no-disabled-locations"),
+    ):
+        asset_dir = os.path.join(get_tests_assets_path("check-nginx-wide-range"), asset)
+        with tmpdir.join(f"{name}.txt").open("w") as dump:
+            paths = [os.path.join(path, name) for path, _, names in os.walk(asset_dir) for name in names]
+            # root config goes first, like in `nginx -T` output
+            for path in sorted(paths, key=lambda path: os.path.basename(path) != "nginx.conf"):
+                with open(path) as config:
+                    dump.write(f"# configuration file {path}:\n{config.read()}\n")
+
+    assert check_nginx_wide_range.main(["--nginx_dump", str(tmpdir.join("valid.txt"))]) == 0
+    monkeypatch.setattr("sys.stdin", io.StringIO(tmpdir.join("invalid.txt").read()))
+    assert check_nginx_wide_range.main(["--nginx_dump", "-"]) == 1
+    output = capsys.readouterr().out
+    assert "[ERROR] location not disabled" in output
+    assert "[ERROR] wide `try_files` directive found" in output
+
+
+def test_web_roots_exposed_files(temp_git_dir_with_files, capsys):
+    """Check only real sensitive files of web root fail validation."""
+    with temp_git_dir_with_files.as_cwd():
+        temp_git_dir_with_files.join("dist", "web").ensure("index.html")
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        # config has no deny locations, but web root has no sensitive files
+        assert validate_nginx_wide_range(filenames) == 1
+        assert validate_nginx_wide_range(filenames, web_roots=[]) == 0
+
+        # not tracked files are not deployed
+        temp_git_dir_with_files.join("dist", "web").ensure(".env")
+        temp_git_dir_with_files.join("dist", "web").ensure("composer.json")
+        temp_git_dir_with_files.join("dist", "web", "static").ensure(".env")
+        assert validate_nginx_wide_range(filenames, web_roots=[]) == 0
+        capsys.readouterr()
+
+        git_add()
+        assert check_nginx_wide_range.main(filenames + ["--web_roots", "/workspace/app=."]) == 1
+        output = capsys.readouterr().out
+        assert "[ERROR] sensitive file `dist/web/.env` is served by `location /`" in output
+        assert "sensitive file `dist/web/composer.json`" in output
+        # location without content handler serves static files
+        assert "sensitive file `dist/web/static/.env` is served by `location ~ ^/(public|" in output
+        assert "[ERROR] wide `try_files` directive found" in output
+        assert "location not disabled" not in output
+
+        # index of the same web root files is taken from cache, git objects are not written
+        objects = sorted(temp_git_dir_with_files.join(".git", "objects").visit())
+        cache_path = os.path.join(get_cache_dir(), exposure.WEB_ROOTS_CACHE_FILENAME)
+        with open(cache_path) as cache_file:
+            entries = json.load(cache_file)
+        with open(cache_path, "w") as cache_file:
+            entries = {key: [uri for uri in uris if "composer" not in uri] for key, uris in entries.items()}
+            json.dump(entries, cache_file)
+        assert validate_nginx_wide_range(filenames, web_roots=[]) == 1
+        output = capsys.readouterr().out
+        assert "sensitive file `dist/web/.env`" in output
+        assert "composer.json" not in output
+        assert sorted(temp_git_dir_with_files.join(".git", "objects").visit()) == objects
+
+
+def test_time_budget(temp_git_dir_with_files, capsys):
+    """Check roots left out of time budget are validated first on next run."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        assert validate_nginx_wide_range(filenames, time_budget=0) == 0
+        output = capsys.readouterr().out
+        assert "[WARNING] nginx config `nginx.conf` is not validated within time budget" in output
+        assert "[ERROR]" not in output
+
+        # pending root is validated even if it isn't committed
+        assert validate_nginx_wide_range(["README.md"], time_budget=60) == 1
+        assert "[ERROR] wide `try_files` directive found" in capsys.readouterr().out
+        assert validate_nginx_wide_range(["README.md"], time_budget=60) == 0
+
+        # cached results are used out of time budget as well
+        assert validate_nginx_wide_range(filenames, time_budget=0) == 1
+        assert "[WARNING]" not in capsys.readouterr().out
+
+
+def test_time_budget_exceeded_while_parsing(temp_git_dir_with_files, capsys, monkeypatch):
+    """Check root is deferred if time budget is exceeded between levels of included files."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        clock = iter(range(100))
+        monkeypatch.setattr(check_nginx_wide_range.time, "monotonic", lambda: next(clock))
+        # budget is exceeded after result cache lookup, when config is parsed
+        assert validate_nginx_wide_range(filenames, time_budget=1.5) == 0
+        assert "is not validated within time budget" in capsys.readouterr().out
+
+        monkeypatch.undo()
+        assert validate_nginx_wide_range(["README.md"], time_budget=60) == 1
+
+
+def test_baseline(temp_git_dir_with_files, capsys):
+    """Check only findings which are not in baseline fail validation."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        baseline = str(temp_git_dir_with_files.join("nginx-baseline.json"))
+        args = filenames + ["--baseline", baseline, "--enable_rules", "autoindex"]
+        assert check_nginx_wide_range.main(args + ["--update_baseline"]) == 0
+        assert "updated with 7 known findings" in capsys.readouterr().out
+        with open(baseline) as baseline_file:
+            fingerprints = json.load(baseline_file)["fingerprints"]
+        assert "location_not_disabled:nginx.conf::location ~ /cron.*" in fingerprints
+        assert "wide_try_files:nginx.d/locations_allowed.conf::try_files $uri $uri/ $uri/index.html /index.html" in (
+            fingerprints
+        )
+
+        # known findings are not reported even if their lines are changed
+        locations = temp_git_dir_with_files.join("nginx.d", "locations_allowed.conf")
+        locations.write("\n\n" + locations.read() + "\nlocation /media { autoindex on; }\n")
+        assert check_nginx_wide_range.main(args) == 1
+        output = capsys.readouterr().out
+        assert "`autoindex on` directive found" in output
+        assert "try_files" not in output
+
+        locations.write(locations.read() + "\nlocation /app { try_files $uri /app.html; }\n")
+        assert check_nginx_wide_range.main(args + ["--update_baseline"]) == 0
+        assert check_nginx_wide_range.main(args) == 0
+        capsys.readouterr()
+
+        # only new wide `try_files` directive is reported, known problems of
+        # its server are not
+        locations.write(locations.read() + "\nlocation /api { try_files $uri /api.html; }\n")
+        assert check_nginx_wide_range.main(args) == 1
+        output = capsys.readouterr().out
+        assert "location not disabled" not in output
+        assert "locations_allowed.conf`, 39 line" in output
+
+
+def test_baseline_update_keeps_other_roots(temp_git_dir_with_files, capsys):
+    """Check baseline update analyzes default root and keeps findings of other roots."""
+    with temp_git_dir_with_files.as_cwd():
+        _prepare_test("wide-try-files-no-disabled-locations", temp_git_dir_with_files)
+        shutil.copytree(
+            os.path.join(get_tests_assets_path("check-nginx-wide-range"), "wide-try-files-no-disabled-locations"),
+            "other",
+        )
+        baseline = str(temp_git_dir_with_files.join("nginx-baseline.json"))
+        args = ["--baseline", baseline, "--update_baseline"]
+        assert check_nginx_wide_range.main(["other/nginx.conf"] + args) == 0
+        assert "updated with 14 known findings" in capsys.readouterr().out
+
+        # no committed nginx configs, default one is updated, other is kept
+        assert check_nginx_wide_range.main(args) == 0
+        assert "updated with 14 known findings" in capsys.readouterr().out
+        assert check_nginx_wide_range.main(["other/nginx.conf", "--baseline", baseline]) == 0
+
+        # empty baseline doesn't overwrite known findings
+        for path in ("nginx.d/locations_allowed.conf", "other/nginx.d/locations_allowed.conf"):
+            temp_git_dir_with_files.join(path).write("")
+        assert check_nginx_wide_range.main(["other/nginx.conf"] + args) == 1
+        assert "is not updated" in capsys.readouterr().out
+        with open(baseline) as baseline_file:
+            assert len(json.load(baseline_file)["fingerprints"]) == 14
+
+
+def test_baseline_removed_deny_location(temp_git_dir_with_files, capsys):
+    """Check deny location removed from baselined server is reported."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-with-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        baseline = str(temp_git_dir_with_files.join("nginx-baseline.json"))
+        # server has known problem, so its wide `try_files` directive is baselined
+        args = filenames + ["--baseline", baseline, "--extra_deny_locations", "/cron3.*"]
+        assert check_nginx_wide_range.main(args + ["--update_baseline"]) == 0
+        assert "updated with 2 known findings" in capsys.readouterr().out
+        assert check_nginx_wide_range.main(args) == 0
+
+        locations = temp_git_dir_with_files.join(".nginx.d", "locations_disabled.conf")
+        locations.write(locations.read().replace("location ~ /\\.", "# location ~ /\\."))
+        assert check_nginx_wide_range.main(args) == 1
+        output = capsys.readouterr().out
+        assert "location not disabled: `location ~ /\\.`" in output
+        assert "/cron3.*" not in output
+
+
+def test_structured_format(temp_git_dir_with_files, capsys):
+    """Check findings are printed in structured formats, cached ones too."""
+    with temp_git_dir_with_files.as_cwd():
+        filenames = _prepare_test(
+            "wide-try-files-no-disabled-locations",
+            temp_git_dir_with_files,
+        )
+        for _ in range(2):
+            assert check_nginx_wide_range.main(filenames + ["--format", "jsonl"]) == 1
+            findings = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+            assert {finding["root"] for finding in findings} == {"nginx.conf"}
+            assert findings[-1]["kind"] == "wide_try_files"
+            assert findings[-1]["file"] == "nginx.d/locations_allowed.conf"
+
+        assert check_nginx_wide_range.main(filenames + ["--format", "sarif", "--time_budget", "0"]) == 1
+        output = capsys.readouterr()
+        assert len(json.loads(output.out)["runs"][0]["results"]) == len(findings)
+        assert output.err == ""
+
+
+def test_templates_not_used_by_default(temp_git_dir_with_files, capsys):
+    """Check `*.template` files are used only with template values or if nginx root is template."""
+    with temp_git_dir_with_files.as_cwd():
+        temp_git_dir_with_files.join("nginx.conf").write(
+            "events {}\n"
+            "http {\n"
+            "  server {\n"
+            "    include snippets/deny.conf;\n"
+            "    location / { try_files $uri $uri/ /index.html; }\n"
+            "  }\n"
+            "}\n",
+        )
+        temp_git_dir_with_files.join("snippets", "deny.conf.template").write(
+            "".join(f'location ~ "{location}" {{ deny all; }}\n' for location in DEFAULT_DENY_LOCATIONS),
+            ensure=True,
+        )
+        values = temp_git_dir_with_files.join("nginx.env")
+        values.write("PORT=8080\n")
+        git_add()
+
+        # committed template doesn't trigger validation of not template nginx root
+        assert validate_nginx_wide_range(["snippets/deny.conf.template"]) == 0
+        assert capsys.readouterr().out == ""
+        # template isn't read instead of missing included file
+        assert validate_nginx_wide_range(["nginx.conf"]) == 1
+        assert "snippets/deny.conf" in capsys.readouterr().out
+
+        assert validate_nginx_wide_range(["snippets/deny.conf.template"], template_values=str(values)) == 0
+        assert validate_nginx_wide_range(["nginx.conf"], template_values=str(values)) == 0
+
+
+def test_templates(temp_git_dir_with_files, capsys, monkeypatch):
+    """Check `*.template` configs are rendered with placeholder values and cached by templates."""
+    with temp_git_dir_with_files.as_cwd():
+        temp_git_dir_with_files.join("nginx.conf.template").write(
+            "events {}\n"
+            "http {\n"
+            "  server {\n"
+            "    listen ${PORT};\n"
+            "    include snippets/deny.conf;\n"
+            "    location / { try_files $uri $uri/ /index.html; }\n"
+            "  }\n"
+            "}\n",
+        )
+        deny_locations = [location for location in DEFAULT_DENY_LOCATIONS if location != "/cron.*"]
+        temp_git_dir_with_files.join("snippets", "deny.conf.template").write(
+            "".join(f'location ~ "{location}" {{ deny all; }}\n' for location in deny_locations)
+            + 'location ~ "/cron.*" { return ${DENY_STATUS}; }\n',
+            ensure=True,
+        )
+        values = temp_git_dir_with_files.join("nginx.env")
+        values.write("# values of deployment\nPORT=8080\nDENY_STATUS='403'\n")
+        git_add()
+        filenames = git_diff_staged_files()
+        assert "snippets/deny.conf.template" in filenames
+
+        # placeholders without values are kept
+        assert check_nginx_wide_range.main(filenames) == 1
+        assert "/cron.*" in capsys.readouterr().out
+
+        assert check_nginx_wide_range.main(filenames + ["--template_values", str(values)]) == 0
+        with monkeypatch.context() as patch:
+            patch.setattr(check_nginx_wide_range, "parse_config", None)
+            assert check_nginx_wide_range.main(filenames + ["--template_values", str(values)]) == 0
+
+        values.write("PORT=8080\nDENY_STATUS=200\n")
+        assert check_nginx_wide_range.main(filenames + ["--template_values", str(values)]) == 1
+
+        values.write("PORT\n")
+        with pytest.raises(SystemExit):
+            check_nginx_wide_range.main(filenames + ["--template_values", str(values)])
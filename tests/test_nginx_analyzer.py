@@ -0,0 +1,153 @@
+from copy import deepcopy
+
+import pytest
+
+from pre_commit_hooks.nginx.analyzer import (
+    LOCATION_NOT_DISABLED,
+    PARSE_ERROR,
+    SENSITIVE_URI_SERVED,
+    WIDE_TRY_FILES,
+    NginxAnalyzer,
+)
+from pre_commit_hooks.nginx.parser import parse_config
+from pre_commit_hooks.nginx.rules import (
+    ALIAS_TRAVERSAL,
+    AUTOINDEX_ENABLED,
+    CLIENT_MAX_BODY_SIZE_MISSING,
+    SERVER_TOKENS_ENABLED,
+    RuleEngine,
+)
+
+NGINX_CONFIG = """
+events {}
+http {
+  include mime.types;
+  server {
+    listen 80;
+    location / {
+      try_files $uri $uri/ /index.php?$query_string;
+    }
+    location ~ /\\. { deny all; }
+  }
+}
+"""
+
+RULES_CONFIG = """
+events {}
+http {
+  server_tokens on;
+  server {
+    listen 80;
+    client_max_body_size 10m;
+    location /static {
+      alias /app/static/;
+      autoindex on;
+    }
+    location /media/ {
+      alias /app/media/;
+      autoindex off;
+    }
+  }
+  server {
+    listen 81;
+    location /files { alias /app/files; }
+  }
+}
+"""
+
+
+@pytest.fixture
+def payload(tmp_path):
+    """Parse nginx config with wide `try_files` directive."""
+    path = tmp_path / "nginx.conf"
+    path.write_text(NGINX_CONFIG)
+    return parse_config(str(path))
+
+
+def test_analyze_returns_findings(payload, capsys):
+    """Ensure findings are returned without printing."""
+    findings = NginxAnalyzer(custom_deny_locations=["/\\.", "/cron"]).analyze(payload)
+    assert [finding.kind for finding in findings] == [LOCATION_NOT_DISABLED, WIDE_TRY_FILES]
+    assert "`location ~ /cron`" in findings[0].message
+    assert findings[1].file.endswith("nginx.conf")
+    assert findings[1].line == 8
+    assert capsys.readouterr().out == ""
+
+
+def test_analyze_sensitive_uris(payload):
+    """Ensure sensitive uris served by wide locations are found."""
+    analyzer = NginxAnalyzer(custom_deny_locations=["/\\."], sensitive_uris=["/.env", "/composer.json"])
+    findings = analyzer.analyze(payload)
+    assert [finding.kind for finding in findings] == [SENSITIVE_URI_SERVED, WIDE_TRY_FILES]
+    assert "`/composer.json`" in findings[0].message
+
+
+def test_analyzer_is_stateless(payload):
+    """Ensure analyzer changes neither its policy nor analyzed configs."""
+    ignore_errors_keywords = ["custom"]
+    analyzer = NginxAnalyzer(ignore_errors_keywords=ignore_errors_keywords)
+    original = deepcopy(payload)
+
+    results = [analyzer.analyze(payload) for _ in range(3)]
+    assert results[0] == results[1] == results[2]
+    assert payload == original
+    assert ignore_errors_keywords == ["custom"]
+
+
+def test_parse_errors_not_ignored(payload):
+    """Ensure only parse errors without ignored keywords are returned."""
+    payload = deepcopy(payload)
+    payload["errors"].append({"file": "nginx.conf", "error": "unknown directive", "line": 3})
+    payload["status"] = "failed"
+
+    findings = NginxAnalyzer().analyze(payload)
+    assert [(finding.kind, finding.line) for finding in findings] == [(PARSE_ERROR, 3)]
+    assert NginxAnalyzer(ignore_errors_keywords=["unknown"]).parse_errors(payload) == []
+
+
+def test_enabled_rules(tmp_path):
+    """Ensure only enabled rules are run and their findings are in config order."""
+    path = tmp_path / "nginx.conf"
+    path.write_text(RULES_CONFIG)
+    payload = parse_config(str(path))
+    assert NginxAnalyzer().analyze(payload) == []
+
+    analyzer = NginxAnalyzer(
+        enabled_rules=["client_max_body_size", "autoindex", "alias_traversal", "server_tokens"],
+    )
+    findings = analyzer.analyze(payload)
+    assert [(finding.kind, finding.line) for finding in findings] == [
+        (SERVER_TOKENS_ENABLED, 4),
+        (ALIAS_TRAVERSAL, 9),
+        (AUTOINDEX_ENABLED, 10),
+        (CLIENT_MAX_BODY_SIZE_MISSING, 17),
+    ]
+    assert "`location /static` allows path traversal with `/static../` uris" in findings[1].message
+
+    findings = NginxAnalyzer(enabled_rules=["autoindex"]).analyze(payload)
+    assert [finding.kind for finding in findings] == [AUTOINDEX_ENABLED]
+
+
+def test_unknown_rule():
+    """Ensure unknown rules are rejected."""
+    with pytest.raises(ValueError, match="Unknown nginx rules: missing"):
+        RuleEngine(["autoindex", "missing"])
+
+
+def test_fingerprints_server_names(tmp_path):
+    """Ensure fingerprints of findings have `server_name` values of their own `server` blocks."""
+    path = tmp_path / "nginx.conf"
+    path.write_text(
+        "events {}\n"
+        "http {\n"
+        "  autoindex on;\n"
+        "  server { server_name b.example.com a.example.com; location / { autoindex on; } }\n"
+        "  server { location / { autoindex on; } server_name c.example.com; }\n"
+        "}\n",
+    )
+    findings = NginxAnalyzer(enabled_rules=["autoindex"]).analyze(parse_config(str(path)))
+    assert [finding.fingerprint.replace(str(tmp_path), "") for finding in findings] == [
+        "autoindex_enabled:/nginx.conf::autoindex on",
+        "autoindex_enabled:/nginx.conf:a.example.com b.example.com:autoindex on",
+        "autoindex_enabled:/nginx.conf:c.example.com:autoindex on",
+    ]
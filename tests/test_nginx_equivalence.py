@@ -0,0 +1,68 @@
+import json
+from typing import Dict, List
+
+import pytest
+
+from pre_commit_hooks.nginx.equivalence import (
+    INVALID,
+    REFERENCE_ENGINE,
+    VALID,
+    iter_cases,
+    legacy_verdict,
+    main,
+    run_harness,
+    verdict_engines,
+)
+from pre_commit_hooks.nginx.parser import parse_config
+from pre_commit_hooks.util import get_tests_assets_path
+
+ASSETS_DIR = get_tests_assets_path("check-nginx-wide-range")
+
+
+def test_engines_are_equivalent():
+    """Check optimized hook paths give the same results as `crossplane` on assets and generated configs."""
+    results = list(run_harness(iter_cases(60, seed=1, assets_dir=ASSETS_DIR)))
+    assert len(results) > 60
+    assert [(result.name, result.differences) for result in results if result.differences] == []
+
+
+def test_verdicts_are_equivalent():
+    """Check hook verdicts are the same as of its first version on configs it could validate."""
+    results = list(run_harness(iter_cases(100, seed=1, legacy=True), engines=verdict_engines()))
+    assert [(result.name, result.differences) for result in results if result.differences] == []
+
+
+@pytest.mark.parametrize(
+    ["asset", "expected"],
+    [
+        ["wide-try-files-with-disabled-locations", True],
+        ["wide-try-files-no-disabled-locations", False],
+        ["not-wide-try-files", True],
+    ],
+)
+def test_legacy_verdict(asset: str, expected: bool):
+    """Check verdicts of first hook version logic on assets."""
+    assert legacy_verdict(f"{ASSETS_DIR}/{asset}/nginx.conf") is expected
+
+
+def test_differences_are_reported():
+    """Check harness reports verdict of engine which differs from reference one."""
+
+    def broken_engine(root: str, files: Dict[str, str]) -> List[str]:
+        # parse errors are ignored, so some configs become valid
+        return [VALID if parse_config(root)["status"] != "ok" or legacy_verdict(root) else INVALID]
+
+    engines = {REFERENCE_ENGINE: verdict_engines()[REFERENCE_ENGINE], "broken": broken_engine}
+    results = list(run_harness(iter_cases(40, seed=1, legacy=True), engines=engines))
+    assert any(result.differences for result in results)
+    assert all(difference.startswith("broken: ") for result in results for difference in result.differences)
+
+
+def test_main_json(capsys: pytest.CaptureFixture):
+    """Check harness prints JSON line per case and passes if there are no differences."""
+    assert main(["--cases", "3", "--jobs", "1", "--format", "json", "--assets_dir", "missing"]) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["case"] for line in lines] == [f"generated-{index}" for index in range(3)] + [
+        f"legacy-{index}" for index in range(3)
+    ]
+    assert all(line["differences"] == [] for line in lines)
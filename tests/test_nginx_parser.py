@@ -0,0 +1,166 @@
+import glob
+import io
+import os
+import pathlib
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import crossplane
+import pytest
+
+from pre_commit_hooks.nginx import parser
+from pre_commit_hooks.nginx.cache import DiskParseCache
+from pre_commit_hooks.nginx.dump import read_dump
+from pre_commit_hooks.nginx.git import CatFileBatch, GitTreeSource
+from pre_commit_hooks.util import get_tests_assets_path, git_add, git_commit
+
+CONFIG_FILES = {
+    "nginx.conf": """
+events {}
+http {
+  include conf.d/*.conf;
+  include missing.conf;
+  server {
+    listen 80;
+    include snippets/deny.conf;
+  }
+}
+""",
+    "conf.d/a.conf": """
+server {
+  listen 81;
+  location / { try_files $uri $uri/ /index.php; }
+  include snippets/deny.conf;
+  unknown_directive on;
+}
+""",
+    "conf.d/b.conf": """
+server {
+  listen 82;
+  location ~ "^/(a|b)+$" { return 403; }
+  listen;
+  include snippets/broken.conf;
+}
+""",
+    "snippets/deny.conf": "location ~ /\\. { deny all; }  # comment\n",
+    "snippets/broken.conf": "location /broken {\n",
+}
+
+
+def _write_config(directory):
+    """Write nginx config files to directory."""
+    for name, content in CONFIG_FILES.items():
+        path = directory / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(content)
+
+
+@pytest.fixture
+def nginx_config(tmp_path):
+    """Create nginx config with nested includes and errors."""
+    _write_config(tmp_path)
+    return str(tmp_path / "nginx.conf")
+
+
+def test_parse_config_same_as_crossplane(nginx_config):
+    """Ensure parsed config is the same as `crossplane` one."""
+    assert parser.parse_config(nginx_config) == crossplane.parse(nginx_config)
+
+
+def test_parse_config_in_process_pool(nginx_config, monkeypatch):
+    """Ensure files parsed in process pool are merged in the same order."""
+    monkeypatch.setattr(parser, "PARALLEL_MIN_FILES", 1)
+    with ProcessPoolExecutor(2) as executor:
+        assert parser.parse_config(nginx_config, executor, jobs=2) == crossplane.parse(nginx_config)
+
+
+def test_parse_config_chunks_by_jobs(tmp_path, monkeypatch):
+    """Ensure files of level are split to chunks by number of pool processes."""
+    for index in range(parser.PARALLEL_MIN_FILES * 4):
+        (tmp_path / f"{index}.conf").write_text("# empty\n")
+    (tmp_path / "nginx.conf").write_text("include *.conf;\n")
+    chunksizes = []
+
+    def map_files(function, *arguments, chunksize):
+        chunksizes.append(chunksize)
+        return map(function, *arguments)
+
+    monkeypatch.setattr(parser.os, "cpu_count", lambda: 1)
+    parser.parse_config(str(tmp_path / "nginx.conf"), SimpleNamespace(map=map_files), jobs=4)
+    assert chunksizes == [parser.PARALLEL_MIN_FILES * 4 // 16]
+
+
+def test_parse_config_with_parse_cache(nginx_config, tmp_path, monkeypatch):
+    """Ensure files with the same content are parsed once."""
+    cache = DiskParseCache(str(tmp_path / "cache"))
+    assert parser.parse_config(nginx_config, cache=cache) == crossplane.parse(nginx_config)
+
+    # the same files in other dir are taken from cache with their paths
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    _write_config(other_dir)
+    other_config = str(other_dir / "nginx.conf")
+    with monkeypatch.context() as patch:
+        patch.setattr(parser, "_parse_text", None)
+        assert parser.parse_config(other_config, cache=cache) == crossplane.parse(other_config)
+
+
+def test_parse_config_deadline(nginx_config, monkeypatch):
+    """Ensure included files are not parsed after deadline is passed."""
+    parsed = []
+    parse_file = parser.parse_file
+    monkeypatch.setattr(parser, "parse_file", lambda name, *args: parsed.append(name) or parse_file(name, *args))
+    clock = iter([0, 10])
+    monkeypatch.setattr(parser, "time", SimpleNamespace(monotonic=lambda: next(clock)))
+    with pytest.raises(parser.ParseDeadlineError):
+        parser.parse_config(nginx_config, deadline=5)
+    assert parsed == [nginx_config]
+
+
+def test_parse_config_from_git_tree(temp_git_dir):
+    """Ensure config read from git commit is the same as from file system."""
+    with temp_git_dir.as_cwd():
+        _write_config(pathlib.Path(temp_git_dir))
+        temp_git_dir.join("conf.d", ".hidden.conf").write("unknown_directive on;")
+        git_add()
+        git_commit("Add config")
+        temp_git_dir.join("conf.d", "c.conf").write("server { listen 83; }")
+
+        batch = CatFileBatch()
+        try:
+            source = GitTreeSource(batch, batch.commit_tree("HEAD"))
+            payload = parser.parse_config("nginx.conf", source=source)
+        finally:
+            batch.close()
+        temp_git_dir.join("conf.d", "c.conf").remove()
+        assert payload == crossplane.parse("nginx.conf")
+
+
+def test_parse_config_from_dump(tmp_path):
+    """Ensure config read from `nginx -T` dump is the same as from file system."""
+    config_dir = tmp_path / "nginx"
+    config_dir.mkdir()
+    _write_config(config_dir)
+    (config_dir / "conf.d" / ".hidden.conf").write_text("unknown_directive on;")
+    expected = crossplane.parse(str(config_dir / "nginx.conf"))
+
+    dump = io.StringIO()
+    dump.write("nginx: the configuration file nginx.conf syntax is ok\n")
+    for name in ["nginx.conf", "snippets/broken.conf", "conf.d/b.conf", "conf.d/.hidden.conf", *CONFIG_FILES]:
+        dump.write(f"# configuration file {config_dir / name}:\n{(config_dir / name).read_text()}\n")
+    shutil.rmtree(config_dir)
+
+    dump.seek(0)
+    source = read_dump(dump)
+    assert source.root == str(config_dir / "nginx.conf")
+    assert parser.parse_config(source.root, source=source) == expected
+
+
+@pytest.mark.parametrize(
+    "path",
+    sorted(glob.glob(os.path.join(get_tests_assets_path("check-nginx-wide-range"), "**", "*.conf"), recursive=True)),
+)
+def test_parse_assets_same_as_crossplane(path):
+    """Ensure test assets are parsed the same as with `crossplane`."""
+    assert parser.parse_config(path) == crossplane.parse(path)
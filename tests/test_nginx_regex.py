@@ -0,0 +1,43 @@
+import pytest
+
+from pre_commit_hooks.nginx.regex import canonical_form
+
+
+@pytest.mark.parametrize(
+    ["pattern", "equivalent"],
+    [
+        ["\\.(json|sh|xml)$", "\\.(xml|json|sh)$"],
+        ["^/(app/|vendor|src)", "^/(?:src|(vendor|app/))"],
+        ["/cron.*", "/cron"],
+        ["^.*/cron", "/cron.*?"],
+        ["a|(b|c)", "[cba]"],
+        ["(x)", "(?:x)"],
+    ],
+)
+def test_canonical_form_equivalent(pattern, equivalent):
+    """Check equivalent regexes have the same canonical form."""
+    assert canonical_form(pattern) == canonical_form(equivalent)
+
+
+@pytest.mark.parametrize(
+    ["pattern", "other"],
+    [
+        ["\\.(json|sh)$", "\\.(json|sh|md)$"],
+        ["/cron.*", "/cro"],
+        ["^/cron", "/cron"],
+        ["autodiscover\\.xml", "autodiscover.xml"],
+        ["(a)\\1", "(a)a"],
+        ["[^ab]", "[ab]"],
+        ["(?>a|ab)c", "(?>ab|a)c"],
+        ["(a|ab)*+c", "(ab|a)*+c"],
+    ],
+)
+def test_canonical_form_different(pattern, other):
+    """Check not equivalent regexes have different canonical forms."""
+    assert canonical_form(pattern) != canonical_form(other)
+
+
+def test_canonical_form_invalid_regex():
+    """Check invalid regex is compared as a raw string."""
+    assert canonical_form("(unclosed") == canonical_form("(unclosed")
+    assert canonical_form("(unclosed") != canonical_form("unclosed")
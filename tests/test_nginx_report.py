@@ -0,0 +1,50 @@
+import io
+import json
+
+from pre_commit_hooks.nginx.report import JsonLinesReporter, SarifReporter
+from pre_commit_hooks.nginx.rules import Finding
+
+FINDINGS = (
+    Finding(kind="wide_try_files", message="[ERROR] wide", file="nginx.d/site.conf", line=7, fingerprint="wide"),
+    Finding(kind="location_not_disabled", message="[ERROR] location not disabled"),
+)
+
+
+def test_json_lines_reporter():
+    """Check findings are written as JSON line per finding at once."""
+    stream = io.StringIO()
+    reporter = JsonLinesReporter(stream)
+    reporter.report("nginx.conf", FINDINGS[0])
+    assert json.loads(stream.getvalue()) == {
+        "root": "nginx.conf",
+        "kind": "wide_try_files",
+        "message": "[ERROR] wide",
+        "file": "nginx.d/site.conf",
+        "line": 7,
+        "fingerprint": "wide",
+    }
+    reporter.close()
+
+
+def test_sarif_reporter():
+    """Check SARIF log is streamed and valid after it's closed."""
+    stream = io.StringIO()
+    reporter = SarifReporter(stream)
+    for finding in FINDINGS:
+        reporter.report("nginx.conf", finding)
+    # results are written before log is finished
+    assert '"ruleId": "location_not_disabled"' in stream.getvalue()
+    reporter.close()
+
+    run = json.loads(stream.getvalue())["runs"][0]
+    assert run["tool"]["driver"]["name"] == "check-nginx-wide-range"
+    assert run["results"][0]["locations"][0]["physicalLocation"] == {
+        "artifactLocation": {"uri": "nginx.d/site.conf"},
+        "region": {"startLine": 7},
+    }
+    assert run["results"][0]["partialFingerprints"] == {"nginxFinding/v1": "wide"}
+    assert run["results"][1]["locations"][0]["physicalLocation"] == {"artifactLocation": {"uri": "nginx.conf"}}
+
+    stream = io.StringIO()
+    SarifReporter(stream).close()
+    assert json.loads(stream.getvalue())["runs"][0]["results"] == []
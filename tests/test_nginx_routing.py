@@ -0,0 +1,98 @@
+import crossplane
+import pytest
+
+from pre_commit_hooks.nginx.routing import DENIED, OTHER, SERVED, STATIC, UNMATCHED, build_routers, normalize_uri
+
+NGINX_CONFIG = """
+http {
+  server {
+    listen 80;
+    location / {
+      try_files $uri $uri/ /index.php?$query_string;
+    }
+    location = /robots.txt { return 200; }
+    location ^~ /static/ { root /var/www; }
+    location /api/ {
+      proxy_pass http://backend;
+      location ~ \\.php$ { return 404; }
+      location /api/docs/ { expires 1d; }
+    }
+    location ~ /\\. { deny all; }
+    location ~* \\.(json|env)$ { return 403; }
+    location ~ \\.json$ { try_files $uri =404; }
+  }
+  server {
+    listen 81;
+    deny all;
+    location /public/ {
+      try_files $uri $uri/ =404;
+    }
+  }
+}
+"""
+
+
+@pytest.fixture
+def routers(tmp_path):
+    """Build routers from example nginx config."""
+    path = tmp_path / "nginx.conf"
+    path.write_text(NGINX_CONFIG)
+    return build_routers(crossplane.parse(str(path)))
+
+
+@pytest.mark.parametrize(
+    ["uri", "normalized"],
+    [
+        ["/", "/"],
+        ["/a//b", "/a/b"],
+        ["/a/./b/../c", "/a/c"],
+        ["/%2e%2e/.env?x=1", "/.env"],
+        ["/dir/", "/dir/"],
+    ],
+)
+def test_normalize_uri(uri, normalized):
+    """Check uri is normalized the same way as nginx does."""
+    assert normalize_uri(uri) == normalized
+
+
+@pytest.mark.parametrize(
+    ["uri", "location", "verdict"],
+    [
+        ["/index.html", "location /", SERVED],
+        ["/robots.txt", "location = /robots.txt", OTHER],
+        ["/static/.env", "location ^~ /static/", STATIC],
+        ["/api/users", "location /api/", OTHER],
+        ["/api/index.php", "location ~ \\.php$", DENIED],
+        ["/api/docs/index.html", "location /api/docs/", STATIC],
+        ["/.env", "location ~ /\\.", DENIED],
+        ["/composer.JSON", "location ~* \\.(json|env)$", DENIED],
+        ["/a/../.git/config", "location ~ /\\.", DENIED],
+    ],
+)
+def test_route(routers, uri, location, verdict):
+    """Check request is routed to location according to nginx rules."""
+    routed = routers[0].route(uri)
+    assert routed.name == location
+    assert routers[0].classify(uri) == verdict
+
+
+def test_route_server_deny_inherited(routers):
+    """Check `deny all` of server is inherited by locations."""
+    assert routers[1].classify("/public/index.html") == DENIED
+    assert routers[1].classify("/private/") == DENIED
+
+
+def test_route_unmatched(tmp_path):
+    """Check request without matched location is reported as unmatched."""
+    path = tmp_path / "nginx.conf"
+    path.write_text("http { server { location /api/ { proxy_pass http://backend; } } }")
+    router, = build_routers(crossplane.parse(str(path)))
+    assert router.route("/.env") is None
+    assert router.classify("/.env") == UNMATCHED
+
+
+def test_route_many(routers):
+    """Check bulk routing of uris corpus."""
+    uris = ["/index.html", "/.env", "/index.html", "/./index.html"]
+    routed = [location.verdict for _, location in routers[0].route_many(uris)]
+    assert routed == [SERVED, DENIED, SERVED, SERVED]
@@ -0,0 +1,46 @@
+import pytest
+
+from pre_commit_hooks.nginx import template
+from pre_commit_hooks.nginx.template import TemplateSource, load_template_values, render_template
+
+
+def test_load_template_values(tmpdir):
+    """Check values are loaded from `NAME=value` lines, broken line is reported."""
+    values = tmpdir.join("nginx.env")
+    values.write("# comment\n\nexport HOST=\"example.com\"\nPORT=8080\nEMPTY=\n")
+    assert load_template_values(str(values)) == {"HOST": "example.com", "PORT": "8080", "EMPTY": ""}
+
+    values.write("PORT=8080\nnot valid\n")
+    with pytest.raises(ValueError, match="at 2 line"):
+        load_template_values(str(values))
+
+
+def test_render_template():
+    """Check only placeholders with values are substituted, nginx variables are kept."""
+    text = "listen ${PORT}; server_name $HOST ${MISSING}; try_files $uri $uri/ =404;"
+    assert render_template(text, {"PORT": "80", "HOST": "example.com"}) == (
+        "listen 80; server_name example.com ${MISSING}; try_files $uri $uri/ =404;"
+    )
+
+
+def test_template_source(tmpdir, monkeypatch):
+    """Check templates are read by rendered paths and rendered once per content."""
+    tmpdir.join("conf.d", "site.conf.template").write("listen ${PORT};", ensure=True)
+    tmpdir.join("conf.d", "copy.conf.template").write("listen ${PORT};")
+    tmpdir.join("conf.d", "static.conf").write("listen ${PORT};")
+    source = TemplateSource({"PORT": "80"})
+    renders = []
+    monkeypatch.setattr(template, "render_template", lambda text, values: renders.append(text) or text)
+
+    conf_d = str(tmpdir.join("conf.d"))
+    assert source.glob(f"{conf_d}/*.conf") == [f"{conf_d}/copy.conf", f"{conf_d}/site.conf", f"{conf_d}/static.conf"]
+    assert source.origin(f"{conf_d}/site.conf") == f"{conf_d}/site.conf.template"
+    assert source.origin(f"{conf_d}/static.conf") == f"{conf_d}/static.conf"
+    source.check(f"{conf_d}/site.conf")
+    with pytest.raises(FileNotFoundError):
+        source.check(f"{conf_d}/missing.conf")
+
+    for path in ("site.conf", "copy.conf", "site.conf.template", "static.conf"):
+        with source.open(f"{conf_d}/{path}") as config_file:
+            config_file.read()
+    assert renders == ["listen ${PORT};"]
@@ -0,0 +1,66 @@
+import pytest
+
+from pre_commit_hooks import regex_guard
+from pre_commit_hooks.regex_guard import (
+    ADJACENT_QUANTIFIERS,
+    NESTED_QUANTIFIERS,
+    OVERLAPPING_ALTERNATION,
+    GuardedRegex,
+    RegexTimeoutError,
+    find_backtracking_risk,
+)
+
+
+@pytest.mark.parametrize(
+    ["pattern", "risk"],
+    [
+        [r"^(feature|fix)/(?P<task>[A-Z0-9]+-[0-9]+)-.*", None],
+        [r"^Merge ", None],
+        [r"[a-z]+-[0-9]+", None],
+        [r"(?:a|b)*c", None],
+        [r"(a+)++$", None],
+        [r"(a+)+$", NESTED_QUANTIFIERS],
+        [r"^(\w+\s?)*$", NESTED_QUANTIFIERS],
+        [r"(?=(a*)*)b", NESTED_QUANTIFIERS],
+        [r"(.*)(.*)x", ADJACENT_QUANTIFIERS],
+        [r"^\d+\w+$", ADJACENT_QUANTIFIERS],
+        [r"(ab|\wc)*x", OVERLAPPING_ALTERNATION],
+        [r"(ab|cd)*x", None],
+    ],
+)
+def test_find_backtracking_risk(pattern, risk):
+    """Ensure catastrophic backtracking constructs are found."""
+    assert find_backtracking_risk(pattern) == risk
+
+
+def test_guarded_regex_match():
+    """Ensure safe and risky regexes return the same results."""
+    for pattern in [r"^(?P<task>[A-Z]+-\d+)", r"^((?P<task>[A-Z]+-\d+)+)+"]:
+        regex = GuardedRegex(pattern)
+        assert regex.match("ABC-12-branch").groups["task"] == "ABC-12"
+        assert regex.match("branch") is None
+
+
+def test_guarded_regex_timeout():
+    """Ensure matching exceeding time budget is stopped with clear error."""
+    regex = GuardedRegex(r"^(a+)+$", timeout=0.2)
+    with pytest.raises(RegexTimeoutError, match=r"Regex '\^\(a\+\)\+\$' took longer than 0.2s.*nested quantifiers"):
+        regex.search("a" * 64 + "b")
+    # worker is restarted after timeout
+    assert regex.search("aaa").group == "aaa"
+
+
+def test_guarded_regex_worker_died(monkeypatch):
+    """Ensure regex is reported if worker process dies while matching it and worker is restarted."""
+    regex = GuardedRegex(r"^(a+)+$")
+    assert regex.search("aaa").group == "aaa"
+    worker = regex_guard._worker
+
+    def kill_worker(message):
+        worker.process.kill()
+        worker.process.join()
+
+    monkeypatch.setattr(worker.connection, "send", kill_worker)
+    with pytest.raises(RegexTimeoutError, match=r"worker process stopped while matching it because of nested"):
+        regex.search("aaa")
+    assert regex.search("aaa").group == "aaa"
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from pre_commit_hooks import cli, stats
+
+
+@pytest.fixture
+def stats_log(tmpdir, monkeypatch):
+    """Enable stats collecting to log in temporary cache dir."""
+    monkeypatch.setenv(stats.STATS_ENV_VAR, "1")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+    return stats.get_stats_log_path()
+
+
+def test_stats_not_collected_without_env_var(tmpdir, monkeypatch):
+    """Ensure nothing is logged if stats are not enabled."""
+    monkeypatch.delenv(stats.STATS_ENV_VAR, raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+    with stats.collect("test-hook") as hook_stats, stats.phase("parse"):
+        stats.increment("files")
+    assert hook_stats is None
+    assert not tmpdir.listdir()
+
+
+def test_stats_collected(stats_log):
+    """Ensure phases durations and counters are logged."""
+    with stats.collect("test-hook"):
+        stats.increment("files", 2)
+        with stats.phase("parse"):
+            pass
+        with stats.phase("parse"):
+            pass
+
+    with open(stats_log) as log_file:
+        (record,) = [json.loads(line) for line in log_file]
+    assert record["hook"] == "test-hook"
+    assert record["files"] == 2
+    assert list(record["phases"]) == ["parse"]
+    assert record["duration"] >= record["phases"]["parse"]
+
+
+def test_stats_log_rotated(stats_log, monkeypatch):
+    """Ensure big log is rotated and rotated records are still reported."""
+    monkeypatch.setattr(stats, "STATS_LOG_MAX_SIZE", 10)
+    for _ in range(3):
+        with stats.collect("test-hook"):
+            pass
+
+    assert len(list(stats.read_records(stats_log))) == 2
+    assert len(open(stats_log).readlines()) == 1
+
+
+@pytest.mark.parametrize(
+    ["percent", "expected"],
+    [[50, 5], [95, 10], [99, 10], [10, 1]],
+)
+def test_percentile(percent, expected):
+    """Ensure percentiles are calculated by nearest-rank method."""
+    assert stats.percentile(list(range(1, 11)), percent) == expected
+
+
+def test_histogram():
+    """Ensure values are counted in their buckets."""
+    assert stats.histogram([0.001, 0.01, 0.02, 5, 100]) == [2, 1, 0, 0, 0, 0, 1, 1]
+
+
+def test_stats_command(stats_log, capsys):
+    """Ensure `saritasa-hooks stats` reports logged invocations."""
+    assert cli.main(["stats"]) == 0
+    assert "No hooks invocations are logged yet" in capsys.readouterr().out
+
+    with stats.collect("test-hook"), stats.phase("parse"):
+        pass
+    assert cli.main(["stats"]) == 0
+    output = capsys.readouterr().out
+    assert "test-hook" in output
+    assert "  parse" in output